@@ -4,13 +4,14 @@ Simple debug test for PaddleOCR raw output
 """
 
 import sys
-import os
 from pathlib import Path
 
 # Add src directory to path
 src_path = Path(__file__).parent / "scr"
 sys.path.insert(0, str(src_path))
 
+from test_utils import image_exists
+
 def debug_paddle_raw():
     """Debug PaddleOCR raw output directly"""
     try:
@@ -19,7 +20,7 @@ def debug_paddle_raw():
         
         # Test with a sample image
         test_image = "scr/uploads/20250914_230933_2025-09-14_225307.png"
-        if not os.path.exists(test_image):
+        if not image_exists(test_image):
             print(f"❌ Тестовое изображение не найдено: {test_image}")
             return False
             
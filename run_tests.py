@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Run all OCR test scripts in one process
+
+Paddle, torch and the OCR models are imported and loaded once and shared by
+every test, instead of once per `python test_*.py` invocation.
+"""
+
+import importlib
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add src directory to path
+src_path = Path(__file__).parent / "scr"
+sys.path.insert(0, str(src_path))
+
+# (name, module, test function); test_simple and simple_paddle_test repeat these checks
+TESTS = [
+    ("Tesseract", "test_ocr_fix", "test_tesseract"),
+    ("PaddleOCR", "test_ocr_fix", "test_paddle_ocr"),
+    ("TrOCR", "test_ocr_fix", "test_trocr"),
+    ("Нормализация Paddle", "test_paddle_fix", "test_normalize_function"),
+    ("Пакетный PaddleOCR", "test_paddle_fix", "test_paddle_ocr_fix"),
+    ("Диагностика PaddleOCR", "test_paddle_debug", "test_paddle_debug"),
+    ("Структура OCRResult", "test_ocr_structure", "test_ocr_result_structure"),
+]
+
+
+def run_test(module_name, func_name):
+    """Run one test function; diagnostic tests return None and pass unless they raise"""
+    try:
+        test = getattr(importlib.import_module(module_name), func_name)
+        return test() is not False
+    except Exception as e:
+        print(f"❌ Ошибка {module_name}.{func_name}: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print("🚀 Запуск всех тестов OCR в одном процессе...\n")
+    
+    results = {}
+    for name, module_name, func_name in TESTS:
+        print(f"\n{'=' * 20} {name} {'=' * 20}")
+        start = time.perf_counter()
+        results[name] = run_test(module_name, func_name)
+        print(f"⏱️ {name}: {time.perf_counter() - start:.2f} с")
+    
+    print("\n📊 Результаты тестирования:")
+    for name, success in results.items():
+        status = "✅ Работает" if success else "❌ Не работает"
+        print(f"  {name}: {status}")
+    
+    passed = sum(results.values())
+    print(f"\n🎯 Итого: {passed}/{len(results)} тестов прошли")
+    sys.exit(0 if passed == len(results) else 1)
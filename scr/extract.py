@@ -76,6 +76,9 @@ REGEX_PATTERNS = {
     'contract_number': r'№?\s*(\d+[\-/]?\d*)',
 }
 
+# Слово только из кириллических букв (эвристика ФИО); скомпилировано один раз
+_CYRILLIC_WORD = re.compile(r'[А-ЯЁа-яё]+').fullmatch
+
 # Месяцы для парсинга дат
 MONTHS = {
     'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4,
@@ -379,7 +382,7 @@ def normalize_fio(fio_str: str) -> Optional[str]:
     
     for word in words:
         # Проверяем, что слово начинается с заглавной буквы и содержит кириллицу
-        if word and word[0].isupper() and re.match(r'^[А-ЯЁа-яё]+$', word):
+        if word and word[0].isupper() and _CYRILLIC_WORD(word):
             fio_words.append(word)
             if len(fio_words) == 3:  # Максимум 3 слова для ФИО
                 break
@@ -820,11 +823,13 @@ def process_document_with_extraction(
     # Выполняем OCR
     if ocr_function is None:
         try:
-            from ocr_paddle import run_paddle
-            ocr_function = run_paddle
+            from ocr_paddle import run_paddle, PADDLE_AVAILABLE
         except ImportError:
+            PADDLE_AVAILABLE = False
+        if not PADDLE_AVAILABLE:
             print("Не удалось импортировать PaddleOCR. Установите модуль ocr_paddle.py")
             return results
+        ocr_function = run_paddle
     
     print("1. Выполнение OCR...")
     ocr_output = ocr_function(str(image_path))
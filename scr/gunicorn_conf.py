@@ -0,0 +1,33 @@
+"""
+gunicorn_conf.py - Настройки gunicorn для OCR веб-сервиса
+
+Запуск из папки scr:
+    gunicorn -c gunicorn_conf.py web_app:app
+
+preload_app: приложение (и OCR координатор) импортируется один раз в главном
+процессе, рабочие процессы получают его через fork (copy-on-write).
+Модели прогреваются уже в каждом рабочем процессе (post_worker_init): пулы потоков,
+запущенные в главном процессе до fork, в рабочих не работают.
+CUDA не переносит fork, поэтому на GPU распознавание выносится в ocr_server.py
+(OCR_SERVER_ADDRESS), а веб-процессы запускаются с OCR_WARMUP=0.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2 * multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = 8
+# OCR больших документов может идти минуты
+timeout = 300
+preload_app = True
+# Файлы результатов (send_file) отдаются через os.sendfile, без копирования в Python
+sendfile = True
+
+
+def post_worker_init(worker):
+    """Прогрев OCR в рабочем процессе: приложение регистрирует его в app.extensions['ocr_warmup']"""
+    warmup = getattr(worker.wsgi, 'extensions', {}).get('ocr_warmup')
+    if warmup is not None:
+        warmup()
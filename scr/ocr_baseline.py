@@ -3,8 +3,13 @@ ocr_baseline.py - Tesseract wrapper для baseline OCR распознавани
 Обеспечивает извлечение текста и табличных данных с bbox и confidence.
 """
 
+import atexit
 import json
 import csv
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Optional, Union
 import pytesseract
@@ -18,6 +23,86 @@ try:
 except ImportError:
     PDF_SUPPORT = False
     print("Предупреждение: pdf2image не установлен. Поддержка PDF недоступна.")
+# tesserocr вызывает libtesseract в этом процессе: модель языка загружается один раз,
+# а не при каждом вызове отдельного процесса tesseract, как в pytesseract
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Страницы PDF распознаются параллельно: каждый вызов pytesseract - отдельный
+# процесс tesseract, поток только ждет его завершения (tesserocr отпускает GIL)
+TESSERACT_WORKERS = os.cpu_count() or 1
+
+
+# Пулы PyTessBaseAPI по языкам: экземпляр не потокобезопасен, поэтому берется из пула
+# на время одного вызова. В пуле языка не больше TESSEROCR_POOL_SIZE экземпляров;
+# они переживают потоки запросов, и модель языка не загружается заново
+TESSEROCR_POOL_SIZE = TESSERACT_WORKERS
+_tess_pools: Dict[str, "queue.LifoQueue"] = {}
+_tess_counts: Dict[str, int] = {}
+_tess_unsupported = set()
+_tess_lock = threading.Lock()
+_tess_pid = None
+
+
+def _tess_acquire(lang: str):
+    """
+    Берет PyTessBaseAPI языка из пула (создает, пока пул не заполнен, иначе ждет)
+
+    Returns:
+        (пул, экземпляр API) или (None, None), если tesserocr не смог загрузить язык
+    """
+    global _tess_pid
+    with _tess_lock:
+        if _tess_pid != os.getpid():
+            # После fork экземпляры родителя не используем
+            _tess_pools.clear()
+            _tess_counts.clear()
+            _tess_unsupported.clear()
+            _tess_pid = os.getpid()
+        if lang in _tess_unsupported:
+            return None, None
+        pool = _tess_pools.setdefault(lang, queue.LifoQueue())
+        create = pool.empty() and _tess_counts.get(lang, 0) < TESSEROCR_POOL_SIZE
+        if create:
+            _tess_counts[lang] = _tess_counts.get(lang, 0) + 1
+
+    if not create:
+        return pool, pool.get()
+
+    try:
+        return pool, tesserocr.PyTessBaseAPI(lang=lang)
+    except RuntimeError as e:
+        print(f"tesserocr недоступен для '{lang}', используется pytesseract: {e}")
+        with _tess_lock:
+            _tess_unsupported.add(lang)
+            _tess_counts[lang] -= 1
+        return None, None
+
+
+@atexit.register
+def _end_tess_apis() -> None:
+    """Освобождает модели libtesseract при завершении процесса"""
+    with _tess_lock:
+        for pool in _tess_pools.values():
+            while not pool.empty():
+                pool.get_nowait().End()
+        _tess_pools.clear()
+        _tess_counts.clear()
+
+
+def _image_to_string(image: Image.Image, lang: str) -> str:
+    """Текст изображения через tesserocr в процессе, иначе через pytesseract"""
+    pool, api = _tess_acquire(lang) if TESSEROCR_AVAILABLE else (None, None)
+    if api is None:
+        return pytesseract.image_to_string(image, lang=lang)
+    try:
+        api.SetImage(image)
+        return api.GetUTF8Text()
+    finally:
+        pool.put(api)
 
 
 def get_available_languages() -> List[str]:
@@ -57,12 +142,12 @@ def choose_best_language(text_hint: str = None) -> str:
     return 'eng'
 
 
-def run_tesseract(path: str, lang: str = None) -> str:
+def run_tesseract(path: Union[str, Image.Image], lang: str = None) -> str:
     """
     Выполняет OCR распознавание и возвращает извлеченный текст.
 
     Args:
-        path: Путь к изображению или PDF файлу
+        path: Путь к изображению или PDF файлу, либо уже открытое изображение
         lang: Языки для распознавания (автоопределение если None)
 
     Returns:
@@ -75,13 +160,13 @@ def run_tesseract(path: str, lang: str = None) -> str:
     # Автоопределение языка если не указан
     if lang is None:
         lang = choose_best_language()
-    file_path = Path(path)
+    file_path = None if isinstance(path, Image.Image) else Path(path)
     
-    if not file_path.exists():
+    if file_path is not None and not file_path.exists():
         raise FileNotFoundError(f"Файл не найден: {path}")
     
     # Обработка PDF
-    if file_path.suffix.lower() == '.pdf':
+    if file_path is not None and file_path.suffix.lower() == '.pdf':
         if not PDF_SUPPORT:
             return "Ошибка: pdf2image не установлен. Установите: pip install pdf2image"
 
@@ -89,8 +174,10 @@ def run_tesseract(path: str, lang: str = None) -> str:
             pages = convert_from_path(path)
             text_parts = []
 
-            for i, page in enumerate(pages):
-                page_text = pytesseract.image_to_string(page, lang=lang)
+            with ThreadPoolExecutor(max_workers=min(TESSERACT_WORKERS, len(pages) or 1)) as pool:
+                page_texts = list(pool.map(lambda page: _image_to_string(page, lang), pages))
+
+            for i, page_text in enumerate(page_texts):
                 if len(pages) > 1:
                     text_parts.append(f"--- Страница {i+1} ---\n{page_text}")
                 else:
@@ -103,8 +190,8 @@ def run_tesseract(path: str, lang: str = None) -> str:
     
     # Обработка изображений
     try:
-        image = Image.open(path)
-        text = pytesseract.image_to_string(image, lang=lang)
+        image = path if file_path is None else Image.open(path)
+        text = _image_to_string(image, lang)
         return text
     except Exception as e:
         # Не выбрасываем исключение, возвращаем сообщение об ошибке
@@ -115,12 +202,12 @@ def run_tesseract(path: str, lang: str = None) -> str:
             return f"Ошибка Tesseract: {error_msg}"
 
 
-def run_tesseract_with_data(path: str, lang: str = None) -> List[Dict]:
+def run_tesseract_with_data(path: Union[str, Image.Image], lang: str = None) -> List[Dict]:
     """
     Выполняет OCR и возвращает детальные данные с bbox и confidence.
 
     Args:
-        path: Путь к изображению или PDF файлу
+        path: Путь к изображению или PDF файлу, либо уже открытое изображение
         lang: Языки для распознавания (автоопределение если None)
 
     Returns:
@@ -135,27 +222,32 @@ def run_tesseract_with_data(path: str, lang: str = None) -> List[Dict]:
     # Автоопределение языка если не указан
     if lang is None:
         lang = choose_best_language()
-    file_path = Path(path)
+    file_path = None if isinstance(path, Image.Image) else Path(path)
     
-    if not file_path.exists():
+    if file_path is not None and not file_path.exists():
         raise FileNotFoundError(f"Файл не найден: {path}")
     
     results = []
     
     # Обработка PDF
-    if file_path.suffix.lower() == '.pdf':
+    if file_path is not None and file_path.suffix.lower() == '.pdf':
         if not PDF_SUPPORT:
             raise ValueError("Поддержка PDF не доступна. Установите pdf2image.")
         
         pages = convert_from_path(path)
         
-        for page_idx, page in enumerate(pages):
-            page_data = pytesseract.image_to_data(page, lang=lang, output_type=Output.DICT)
+        with ThreadPoolExecutor(max_workers=min(TESSERACT_WORKERS, len(pages) or 1)) as pool:
+            pages_data = list(pool.map(
+                lambda page: pytesseract.image_to_data(page, lang=lang, output_type=Output.DICT),
+                pages
+            ))
+        
+        for page_idx, page_data in enumerate(pages_data):
             page_results = _process_tesseract_data(page_data, page_num=page_idx+1)
             results.extend(page_results)
     else:
         # Обработка изображения
-        image = Image.open(path)
+        image = path if file_path is None else Image.open(path)
         data = pytesseract.image_to_data(image, lang=lang, output_type=Output.DICT)
         results = _process_tesseract_data(data)
     
@@ -3,219 +3,501 @@ OCR Coordinator - единый интерфейс для всех OCR движк
 Обеспечивает интеграцию PaddleOCR, Tesseract, TrOCR и постобработки
 """
 
+import importlib.util
 import json
+import os
+import re
+import threading
 import traceback
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
-from PIL import Image
+from types import MappingProxyType
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 import tempfile
 
-# Импортируем OCR модули с обработкой ошибок
-try:
-    from ocr_paddle import run_paddle, get_plaintext
-    PADDLE_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ PaddleOCR недоступен: {e}")
-    PADDLE_AVAILABLE = False
 
+# Проверяем доступность OCR модулей без их импорта: сами модули (paddle,
+# torch и т.д.) тяжелые и загружаются лениво при первом использовании движка
+def _check_available(title: str, *modules: str) -> bool:
+    """Проверка наличия модулей; при отсутствии - ImportWarning"""
+    for module in modules:
+        if importlib.util.find_spec(module) is None:
+            warnings.warn(f"{title} недоступен: No module named '{module}'", ImportWarning, stacklevel=2)
+            return False
+    return True
+
+
+PADDLE_AVAILABLE = _check_available('PaddleOCR', 'paddleocr', 'cv2', 'numpy', 'PIL')
+TESSERACT_AVAILABLE = _check_available('Tesseract', 'pytesseract', 'numpy', 'PIL')
+TROCR_AVAILABLE = _check_available('TrOCR', 'torch', 'transformers', 'numpy', 'PIL')
+EXTRACT_AVAILABLE = _check_available('Extract модуль', 'numpy')
+METRICS_AVAILABLE = _check_available('Metrics модуль', 'Levenshtein', 'jiwer', 'pandas')
+
+# Декодирование изображения один раз для всех движков сравнения
+DECODE_AVAILABLE = all(importlib.util.find_spec(module) is not None for module in ('cv2', 'numpy'))
+
+
+@contextmanager
+def _engine_import(engine: str):
+    """
+    Подтверждение доступности движка при первой загрузке его модуля
+
+    find_spec видит только установленный пакет; если модуль все же не
+    импортируется (нет нативных библиотек, несовместимы torch/CUDA, нет
+    программы tesseract), движок помечается недоступным.
+    """
+    try:
+        yield
+    except (ImportError, OSError) as e:
+        _disable_engine(engine, e)
+        raise
+
+
+@lru_cache(maxsize=None)
+def _paddle_module():
+    """Ленивая загрузка ocr_paddle"""
+    with _engine_import('PaddleOCR'):
+        import ocr_paddle
+    return ocr_paddle
+
+
+@lru_cache(maxsize=None)
+def _baseline_module():
+    """Ленивая загрузка ocr_baseline"""
+    with _engine_import('Tesseract'):
+        import ocr_baseline
+        # pytesseract импортируется и без самой программы tesseract
+        ocr_baseline.pytesseract.get_tesseract_version()
+    return ocr_baseline
+
+
+@lru_cache(maxsize=None)
+def _trocr_module():
+    """Ленивая загрузка ocr_trocr"""
+    with _engine_import('TrOCR'):
+        import ocr_trocr
+        if not ocr_trocr.TROCR_AVAILABLE:
+            raise ImportError("transformers не импортируется")
+    return ocr_trocr
+
+
+@lru_cache(maxsize=None)
+def _extract_module():
+    """Ленивая загрузка extract"""
+    import extract
+    return extract
+
+
+@lru_cache(maxsize=None)
+def _metrics_module():
+    """Ленивая загрузка metrics"""
+    import metrics
+    return metrics
+
+
+# Порог "большого" изображения (полная страница документа), в пикселях
+LARGE_IMAGE_PIXELS = 2_000_000
+
+# Форматы, которые движки принимают пакетом
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.tiff'})
+
+# Изображение для прогрева моделей
+WARMUP_IMAGE = str(Path(__file__).resolve().parent.parent / 'data' / 'samples' / 'image.png')
+
+# Одновременно запущенные движки во всех сравнениях (чтобы не перегружать CPU)
+_ENGINE_SLOTS = threading.BoundedSemaphore(os.cpu_count() or 1)
+
+# Метрики сравнения для совпадающих текстов
+_IDENTICAL_TEXT_METRICS = MappingProxyType({
+    'cer': 0.0,
+    'wer': 0.0,
+    'similarity': 1.0,
+    'length_diff': 0
+})
+
+_TROCR_SKIPPED = {
+    'engine': 'TrOCR',
+    'success': False,
+    'skipped': True,
+    'error': 'skipped: image too large for TrOCR'
+}
+
+# Регулярные выражения для простого извлечения полей.
+# Цифровые шаблоны компилируются с re.ASCII - без таблиц Unicode они быстрее;
+# шаблон суммы содержит кириллицу и IGNORECASE, поэтому остается Unicode.
+_RE_DATES = (
+    re.compile(r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\b'),
+    re.compile(r'\b(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})\b')
+)
+_RE_SUM = re.compile(r'(\d{1,3}(?:[\s,]\d{3})*(?:[.,]\d{1,2})?)\s*(?:руб|рублей|р\.|₽)', re.IGNORECASE)
+_RE_PHONE = re.compile(r'(?:\+7|8|7)?[\s\-]?\(?\d{3}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}', re.ASCII)
+_RE_PHONE_JUNK = re.compile(r'[^\d+]', re.ASCII)
+_RE_EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', re.IGNORECASE | re.ASCII)
+_RE_INN = re.compile(r'\b\d{10}\b|\b\d{12}\b', re.ASCII)
+
+# Быстрая сериализация JSON (orjson), с откатом на стандартный json
 try:
-    from ocr_baseline import run_tesseract, run_tesseract_with_data
-    TESSERACT_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ Tesseract недоступен: {e}")
-    TESSERACT_AVAILABLE = False
+    import orjson
 
-try:
-    from ocr_trocr import run_trocr
-    TROCR_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ TrOCR недоступен: {e}")
-    TROCR_AVAILABLE = False
+    def _dumps(obj: Any) -> bytes:
+        """Сериализация объекта в JSON (bytes)"""
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        """Сериализация объекта в JSON (bytes)"""
+        return json.dumps(
+            obj,
+            ensure_ascii=False,
+            default=lambda o: o.tolist() if hasattr(o, 'tolist') else str(o)
+        ).encode('utf-8')
 
-try:
-    from extract import extract_fields_from_paddle
-    EXTRACT_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ Extract модуль недоступен: {e}")
-    EXTRACT_AVAILABLE = False
 
-try:
-    from metrics import cer, wer, normalized_levenshtein, field_metrics
-    METRICS_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ Metrics модуль недоступен: {e}")
-    METRICS_AVAILABLE = False
+def _run_paddle_ocr(image_path: str, **kwargs) -> Dict[str, Any]:
+    """Запуск PaddleOCR"""
+    if not PADDLE_AVAILABLE:
+        raise RuntimeError("PaddleOCR не установлен")
 
+    language = kwargs.get('language', 'ru')
+    image = kwargs.get('image')
 
-class OCRCoordinator:
-    """Координатор для всех OCR движков"""
+    # Запускаем OCR (уже декодированное изображение файл не перечитывает)
+    ocr_output = _paddle_module().run_paddle(image_path if image is None else image, lang=language)
+    return _paddle_result(ocr_output)
 
-    def __init__(self):
-        """Инициализация координатора"""
-        self.engines = {
-            'PaddleOCR': {
-                'available': PADDLE_AVAILABLE,
-                'function': self._run_paddle_ocr,
-                'description': 'PaddleOCR - высокое качество для кириллицы'
-            },
-            'Tesseract': {
-                'available': TESSERACT_AVAILABLE,
-                'function': self._run_tesseract_ocr,
-                'description': 'Tesseract - быстрый базовый OCR'
-            },
-            'TrOCR': {
-                'available': TROCR_AVAILABLE,
-                'function': self._run_trocr_ocr,
-                'description': 'TrOCR - AI-модель для сложных текстов'
-            }
-        }
 
-    def get_available_engines(self) -> List[str]:
-        """Получить список доступных OCR движков"""
-        return [name for name, config in self.engines.items() if config['available']]
+def _run_paddle_ocr_batch(image_paths: List[str], **kwargs) -> List[Dict[str, Any]]:
+    """Пакетный запуск PaddleOCR: один вызов модели на группу изображений"""
+    if not PADDLE_AVAILABLE:
+        raise RuntimeError("PaddleOCR не установлен")
 
-    def get_engine_info(self) -> Dict[str, Dict]:
-        """Получить подробную информацию о движках"""
-        return {
-            name: {
-                'available': config['available'],
-                'description': config['description']
-            }
-            for name, config in self.engines.items()
-        }
+    language = kwargs.get('language', 'ru')
+    paddle = _paddle_module()
 
-    def _run_paddle_ocr(self, image_path: str, **kwargs) -> Dict[str, Any]:
-        """Запуск PaddleOCR"""
-        if not PADDLE_AVAILABLE:
-            raise RuntimeError("PaddleOCR не установлен")
+    for image_path in image_paths:
+        if Path(image_path).suffix.lower() not in IMAGE_EXTENSIONS:
+            raise ValueError(f"Неподдерживаемый формат файла: {image_path}")
 
-        language = kwargs.get('language', 'ru')
+    ocr = paddle.get_paddle_instance(lang=language)
+    raw_outputs = ocr.ocr([str(image_path) for image_path in image_paths])
+    if len(raw_outputs) != len(image_paths):
+        raise RuntimeError("PaddleOCR вернул результаты не для всех изображений")
 
-        # Запускаем OCR
-        ocr_output = run_paddle(image_path, lang=language)
-        raw_text = get_plaintext(ocr_output)
+    return [
+        _paddle_result(paddle.sort_by_reading_order(paddle.normalize_paddle_output([raw_output])))
+        for raw_output in raw_outputs
+    ]
 
-        # Извлекаем поля если модуль доступен
-        extracted_fields = {}
-        if EXTRACT_AVAILABLE:
-            try:
-                extracted_fields = extract_fields_from_paddle(ocr_output)
-            except Exception as e:
-                print(f"Ошибка извлечения полей: {e}")
 
-        return {
-            'engine': 'PaddleOCR',
-            'raw_text': raw_text,
-            'ocr_data': ocr_output,
-            'extracted_fields': extracted_fields,
-            'total_items': len(ocr_output) if ocr_output else 0,
-            'avg_confidence': sum(item.get('conf', 0) for item in ocr_output) / len(ocr_output) if ocr_output else 0
-        }
+def _paddle_result(ocr_output: List[Dict]) -> Dict[str, Any]:
+    """Сборка результата PaddleOCR из нормализованного вывода"""
+    raw_text = _paddle_module().get_plaintext(ocr_output)
+
+    # Извлекаем поля если модуль доступен
+    extracted_fields = {}
+    if EXTRACT_AVAILABLE:
+        try:
+            extracted_fields = _extract_module().extract_fields_from_paddle(ocr_output)
+        except Exception as e:
+            print(f"Ошибка извлечения полей: {e}")
+
+    return {
+        'engine': 'PaddleOCR',
+        'raw_text': raw_text,
+        'ocr_data': ocr_output,
+        'extracted_fields': extracted_fields,
+        'total_items': len(ocr_output) if ocr_output else 0,
+        'avg_confidence': sum(item.get('conf', 0) for item in ocr_output) / len(ocr_output) if ocr_output else 0
+    }
+
+
+def _run_tesseract_ocr(image_path: str, **kwargs) -> Dict[str, Any]:
+    """Запуск Tesseract OCR"""
+    if not TESSERACT_AVAILABLE:
+        raise RuntimeError("Tesseract не установлен")
+
+    language = kwargs.get('language', 'eng')  # Изменен на английский по умолчанию пока не установлен русский
+
+    # Уже декодированное изображение (BGR) передаем Tesseract без чтения файла
+    source = image_path
+    image = kwargs.get('image')
+    if image is not None:
+        from PIL import Image
+        source = Image.fromarray(image[:, :, ::-1])
+
+    # Запускаем OCR с автоопределением языка
+    baseline = _baseline_module()
+    raw_text = baseline.run_tesseract(source, lang=None)  # None = автоопределение
+    ocr_data = baseline.run_tesseract_with_data(source, lang=None)
+
+    # Простое извлечение полей для Tesseract
+    extracted_fields = _extract_fields_simple(raw_text)
+
+    return {
+        'engine': 'Tesseract',
+        'raw_text': raw_text,
+        'ocr_data': ocr_data,
+        'extracted_fields': extracted_fields,
+        'total_items': len(ocr_data) if ocr_data else 0,
+        'avg_confidence': sum(item.get('conf', 0) for item in ocr_data) / len(ocr_data) if ocr_data else 0
+    }
+
+
+def _run_trocr_ocr(image_path: str, **kwargs) -> Dict[str, Any]:
+    """Запуск TrOCR"""
+    if not TROCR_AVAILABLE:
+        raise RuntimeError("TrOCR не установлен")
+
+    image = kwargs.get('image')
+
+    # TrOCR рассчитан на отдельные строки - полные страницы не запускаем
+    if not kwargs.get('force_trocr', False):
+        if image is not None:
+            is_large = image.shape[0] * image.shape[1] > LARGE_IMAGE_PIXELS
+        else:
+            is_large = _is_large_image(image_path)
+        if is_large:
+            return _TROCR_SKIPPED.copy()
+
+    # Запускаем OCR (модель ждет RGB, декодированное изображение - BGR)
+    if image is not None:
+        import numpy as np
+        raw_text = _trocr_module().run_trocr(np.ascontiguousarray(image[:, :, ::-1]))
+    else:
+        raw_text = _trocr_module().run_trocr(image_path)
+    return _trocr_result(raw_text)
 
-    def _run_tesseract_ocr(self, image_path: str, **kwargs) -> Dict[str, Any]:
-        """Запуск Tesseract OCR"""
-        if not TESSERACT_AVAILABLE:
-            raise RuntimeError("Tesseract не установлен")
 
-        language = kwargs.get('language', 'eng')  # Изменен на английский по умолчанию пока не установлен русский
+def _run_trocr_ocr_batch(image_paths: List[str], **kwargs) -> List[Dict[str, Any]]:
+    """Пакетный запуск TrOCR: изображения группы обрабатываются одной моделью"""
+    if not TROCR_AVAILABLE:
+        raise RuntimeError("TrOCR не установлен")
 
-        # Запускаем OCR с автоопределением языка
-        raw_text = run_tesseract(image_path, lang=None)  # None = автоопределение
-        ocr_data = run_tesseract_with_data(image_path, lang=None)
+    force = kwargs.get('force_trocr', False)
+    skipped = [not force and _is_large_image(image_path) for image_path in image_paths]
+    to_process = [image_path for image_path, skip in zip(image_paths, skipped) if not skip]
 
-        # Простое извлечение полей для Tesseract
-        extracted_fields = self._extract_fields_simple(raw_text)
+    texts = iter(_trocr_batch_processor().process_batch(to_process) if to_process else [])
+    return [
+        _TROCR_SKIPPED.copy() if skip else _trocr_result(next(texts))
+        for skip in skipped
+    ]
 
-        return {
-            'engine': 'Tesseract',
-            'raw_text': raw_text,
-            'ocr_data': ocr_data,
-            'extracted_fields': extracted_fields,
-            'total_items': len(ocr_data) if ocr_data else 0,
-            'avg_confidence': sum(item.get('conf', 0) for item in ocr_data) / len(ocr_data) if ocr_data else 0
-        }
 
-    def _run_trocr_ocr(self, image_path: str, **kwargs) -> Dict[str, Any]:
-        """Запуск TrOCR"""
-        if not TROCR_AVAILABLE:
-            raise RuntimeError("TrOCR не установлен")
+@lru_cache(maxsize=None)
+def _trocr_batch_processor():
+    """Общий пакетный обработчик TrOCR поверх общего экземпляра модели (тот же, что у run_trocr)"""
+    trocr = _trocr_module()
+    return trocr.BatchTrOCR(wrapper=trocr._get_trocr())
 
-        # Запускаем OCR
-        raw_text = run_trocr(image_path)
 
-        # TrOCR возвращает только текст, создаем простую структуру
-        extracted_fields = self._extract_fields_simple(raw_text)
+def _is_large_image(image_path: str) -> bool:
+    """Проверка размера изображения по заголовку файла"""
+    from PIL import Image
 
-        return {
-            'engine': 'TrOCR',
-            'raw_text': raw_text,
-            'ocr_data': [],
-            'extracted_fields': extracted_fields,
-            'total_items': 1,
-            'avg_confidence': 0.85  # TrOCR не предоставляет confidence
-        }
+    with Image.open(image_path) as image:
+        width, height = image.size
+    return width * height > LARGE_IMAGE_PIXELS
+
+
+def _decode_image(image_path: str):
+    """Декодирует изображение в массив BGR (None, если не удалось или нет cv2)"""
+    if not DECODE_AVAILABLE or Path(image_path).suffix.lower() not in IMAGE_EXTENSIONS:
+        return None
 
-    def _extract_fields_simple(self, text: str) -> Dict[str, Any]:
-        """Простое извлечение полей с помощью регулярных выражений"""
-        import re
-        from datetime import datetime
-
-        fields = {}
-
-        # Даты (простой поиск)
-        date_patterns = [
-            r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\b',
-            r'\b(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})\b'
-        ]
-
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                try:
-                    if len(matches[0][0]) == 4:  # YYYY-MM-DD
-                        date_obj = datetime(int(matches[0][0]), int(matches[0][1]), int(matches[0][2]))
-                    else:  # DD.MM.YYYY
-                        date_obj = datetime(int(matches[0][2]), int(matches[0][1]), int(matches[0][0]))
-                    fields['date'] = date_obj.strftime('%Y-%m-%d')
-                    break
-                except ValueError:
-                    continue
-
-        # Суммы
-        sum_pattern = r'(\d{1,3}(?:[\s,]\d{3})*(?:[.,]\d{1,2})?)\s*(?:руб|рублей|р\.|₽)'
-        sum_matches = re.findall(sum_pattern, text, re.IGNORECASE)
-        if sum_matches:
+    import cv2
+    import numpy as np
+
+    # np.fromfile открывает пути с не-ASCII символами, которые не открывает cv2.imread
+    try:
+        return cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except (OSError, cv2.error):
+        return None
+
+
+def _trocr_result(raw_text: str) -> Dict[str, Any]:
+    """Сборка результата TrOCR из распознанного текста"""
+    # TrOCR возвращает только текст, создаем простую структуру
+    extracted_fields = _extract_fields_simple(raw_text)
+
+    return {
+        'engine': 'TrOCR',
+        'raw_text': raw_text,
+        'ocr_data': [],
+        'extracted_fields': extracted_fields,
+        'total_items': 1,
+        'avg_confidence': 0.85  # TrOCR не предоставляет confidence
+    }
+
+
+def _extract_fields_simple(text: str) -> Dict[str, Any]:
+    """Простое извлечение полей с помощью регулярных выражений"""
+    fields = {}
+
+    # Даты (простой поиск)
+    for pattern in _RE_DATES:
+        matches = pattern.findall(text)
+        if matches:
             try:
-                sum_str = sum_matches[0].replace(' ', '').replace(',', '.')
-                fields['sum'] = float(sum_str)
+                if len(matches[0][0]) == 4:  # YYYY-MM-DD
+                    date_obj = datetime(int(matches[0][0]), int(matches[0][1]), int(matches[0][2]))
+                else:  # DD.MM.YYYY
+                    date_obj = datetime(int(matches[0][2]), int(matches[0][1]), int(matches[0][0]))
+                fields['date'] = date_obj.strftime('%Y-%m-%d')
+                break
             except ValueError:
-                pass
-
-        # Телефоны
-        phone_pattern = r'(?:\+7|8|7)?[\s\-]?\(?\d{3}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}'
-        phone_matches = re.findall(phone_pattern, text)
-        if phone_matches:
-            phone = re.sub(r'[^\d+]', '', phone_matches[0])
-            if len(phone) >= 10:
-                fields['phone'] = phone
-
-        # Email
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_matches = re.findall(email_pattern, text, re.IGNORECASE)
-        if email_matches:
-            fields['email'] = email_matches[0].lower()
-
-        # ИНН
-        inn_pattern = r'\b\d{10}\b|\b\d{12}\b'
-        inn_matches = re.findall(inn_pattern, text)
-        if inn_matches:
-            fields['inn'] = inn_matches[0]
-
-        fields['raw_text'] = text
-        fields['total_chars'] = len(text)
-        fields['total_words'] = len(text.split())
-
-        return fields
+                continue
+
+    # Суммы
+    sum_matches = _RE_SUM.findall(text)
+    if sum_matches:
+        try:
+            sum_str = sum_matches[0].replace(' ', '').replace(',', '.')
+            fields['sum'] = float(sum_str)
+        except ValueError:
+            pass
+
+    # Телефоны
+    phone_matches = _RE_PHONE.findall(text)
+    if phone_matches:
+        phone = _RE_PHONE_JUNK.sub('', phone_matches[0])
+        if len(phone) >= 10:
+            fields['phone'] = phone
+
+    # Email
+    email_matches = _RE_EMAIL.findall(text)
+    if email_matches:
+        fields['email'] = email_matches[0].lower()
+
+    # ИНН
+    inn_matches = _RE_INN.findall(text)
+    if inn_matches:
+        fields['inn'] = inn_matches[0]
+
+    fields['raw_text'] = text
+    fields['total_chars'] = len(text)
+    fields['total_words'] = len(text.split())
+
+    return fields
+
+
+@dataclass(frozen=True, slots=True)
+class EngineInfo:
+    """Описание OCR движка"""
+    available: bool
+    runner: Callable[..., Dict[str, Any]]
+    description: str
+    batch_runner: Optional[Callable[..., List[Dict[str, Any]]]] = None
+
+
+# Доступность движков определяется при импорте по наличию пакетов и снимается,
+# если модуль движка не загрузился при первом использовании (_disable_engine)
+_ENGINE_TABLE = {
+    'PaddleOCR': EngineInfo(
+        available=PADDLE_AVAILABLE,
+        runner=_run_paddle_ocr,
+        description='PaddleOCR - высокое качество для кириллицы',
+        batch_runner=_run_paddle_ocr_batch
+    ),
+    'Tesseract': EngineInfo(
+        available=TESSERACT_AVAILABLE,
+        runner=_run_tesseract_ocr,
+        description='Tesseract - быстрый базовый OCR'
+    ),
+    'TrOCR': EngineInfo(
+        available=TROCR_AVAILABLE,
+        runner=_run_trocr_ocr,
+        description='TrOCR - AI-модель для сложных текстов',
+        batch_runner=_run_trocr_ocr_batch
+    )
+}
+_ENGINES = MappingProxyType(_ENGINE_TABLE)
+
+
+def _disable_engine(engine: str, error: Exception) -> None:
+    """Помечает движок недоступным и сбрасывает кэши списков движков"""
+    if _ENGINE_TABLE[engine].available:
+        warnings.warn(f"{engine} недоступен: {error}", ImportWarning, stacklevel=3)
+        _ENGINE_TABLE[engine] = replace(_ENGINE_TABLE[engine], available=False)
+        _available_engines.cache_clear()
+        _engine_info.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _available_engines() -> Tuple[str, ...]:
+    """Кэшированный список доступных движков"""
+    return tuple(name for name, info in _ENGINES.items() if info.available)
+
+
+@lru_cache(maxsize=None)
+def _engine_info() -> MappingProxyType:
+    """Кэшированная информация о движках"""
+    return MappingProxyType({
+        name: MappingProxyType({
+            'available': info.available,
+            'description': info.description
+        })
+        for name, info in _ENGINES.items()
+    })
+
+
+class OCRCoordinator:
+    """Координатор для всех OCR движков"""
+
+    engines = _ENGINES
+
+    def __init__(self, enable_warmup: bool = False):
+        """
+        Инициализация координатора
+
+        Args:
+            enable_warmup: Прогреть пакетные движки тестовым изображением,
+                чтобы первая реальная пачка не платила за инициализацию
+        """
+        if enable_warmup:
+            self.warmup()
+
+    def warmup(
+        self,
+        image_path: str = WARMUP_IMAGE,
+        engines: Optional[List[str]] = None,
+        languages: Tuple[str, ...] = ('ru',)
+    ) -> None:
+        """
+        Прогрев доступных пакетных движков одним изображением
+
+        Args:
+            image_path: Изображение для прогрева
+            engines: Какие движки прогреть (по умолчанию - все пакетные)
+            languages: Для каких языков загрузить модели (экземпляры движков
+                кэшируются по языку, поэтому каждый язык прогревается отдельно)
+        """
+        for name, info in self.engines.items():
+            if engines is not None and name not in engines:
+                continue
+            if info.available and info.batch_runner is not None:
+                for language in languages:
+                    try:
+                        info.batch_runner([image_path], language=language)
+                    except Exception as e:
+                        print(f"⚠️ Не удалось прогреть {name} ({language}): {e}")
+
+    def close(self) -> None:
+        """Останавливает фоновые пулы движков (пакетная загрузка изображений TrOCR)"""
+        if _trocr_batch_processor.cache_info().currsize:
+            _trocr_batch_processor().close()
+
+    def get_available_engines(self) -> List[str]:
+        """Получить список доступных OCR движков (копия кэшированного списка)"""
+        return list(_available_engines())
+
+    def get_engine_info(self) -> Dict[str, Dict[str, Any]]:
+        """Получить подробную информацию о движках (копия кэшированных данных)"""
+        return {name: dict(info) for name, info in _engine_info().items()}
 
     def recommend_engine(self, image_path: str) -> Dict[str, Any]:
         """
@@ -251,7 +533,7 @@ class OCRCoordinator:
             }
 
             # Логика рекомендаций
-            if total_pixels > 2000000:  # Большие изображения
+            if total_pixels > LARGE_IMAGE_PIXELS:  # Большие изображения
                 recommendation['recommendations'].append({
                     'engine': 'PaddleOCR',
                     'priority': 1,
@@ -310,7 +592,7 @@ class OCRCoordinator:
             for rec in recommendation['recommendations']:
                 engine = rec['engine']
                 if engine in self.engines:
-                    rec['available'] = self.engines[engine]['available']
+                    rec['available'] = self.engines[engine].available
                     if not rec['available']:
                         rec['reason'] += ' (НЕ УСТАНОВЛЕН)'
 
@@ -352,7 +634,7 @@ class OCRCoordinator:
             if engine not in self.engines:
                 raise ValueError(f"Неизвестный движок: {engine}")
 
-            if not self.engines[engine]['available']:
+            if not self.engines[engine].available:
                 raise RuntimeError(f"Движок {engine} недоступен")
 
             # Проверяем файл
@@ -360,32 +642,12 @@ class OCRCoordinator:
                 raise FileNotFoundError(f"Файл не найден: {image_path}")
 
             # Запускаем OCR
-            ocr_function = self.engines[engine]['function']
+            ocr_function = self.engines[engine].runner
             result = ocr_function(image_path, language=language, **kwargs)
 
-            # Добавляем метаданные
-            result.update({
-                'processing_params': {
-                    'engine': engine,
-                    'language': language,
-                    'use_llm': use_llm,
-                    'confidence_threshold': confidence_threshold
-                },
-                'file_info': {
-                    'path': image_path,
-                    'size': Path(image_path).stat().st_size,
-                    'name': Path(image_path).name
-                },
-                'timestamp': str(Path(image_path).stat().st_mtime),
-                'success': True
-            })
-
-            # TODO: LLM постобработка когда будет реализована
-            if use_llm:
-                result['llm_postprocessed'] = False
-                result['llm_note'] = "LLM постобработка пока не реализована"
-
-            return result
+            return self._finalize_result(
+                result, image_path, engine, language, use_llm, confidence_threshold
+            )
 
         except Exception as e:
             return {
@@ -395,11 +657,54 @@ class OCRCoordinator:
                 'engine': engine
             }
 
+    def _finalize_result(
+        self,
+        result: Dict[str, Any],
+        image_path: str,
+        engine: str,
+        language: str,
+        use_llm: bool,
+        confidence_threshold: float
+    ) -> Dict[str, Any]:
+        """Добавление метаданных к результату движка"""
+        # Движок сам отказался от запуска - возвращаем как есть
+        if result.get('skipped'):
+            return result
+
+        file_stat = os.stat(image_path)
+
+        # Добавляем метаданные
+        result.update({
+            'processing_params': {
+                'engine': engine,
+                'language': language,
+                'use_llm': use_llm,
+                'confidence_threshold': confidence_threshold
+            },
+            'file_info': {
+                'path': image_path,
+                'size': file_stat.st_size,
+                'name': os.path.basename(image_path)
+            },
+            'timestamp': str(file_stat.st_mtime),
+            'success': True
+        })
+
+        # TODO: LLM постобработка когда будет реализована
+        if use_llm:
+            result['llm_postprocessed'] = False
+            result['llm_note'] = "LLM постобработка пока не реализована"
+
+        return result
+
     def compare_engines(
         self,
         image_path: str,
         engines: List[str] = None,
         language: str = 'ru',
+        auto_skip: bool = True,
+        image: Any = None,
+        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -409,6 +714,12 @@ class OCRCoordinator:
             image_path: Путь к изображению
             engines: Список движков для сравнения
             language: Язык распознавания
+            auto_skip: Не запускать движки, которые не подходят для изображения
+                (приоритет >= 3 в recommend_engine)
+            image: Уже декодированное изображение (BGR); по умолчанию файл
+                декодируется здесь один раз и передается всем движкам
+            on_result: Вызывается с (движок, результат) по мере завершения
+                движков, до расчета метрик сравнения
 
         Returns:
             Результаты сравнения
@@ -418,34 +729,67 @@ class OCRCoordinator:
 
         results = {}
         comparison_metrics = {}
-
-        # Обрабатываем каждым движком
-        for engine in engines:
-            if engine in self.engines and self.engines[engine]['available']:
-                print(f"Обработка {engine}...")
-                result = self.process_document(
-                    image_path=image_path,
-                    engine=engine,
-                    language=language,
-                    **kwargs
-                )
-                results[engine] = result
+        skipped_engines = {}
+
+        # Отсекаем заведомо неподходящие движки до запуска моделей
+        if auto_skip:
+            recommendation = self.recommend_engine(image_path)
+            for rec in recommendation.get('recommendations', []):
+                if rec['priority'] >= 3 and rec['engine'] in engines:
+                    skipped_engines[rec['engine']] = rec['reason']
+            engines = [engine for engine in engines if engine not in skipped_engines]
+
+        # Обрабатываем всеми движками параллельно: Tesseract работает в отдельном
+        # процессе, Paddle и torch отпускают GIL, так что время - максимум, а не сумма
+        engines = [engine for engine in engines if engine in self.engines and self.engines[engine].available]
+        if engines:
+            if image is None:
+                image = _decode_image(image_path)
+            with ThreadPoolExecutor(max_workers=len(engines)) as executor:
+                futures = {
+                    executor.submit(self._process_with_slot, image_path, engine, language, image=image, **kwargs): engine
+                    for engine in engines
+                }
+                finished = {}
+                for future in as_completed(futures):
+                    engine = futures[future]
+                    finished[engine] = future.result()
+                    if on_result is not None:
+                        on_result(engine, finished[engine])
+            # Порядок результатов - как в списке движков
+            results = {engine: finished[engine] for engine in engines}
 
         # Вычисляем метрики сравнения
         if len(results) > 1 and METRICS_AVAILABLE:
+            metrics = _metrics_module()
             texts = {engine: result.get('raw_text', '') for engine, result in results.items() if result.get('success')}
 
+            # Метрики несимметричны (CER/WER нормируются по эталону), поэтому
+            # считаем упорядоченные пары, но не повторяем расчет для одинаковых
+            # пар текстов и сразу отдаем нули для совпадающих текстов
+            pair_cache = {}
+
             # Сравниваем тексты попарно
             for engine1 in texts:
                 for engine2 in texts:
                     if engine1 != engine2:
                         key = f"{engine1}_vs_{engine2}"
+                        text1, text2 = texts[engine1], texts[engine2]
+
+                        if text1 == text2:
+                            comparison_metrics[key] = dict(_IDENTICAL_TEXT_METRICS)
+                            continue
+
+                        if (text1, text2) in pair_cache:
+                            comparison_metrics[key] = dict(pair_cache[text1, text2])
+                            continue
+
                         try:
-                            comparison_metrics[key] = {
-                                'cer': cer(texts[engine1], texts[engine2]),
-                                'wer': wer(texts[engine1], texts[engine2]),
-                                'similarity': normalized_levenshtein(texts[engine1], texts[engine2]),
-                                'length_diff': abs(len(texts[engine1]) - len(texts[engine2]))
+                            comparison_metrics[key] = pair_cache[text1, text2] = {
+                                'cer': metrics.cer(text1, text2),
+                                'wer': metrics.wer(text1, text2),
+                                'similarity': metrics.normalized_levenshtein(text1, text2),
+                                'length_diff': abs(len(text1) - len(text2))
                             }
                         except Exception as e:
                             comparison_metrics[key] = {'error': str(e)}
@@ -453,6 +797,7 @@ class OCRCoordinator:
         return {
             'results': results,
             'comparison_metrics': comparison_metrics,
+            'skipped_engines': skipped_engines,
             'summary': {
                 'engines_tested': len(results),
                 'successful_engines': len([r for r in results.values() if r.get('success')]),
@@ -460,6 +805,17 @@ class OCRCoordinator:
             }
         }
 
+    def _process_with_slot(self, image_path: str, engine: str, language: str, **kwargs) -> Dict[str, Any]:
+        """process_document, ограниченный общим числом одновременно работающих движков"""
+        with _ENGINE_SLOTS:
+            print(f"Обработка {engine}...")
+            return self.process_document(
+                image_path=image_path,
+                engine=engine,
+                language=language,
+                **kwargs
+            )
+
     def calculate_metrics(
         self,
         reference_text: str,
@@ -478,10 +834,11 @@ class OCRCoordinator:
         if not METRICS_AVAILABLE:
             raise RuntimeError("Модуль метрик недоступен")
 
+        metrics = _metrics_module()
         return {
-            'cer': cer(reference_text, hypothesis_text),
-            'wer': wer(reference_text, hypothesis_text),
-            'similarity': normalized_levenshtein(reference_text, hypothesis_text),
+            'cer': metrics.cer(reference_text, hypothesis_text),
+            'wer': metrics.wer(reference_text, hypothesis_text),
+            'similarity': metrics.normalized_levenshtein(reference_text, hypothesis_text),
             'length_reference': len(reference_text),
             'length_hypothesis': len(hypothesis_text),
             'length_ratio': len(hypothesis_text) / len(reference_text) if len(reference_text) > 0 else 0,
@@ -493,22 +850,90 @@ class OCRCoordinator:
         self,
         image_paths: List[str],
         engine: str = 'PaddleOCR',
+        micro_batch: int = 8,
         **kwargs
     ) -> List[Dict[str, Any]]:
-        """Пакетная обработка нескольких документов"""
+        """
+        Пакетная обработка нескольких документов
+
+        Для движков с пакетным API (PaddleOCR, TrOCR) изображения отправляются
+        в модель группами по micro_batch штук; если пакетный вызов не удался,
+        группа обрабатывается поштучно.
+
+        Args:
+            image_paths: Пути к изображениям
+            engine: Название OCR движка
+            micro_batch: Размер группы для одного вызова модели
+
+        Returns:
+            Список результатов в порядке image_paths
+        """
+        info = self.engines.get(engine)
+        if info is None or not info.available or info.batch_runner is None or micro_batch <= 1:
+            return [
+                self._process_with_progress(i, image_paths, engine, **kwargs)
+                for i in range(len(image_paths))
+            ]
+
+        language = kwargs.pop('language', 'ru')
+        use_llm = kwargs.pop('use_llm', False)
+        confidence_threshold = kwargs.pop('confidence_threshold', 0.5)
+
         results = []
+        for start in range(0, len(image_paths), micro_batch):
+            chunk = image_paths[start:start + micro_batch]
+            print(f"Обработка {start + 1}-{start + len(chunk)}/{len(image_paths)}")
 
-        for i, image_path in enumerate(image_paths):
-            print(f"Обработка {i+1}/{len(image_paths)}: {Path(image_path).name}")
-            result = self.process_document(
-                image_path=image_path,
-                engine=engine,
-                **kwargs
-            )
-            results.append(result)
+            try:
+                chunk_results = [
+                    self._finalize_result(result, image_path, engine, language, use_llm, confidence_threshold)
+                    for result, image_path in zip(info.batch_runner(chunk, language=language, **kwargs), chunk)
+                ]
+            except Exception as e:
+                print(f"⚠️ Пакетная обработка не удалась ({e}), обрабатываем поштучно")
+                results.extend(
+                    self.process_document(
+                        image_path=image_path,
+                        engine=engine,
+                        language=language,
+                        use_llm=use_llm,
+                        confidence_threshold=confidence_threshold,
+                        **kwargs
+                    )
+                    for image_path in chunk
+                )
+                continue
+
+            results.extend(chunk_results)
 
         return results
 
+    def _process_with_progress(self, i: int, image_paths: List[str], engine: str, **kwargs) -> Dict[str, Any]:
+        """Поштучная обработка с выводом прогресса"""
+        image_path = image_paths[i]
+        print(f"Обработка {i+1}/{len(image_paths)}: {os.path.basename(image_path)}")
+        return self.process_document(
+            image_path=image_path,
+            engine=engine,
+            **kwargs
+        )
+
+    def save_results(self, results: Union[Dict, List], out_path: str) -> str:
+        """
+        Сохранение результатов обработки в JSON
+
+        Args:
+            results: Результат process_document/compare_engines/batch_process
+            out_path: Путь для сохранения JSON файла
+
+        Returns:
+            Путь к сохраненному файлу
+        """
+        out_file = Path(out_path)
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        out_file.write_bytes(_dumps(results))
+        return str(out_file)
+
 
 # Пример использования
 if __name__ == "__main__":
@@ -544,4 +969,6 @@ if __name__ == "__main__":
             comparison = coordinator.compare_engines(test_image, engines=available[:2])
             print(f"📊 Успешно обработано: {comparison['summary']['successful_engines']}/{comparison['summary']['engines_tested']}")
     else:
-        print(f"\n⚠️  Тестовый файл не найден: {test_image}")
\ No newline at end of file
+        print(f"\n⚠️  Тестовый файл не найден: {test_image}")
+
+    coordinator.close()
\ No newline at end of file
@@ -3,22 +3,149 @@ ocr_paddle.py - PaddleOCR wrapper для распознавания кирилл
 Обеспечивает извлечение текста с bbox и confidence.
 """
 
+import gc
+import hashlib
+import importlib.util
 import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
 import numpy as np
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional, Union
-from paddleocr import PaddleOCR
-import cv2
-from PIL import Image
+from typing import TYPE_CHECKING, Callable, List, Dict, Tuple, Optional, Union
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
+# paddleocr, cv2 и PIL импортируются при первом использовании: импорт Paddle занимает секунды,
+# а сортировка, извлечение текста и сохранение результатов в них не нуждаются
+if TYPE_CHECKING:
+    from paddleocr import PaddleOCR
 
-# Глобальный объект PaddleOCR для эффективности
-_paddle_instance = None
+PADDLE_AVAILABLE = all(
+    importlib.util.find_spec(module) is not None for module in ('paddleocr', 'cv2', 'PIL')
+)
 
+__all__ = [
+    'IMAGE_EXTENSIONS',
+    'PADDLE_AVAILABLE',
+    'ReadingOrder',
+    'add_multi_document',
+    'compare_with_tesseract',
+    'get_paddle_instance',
+    'get_plaintext',
+    'normalize_legacy_format',
+    'normalize_paddle_output',
+    'process_document',
+    'run_paddle',
+    'run_paddle_batch',
+    'save_paddle_output',
+    'sort_by_reading_order',
+    'visualize_results',
+]
 
-def get_paddle_instance(lang: str = 'ru', use_angle_cls: bool = True) -> PaddleOCR:
+# Быстрая сериализация JSON (orjson), с откатом на стандартный json
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        """Сериализация объекта в JSON (bytes) с отступами"""
+        return orjson.dumps(
+            obj,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        )
+except ImportError:
+    def _dumps(obj) -> bytes:
+        """Сериализация объекта в JSON (bytes) с отступами"""
+        return json.dumps(
+            obj,
+            ensure_ascii=False,
+            indent=2,
+            default=lambda o: o.tolist() if hasattr(o, 'tolist') else str(o)
+        ).encode('utf-8')
+
+logger = logging.getLogger(__name__)
+
+# Служебный вывод PaddleOCR (ppocr - 2.x, paddleocr/paddlex - 3.x) оставляем только для ошибок
+for _name in ('ppocr', 'paddleocr', 'paddlex'):
+    logging.getLogger(_name).setLevel(logging.ERROR)
+
+# Поддерживаемые форматы изображений
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+
+# Потоки для чтения изображений в run_paddle_batch на CPU
+_LOADER_THREADS = 2
+
+# Изображения с большей стороной больше PADDLE_MAX_SIDE декодируются сразу уменьшенными
+# (в 2/4/8 раз); 0 - не уменьшать. PaddleOCR все равно ограничивает вход ~4000 px.
+PADDLE_MAX_SIDE = int(os.environ.get('PADDLE_MAX_SIDE', '4000'))
+
+# Флаги OpenCV для уменьшения при декодировании
+_REDUCED_READ_FLAGS = {
+    2: 'IMREAD_REDUCED_COLOR_2',
+    4: 'IMREAD_REDUCED_COLOR_4',
+    8: 'IMREAD_REDUCED_COLOR_8',
+}
+
+# Повторы OCR при нехватке памяти: число попыток и признаки ошибки в тексте исключения
+_OCR_MAX_ATTEMPTS = 3
+_RE_OUT_OF_MEMORY = re.compile(r'out of memory|\bOOM\b|CUDA|ResourceExhausted', re.IGNORECASE)
+
+# Размер очередей между стадиями конвейера add_multi_document
+_PIPELINE_QUEUE_SIZE = 4
+
+# Маркер конца потока данных в конвейере
+_PIPELINE_DONE = object()
+
+# Режим экономии памяти: распознавание и классификация по одной строке, меньше
+# арен памяти у движка инференса. По умолчанию включен на CPU (пакеты строк там
+# не ускоряют распознавание) и выключен на GPU; PADDLE_LOW_MEM=1/0 задает явно.
+PADDLE_LOW_MEM = {'1': True, '0': False}.get(os.environ.get('PADDLE_LOW_MEM', ''))
+
+# Высокопроизводительный инференс PaddleOCR (enable_hpi): сам выбирает OpenVINO /
+# ONNX Runtime / TensorRT, на GPU - FP16. Нужны дополнительные пакеты PaddleX
+# (paddlex --install hpi-cpu / hpi-gpu); без них используется обычный инференс.
+# PADDLE_HPI=0 отключает.
+PADDLE_HPI = os.environ.get('PADDLE_HPI', '1') == '1'
+
+# Локальные инференс-модели (статический граф: inference.json/.pdmodel + .pdiparams)
+# в подпапках det/, rec/, cls/. Модели загружаются из них без скачивания и проверки
+# официальных моделей; должны соответствовать моделям по умолчанию для языка.
+PADDLE_MODEL_DIR = os.environ.get('PADDLE_MODEL_DIR')
+
+# Подпапка PADDLE_MODEL_DIR -> параметр PaddleOCR
+_MODEL_DIR_OPTIONS = (
+    ('det', 'text_detection_model_dir'),
+    ('rec', 'text_recognition_model_dir'),
+    ('cls', 'textline_orientation_model_dir'),
+)
+
+# Кэш результатов run_paddle по хэшу содержимого файла (LRU)
+_OCR_CACHE_SIZE = 128
+_OCR_CACHE_MAX_BYTES = 8 * 1024 * 1024  # большие файлы не хэшируем и не кэшируем
+
+# Директория для сохранения кэша между запусками (например, .paddle_cache); не задана - только память
+PADDLE_CACHE_DIR = os.environ.get('PADDLE_CACHE_DIR')
+
+_ocr_cache: "OrderedDict[Tuple[str, str], List[Dict]]" = OrderedDict()
+_ocr_cache_lock = threading.Lock()
+
+# Экземпляры PaddleOCR по ключу (lang, use_angle_cls) - модели загружаются один раз
+_paddle_instances: Dict[Tuple[str, bool], "PaddleOCR"] = {}
+_paddle_instances_lock = threading.Lock()
+
+
+def get_paddle_instance(lang: str = 'ru', use_angle_cls: bool = True) -> "PaddleOCR":
     """
-    Получает или создает единственный экземпляр PaddleOCR.
+    Получает или создает экземпляр PaddleOCR для заданных языка и настроек.
     
     Args:
         lang: Язык для распознавания ('ru', 'en', 'ch')
@@ -27,17 +154,345 @@ def get_paddle_instance(lang: str = 'ru', use_angle_cls: bool = True) -> PaddleO
     Returns:
         Экземпляр PaddleOCR
     """
-    global _paddle_instance
+    key = (lang, use_angle_cls)
+    instance = _paddle_instances.get(key)
+    if instance is not None:
+        return instance
+    
+    with _paddle_instances_lock:
+        instance = _paddle_instances.get(key)
+        if instance is not None:
+            return instance
+        
+        logger.info("Инициализация PaddleOCR (%s)...", lang)
+        from paddleocr import PaddleOCR
+        
+        options = {}
+        low_mem = PADDLE_LOW_MEM if PADDLE_LOW_MEM is not None else not _use_gpu()
+        if low_mem:
+            options.update(rec_batch_num=1, cls_batch_num=1, cpu_threads=os.cpu_count() or 1)
+        options.update(_local_model_dirs(use_angle_cls))
+        
+        instance = None
+        if PADDLE_HPI:
+            hpi_options = dict(options, enable_hpi=True)
+            if _use_gpu():
+                hpi_options['precision'] = 'fp16'
+            else:
+                hpi_options['cpu_threads'] = os.cpu_count() or 1
+            try:
+                instance = PaddleOCR(use_angle_cls=use_angle_cls, lang=lang, **hpi_options)
+            except Exception as e:
+                logger.warning("HPI инференс PaddleOCR недоступен (%s), используется обычный", e)
+        
+        if instance is None:
+            instance = PaddleOCR(
+                use_angle_cls=use_angle_cls,
+                lang=lang,
+                **options
+            )
+        logger.info("PaddleOCR инициализирован")
+        _paddle_instances[key] = instance
+    
+    return instance
+
+
+def _local_model_dirs(use_angle_cls: bool) -> Dict[str, str]:
+    """Параметры PaddleOCR для моделей из PADDLE_MODEL_DIR (только существующие подпапки)"""
+    if not PADDLE_MODEL_DIR:
+        return {}
     
-    if _paddle_instance is None:
-        print("Инициализация PaddleOCR...")
-        _paddle_instance = PaddleOCR(
-            use_angle_cls=use_angle_cls,
-            lang=lang
-        )
-        print("PaddleOCR инициализирован")
+    options = {}
+    for subdir, option in _MODEL_DIR_OPTIONS:
+        if subdir == 'cls' and not use_angle_cls:
+            continue
+        model_dir = os.path.join(PADDLE_MODEL_DIR, subdir)
+        if os.path.isdir(model_dir):
+            options[option] = model_dir
+    if options:
+        logger.info("Локальные модели PaddleOCR: %s", ', '.join(options.values()))
+    return options
+
+
+# Порядок столбцов в матрице метрик bbox
+_BBOX_KEYS = ('left', 'top', 'right', 'bottom', 'width', 'height', 'center_x', 'center_y')
+
+
+def _stack_polys(polys) -> Optional[np.ndarray]:
+    """
+    Собирает полигоны в массив (N, P, 2), если все они одной формы.
+    
+    Returns:
+        Массив float64 или None, если полигоны разной длины/невалидны
+    """
+    if len(polys) == 0:
+        return None
+    try:
+        arr = np.asarray(polys, dtype=np.float64)
+    except (ValueError, TypeError):
+        return None
+    if arr.ndim != 3 or arr.shape[1] == 0 or arr.shape[2] < 2:
+        return None
+    return arr[:, :, :2]
+
+
+def _bbox_metrics(polys: np.ndarray) -> np.ndarray:
+    """
+    Вычисляет метрики bbox для массива полигонов (N, P, 2).
+    
+    Returns:
+        Матрица (N, 8) со столбцами в порядке _BBOX_KEYS
+    """
+    if NUMBA_AVAILABLE:
+        return _bbox_metrics_jit(np.ascontiguousarray(polys))
+    
+    mins = polys.min(axis=1)
+    maxs = polys.max(axis=1)
+    return np.concatenate([mins, maxs, maxs - mins, (mins + maxs) * 0.5], axis=1)
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _bbox_metrics_jit(polys):
+        """Скомпилированный вариант _bbox_metrics: один проход по точкам каждого полигона."""
+        n, n_points = polys.shape[0], polys.shape[1]
+        out = np.empty((n, 8), dtype=polys.dtype)
+        for i in prange(n):
+            left = right = polys[i, 0, 0]
+            top = bottom = polys[i, 0, 1]
+            for j in range(1, n_points):
+                x = polys[i, j, 0]
+                y = polys[i, j, 1]
+                left = min(left, x)
+                right = max(right, x)
+                top = min(top, y)
+                bottom = max(bottom, y)
+            out[i, 0] = left
+            out[i, 1] = top
+            out[i, 2] = right
+            out[i, 3] = bottom
+            out[i, 4] = right - left
+            out[i, 5] = bottom - top
+            out[i, 6] = (left + right) * 0.5
+            out[i, 7] = (top + bottom) * 0.5
+        return out
+
+
+def _build_items(
+    boxes: List[List[List[float]]],
+    texts: List[str],
+    confs: List[float],
+    polys: Optional[np.ndarray] = None
+) -> List[Dict]:
+    """
+    Собирает нормализованные элементы OCR, вычисляя метрики bbox векторно.
+    
+    Args:
+        boxes: Координаты углов bbox для каждого элемента
+        texts: Распознанные тексты
+        confs: Уверенности распознавания
+        polys: Уже собранный массив полигонов (N, P, 2), если есть
+    
+    Returns:
+        Список словарей с полями box, text, conf и метриками bbox
+    """
+    if not boxes:
+        return []
+    
+    if polys is None:
+        polys = _stack_polys(boxes)
+    
+    if polys is not None:
+        metrics = _bbox_metrics(polys).tolist()
+    else:
+        # Полигоны с разным числом точек - считаем по отдельности
+        metrics = [
+            _bbox_metrics(np.asarray(box, dtype=np.float64)[np.newaxis]).tolist()[0]
+            for box in boxes
+        ]
+    
+    return [
+        {'box': box, 'text': text, 'conf': float(conf), **dict(zip(_BBOX_KEYS, row))}
+        for box, text, conf, row in zip(boxes, texts, confs, metrics)
+    ]
+
+
+def _decode_rec_fields(result_obj) -> Optional[Tuple]:
+    """
+    Прямой доступ к полям OCRResult PaddleOCR 3.x без перебора способов.
     
-    return _paddle_instance
+    Returns:
+        (rec_texts, rec_scores, rec_polys) или None, если полей rec_* нет
+    """
+    if not hasattr(result_obj, 'get'):
+        return None
+    try:
+        if 'rec_texts' not in result_obj:
+            return None
+    except TypeError:
+        return None
+    return result_obj['rec_texts'], result_obj.get('rec_scores'), result_obj.get('rec_polys')
+
+
+# Способ 1: Проверяем методы словаря
+def _decode_via_keys(result_obj) -> Optional[Tuple]:
+    keys = list(result_obj.keys())
+    logger.debug("OCRResult keys: %s", keys)
+    
+    rec_texts = rec_scores = rec_polys = None
+    for key in ['rec_texts', 'texts', 'text']:
+        if key in keys:
+            rec_texts = result_obj[key]
+            break
+    
+    if rec_texts is None:
+        return None
+    
+    for key in ['rec_scores', 'scores', 'confidences']:
+        if key in keys:
+            rec_scores = result_obj[key]
+            break
+    
+    for key in ['rec_polys', 'polys', 'boxes', 'coordinates']:
+        if key in keys:
+            rec_polys = result_obj[key]
+            break
+    
+    return rec_texts, rec_scores, rec_polys
+
+
+# Способ 2: Используем метод get
+def _decode_via_get(result_obj) -> Optional[Tuple]:
+    rec_texts = result_obj.get('rec_texts', result_obj.get('texts', result_obj.get('text', [])))
+    rec_scores = result_obj.get('rec_scores', result_obj.get('scores', result_obj.get('confidences', [])))
+    rec_polys = result_obj.get('rec_polys', result_obj.get('polys', result_obj.get('boxes', [])))
+    return rec_texts, rec_scores, rec_polys
+
+
+# Способ 3: Проверяем метод json()
+def _decode_via_json(result_obj) -> Optional[Tuple]:
+    json_data = result_obj.json()
+    logger.debug("JSON data type: %s", type(json_data).__name__)
+    
+    if isinstance(json_data, dict):
+        return (json_data.get('rec_texts', json_data.get('texts', [])),
+                json_data.get('rec_scores', json_data.get('scores', [])),
+                json_data.get('rec_polys', json_data.get('polys', [])))
+    
+    if not isinstance(json_data, list) or len(json_data) == 0:
+        return None
+    
+    # Проверяем структуру первого элемента
+    first_item = json_data[0]
+    
+    if isinstance(first_item, dict):
+        # Это может быть словарь с результатами OCR
+        if 'rec_texts' in first_item:
+            return (first_item['rec_texts'],
+                    first_item.get('rec_scores', []),
+                    first_item.get('rec_polys', []))
+        if 'text' in first_item:
+            # Возможно это отдельные элементы
+            return ([item.get('text', '') for item in json_data if 'text' in item],
+                    [item.get('score', item.get('confidence', 1.0)) for item in json_data],
+                    [item.get('poly', item.get('box', [])) for item in json_data])
+        return None
+    
+    if isinstance(first_item, list) and len(first_item) >= 2:
+        # Старый формат: [[bbox, (text, score)], ...]
+        rec_texts, rec_scores, rec_polys = [], [], []
+        for item in json_data:
+            if isinstance(item, list) and len(item) >= 2:
+                bbox, text_info = item[0], item[1]
+                if isinstance(text_info, list) and len(text_info) >= 2:
+                    rec_texts.append(text_info[0])
+                    rec_scores.append(text_info[1])
+                    rec_polys.append(bbox)
+        logger.debug("Extracted %d items from legacy JSON", len(rec_texts))
+        return rec_texts, rec_scores, rec_polys
+    
+    # Возможно это список текстов напрямую (заглушки для scores и координат)
+    return json_data, [1.0] * len(json_data), [[] for _ in json_data]
+
+
+# Способ 4: Проверяем items()
+def _decode_via_items(result_obj) -> Optional[Tuple]:
+    items_dict = dict(result_obj.items())
+    return (items_dict.get('rec_texts', items_dict.get('texts', [])),
+            items_dict.get('rec_scores', items_dict.get('scores', [])),
+            items_dict.get('rec_polys', items_dict.get('polys', [])))
+
+
+# Способ 5: Прямой доступ к атрибутам
+def _decode_via_attrs(result_obj) -> Optional[Tuple]:
+    rec_texts = getattr(result_obj, 'rec_texts', None)
+    if rec_texts is None:
+        return None
+    return (rec_texts,
+            getattr(result_obj, 'rec_scores', None),
+            getattr(result_obj, 'rec_polys', None))
+
+
+# Способ 6: Проверяем __dict__ если атрибуты не найдены
+def _decode_via_dict(result_obj) -> Optional[Tuple]:
+    obj_dict = result_obj.__dict__
+    return (obj_dict.get('rec_texts', []),
+            obj_dict.get('rec_scores', []),
+            obj_dict.get('rec_polys', []))
+
+
+# Способы в порядке проверки: (обязательный атрибут объекта, декодер)
+_DECODERS = (
+    ('keys', _decode_via_keys),
+    ('get', _decode_via_get),
+    ('json', _decode_via_json),
+    ('items', _decode_via_items),
+    ('rec_texts', _decode_via_attrs),
+    ('__dict__', _decode_via_dict),
+)
+
+# Сработавший декодер для каждого типа результата - чтобы не перебирать способы на каждой странице
+_decoder_cache: Dict[type, Callable] = {}
+
+
+def _decode_ocr_result(result_obj) -> Tuple:
+    """
+    Извлекает (rec_texts, rec_scores, rec_polys) из объекта OCRResult.
+    
+    OCRResult PaddleOCR 3.x читается напрямую по ключам rec_*. Для остальных
+    форматов способы доступа перебираются один раз для каждого типа результата,
+    затем используется закэшированный декодер.
+    """
+    decoded = _decode_rec_fields(result_obj)
+    if decoded is not None:
+        return decoded
+    
+    obj_type = type(result_obj)
+    decoder = _decoder_cache.get(obj_type)
+    if decoder is not None:
+        try:
+            decoded = decoder(result_obj)
+        except Exception as e:
+            logger.debug("Cached decoder %s failed: %s", decoder.__name__, e)
+            decoded = None
+        if decoded is not None and decoded[0] is not None:
+            return decoded
+    
+    for attr, decoder in _DECODERS:
+        if not hasattr(result_obj, attr):
+            continue
+        try:
+            decoded = decoder(result_obj)
+        except Exception as e:
+            logger.debug("Error in %s: %s", decoder.__name__, e,
+                         exc_info=logger.isEnabledFor(logging.DEBUG))
+            continue
+        if decoded is not None and decoded[0] is not None:
+            logger.debug("Using %s for %s", decoder.__name__, obj_type.__name__)
+            _decoder_cache[obj_type] = decoder
+            return decoded
+    
+    return None, None, None
 
 
 def normalize_paddle_output(raw_output: List) -> List[Dict]:
@@ -55,242 +510,129 @@ def normalize_paddle_output(raw_output: List) -> List[Dict]:
     
     # Проверяем тип результата
     result_obj = raw_output[0]
-    print(f"DEBUG: PaddleOCR result type: {type(result_obj)}")
-    
-    # Проверим класс объекта более подробно
-    class_name = str(type(result_obj).__name__)
-    print(f"DEBUG: Class name: {class_name}")
+    class_name = type(result_obj).__name__
+    logger.debug("PaddleOCR result type: %s", class_name)
     
     # Новый формат: OCRResult объект (проверяем по имени класса тоже)
-    is_ocr_result = (class_name == 'OCRResult' or 
+    is_ocr_result = (_decode_rec_fields(result_obj) is not None or
+                     class_name == 'OCRResult' or 
                      hasattr(result_obj, 'rec_texts') or 
                      hasattr(result_obj, 'rec_scores') or 
                      hasattr(result_obj, 'rec_polys'))
     
     if is_ocr_result:
-        print("DEBUG: Using new OCRResult format")
-        
-        # Debug: посмотрим что доступно в объекте
-        print(f"DEBUG: Available attributes: {[attr for attr in dir(result_obj) if not attr.startswith('_')]}")
+        logger.debug("Using new OCRResult format")
         
-        # Пробуем разные способы получить данные
-        rec_texts = None
-        rec_scores = None
-        rec_polys = None
+        rec_texts, rec_scores, rec_polys = _decode_ocr_result(result_obj)
         
-        # Способ 1: Проверяем методы словаря
-        if hasattr(result_obj, 'keys'):
-            try:
-                keys = list(result_obj.keys())
-                print(f"DEBUG: OCRResult keys: {keys}")
-                
-                # Пробуем обычные ключи
-                for key in ['rec_texts', 'texts', 'text']:
-                    if key in keys:
-                        rec_texts = result_obj[key]
-                        print(f"DEBUG: Found texts via key '{key}': {len(rec_texts) if rec_texts else 0}")
-                        break
-                        
-                for key in ['rec_scores', 'scores', 'confidences']:
-                    if key in keys:
-                        rec_scores = result_obj[key]
-                        print(f"DEBUG: Found scores via key '{key}': {len(rec_scores) if rec_scores else 0}")
-                        break
-                        
-                for key in ['rec_polys', 'polys', 'boxes', 'coordinates']:
-                    if key in keys:
-                        rec_polys = result_obj[key]
-                        print(f"DEBUG: Found polys via key '{key}': {len(rec_polys) if rec_polys else 0}")
-                        break
-            except Exception as e:
-                print(f"DEBUG: Error accessing keys: {e}")
-        
-        # Способ 2: Используем метод get
-        if rec_texts is None and hasattr(result_obj, 'get'):
-            try:
-                rec_texts = result_obj.get('rec_texts', result_obj.get('texts', result_obj.get('text', [])))
-                rec_scores = result_obj.get('rec_scores', result_obj.get('scores', result_obj.get('confidences', [])))
-                rec_polys = result_obj.get('rec_polys', result_obj.get('polys', result_obj.get('boxes', [])))
-                print(f"DEBUG: Got via get() - texts: {len(rec_texts) if rec_texts else 0}, scores: {len(rec_scores) if rec_scores else 0}, polys: {len(rec_polys) if rec_polys else 0}")
-            except Exception as e:
-                print(f"DEBUG: Error using get(): {e}")
-        
-        # Способ 3: Проверяем метод json()
-        if rec_texts is None and hasattr(result_obj, 'json'):
-            try:
-                json_data = result_obj.json()
-                print(f"DEBUG: JSON data type: {type(json_data)}")
-                if isinstance(json_data, dict):
-                    print(f"DEBUG: JSON keys: {list(json_data.keys())}")
-                    rec_texts = json_data.get('rec_texts', json_data.get('texts', []))
-                    rec_scores = json_data.get('rec_scores', json_data.get('scores', []))
-                    rec_polys = json_data.get('rec_polys', json_data.get('polys', []))
-                elif isinstance(json_data, list) and len(json_data) > 0:
-                    print(f"DEBUG: JSON is list with {len(json_data)} items")
-                    # Проверяем структуру первого элемента
-                    first_item = json_data[0]
-                    print(f"DEBUG: First JSON item type: {type(first_item)}")
-                    
-                    if isinstance(first_item, dict):
-                        # Это может быть словарь с результатами OCR
-                        print(f"DEBUG: First item keys: {list(first_item.keys())}")
-                        # Пытаемся найти текстовые данные
-                        if 'rec_texts' in first_item:
-                            rec_texts = first_item['rec_texts']
-                            rec_scores = first_item.get('rec_scores', [])
-                            rec_polys = first_item.get('rec_polys', [])
-                        elif 'text' in first_item:
-                            # Возможно это отдельные элементы
-                            rec_texts = [item.get('text', '') for item in json_data if 'text' in item]
-                            rec_scores = [item.get('score', item.get('confidence', 1.0)) for item in json_data]
-                            rec_polys = [item.get('poly', item.get('box', [])) for item in json_data]
-                    elif isinstance(first_item, list) and len(first_item) >= 2:
-                        # Старый формат: [[bbox, (text, score)], ...]
-                        print("DEBUG: Detected legacy format in JSON")
-                        rec_texts = []
-                        rec_scores = []
-                        rec_polys = []
-                        
-                        for item in json_data:
-                            if isinstance(item, list) and len(item) >= 2:
-                                bbox = item[0]
-                                text_info = item[1]
-                                
-                                if isinstance(text_info, list) and len(text_info) >= 2:
-                                    text = text_info[0]
-                                    score = text_info[1]
-                                    
-                                    rec_texts.append(text)
-                                    rec_scores.append(score)
-                                    rec_polys.append(bbox)
-                                    
-                        print(f"DEBUG: Extracted from legacy JSON - texts: {len(rec_texts)}, scores: {len(rec_scores)}, polys: {len(rec_polys)}")
-                    else:
-                        # Возможно это список текстов напрямую
-                        rec_texts = json_data
-                        rec_scores = [1.0] * len(json_data)  # Заглушка для scores
-                        rec_polys = [[] for _ in json_data]  # Заглушка для координат
-            except Exception as e:
-                print(f"DEBUG: Error using json(): {e}")
-                import traceback
-                traceback.print_exc()
-        
-        # Способ 4: Проверяем items()
-        if rec_texts is None and hasattr(result_obj, 'items'):
-            try:
-                items = list(result_obj.items())
-                print(f"DEBUG: Items: {items[:3]}...")  # Показываем первые 3 элемента
-                items_dict = dict(items)
-                rec_texts = items_dict.get('rec_texts', items_dict.get('texts', []))
-                rec_scores = items_dict.get('rec_scores', items_dict.get('scores', []))
-                rec_polys = items_dict.get('rec_polys', items_dict.get('polys', []))
-            except Exception as e:
-                print(f"DEBUG: Error using items(): {e}")
-        
-        # Способ 5: Прямой доступ к атрибутам (как было раньше)
-        if rec_texts is None:
-            if hasattr(result_obj, 'rec_texts'):
-                rec_texts = getattr(result_obj, 'rec_texts', [])
-                print(f"DEBUG: Got rec_texts via attribute: {len(rec_texts) if rec_texts else 0}")
-            
-            if hasattr(result_obj, 'rec_scores'):
-                rec_scores = getattr(result_obj, 'rec_scores', [])
-                print(f"DEBUG: Got rec_scores via attribute: {len(rec_scores) if rec_scores else 0}")
-            
-            if hasattr(result_obj, 'rec_polys'):
-                rec_polys = getattr(result_obj, 'rec_polys', [])
-                print(f"DEBUG: Got rec_polys via attribute: {len(rec_polys) if rec_polys else 0}")
-                
-        # Способ 6: Проверяем __dict__ если атрибуты не найдены
-        if rec_texts is None and hasattr(result_obj, '__dict__'):
-            obj_dict = result_obj.__dict__
-            print(f"DEBUG: Object dict keys: {list(obj_dict.keys())}")
-            rec_texts = obj_dict.get('rec_texts', [])
-            rec_scores = obj_dict.get('rec_scores', [])
-            rec_polys = obj_dict.get('rec_polys', [])
-            
         # Убеждаемся что у нас есть списки
         rec_texts = rec_texts or []
         rec_scores = rec_scores or []
         rec_polys = rec_polys or []
         
-        print(f"DEBUG: Final counts - texts: {len(rec_texts)}, scores: {len(rec_scores)}, polys: {len(rec_polys)}")
+        logger.debug("Final counts - texts: %d, scores: %d, polys: %d",
+                     len(rec_texts), len(rec_scores), len(rec_polys))
         
-        if len(rec_texts) > 0:
-            print(f"DEBUG: First text: {rec_texts[0]}")
-        if len(rec_scores) > 0:
-            print(f"DEBUG: First score: {rec_scores[0]}")
-        if len(rec_polys) > 0:
-            print(f"DEBUG: First poly: {rec_polys[0]}")
+        n_items = min(len(rec_texts), len(rec_scores), len(rec_polys))
+        polys = _stack_polys(rec_polys[:n_items])
         
-        normalized = []
-        
-        # Объединяем данные из трех списков
-        for i in range(min(len(rec_texts), len(rec_scores), len(rec_polys))):
-            try:
-                text = rec_texts[i] if i < len(rec_texts) else ""
-                conf = rec_scores[i] if i < len(rec_scores) else 0.0
-                poly = rec_polys[i] if i < len(rec_polys) else []
-                
-                print(f"DEBUG: Item {i}: text='{text}', conf={conf}, poly={poly}")
-                
-                if not text or not poly:
-                    continue
-                
-                # Обрабатываем координаты полигона
-                box = []
-                if isinstance(poly, (list, tuple)) and len(poly) > 0:
+        if polys is not None:
+            # Быстрый путь: все полигоны одной формы - считаем метрики одним проходом NumPy
+            keep = [i for i in range(n_items) if rec_texts[i]]
+            polys = polys[keep]
+            normalized = _build_items(
+                polys.tolist(),
+                [rec_texts[i] for i in keep],
+                [rec_scores[i] for i in keep],
+                polys
+            )
+        else:
+            boxes, texts, confs = [], [], []
+            
+            # Объединяем данные из трех списков
+            for i in range(n_items):
+                try:
+                    text = rec_texts[i] if i < len(rec_texts) else ""
+                    conf = rec_scores[i] if i < len(rec_scores) else 0.0
+                    poly = rec_polys[i] if i < len(rec_polys) else []
+                    
+                    if not text or len(poly) == 0:
+                        continue
+                    
+                    # Обрабатываем координаты полигона
+                    box = []
                     for point in poly:
                         try:
-                            if isinstance(point, (list, tuple)) and len(point) >= 2:
+                            if len(point) >= 2:
                                 x = float(point[0])
                                 y = float(point[1])
                                 box.append([x, y])
                         except (ValueError, TypeError, IndexError) as e:
-                            print(f"Warning: Could not convert point {point}: {e}")
+                            logger.warning("Could not convert point %s: %s", point, e)
                             continue
-                
-                # Проверяем, что у нас есть валидные координаты
-                if not box:
-                    print(f"Warning: No valid coordinates for text '{text}', skipping")
+                    
+                    # Проверяем, что у нас есть валидные координаты
+                    if not box:
+                        logger.warning("No valid coordinates for text '%s', skipping", text)
+                        continue
+                    
+                    boxes.append(box)
+                    texts.append(text)
+                    confs.append(float(conf))
+                    
+                except Exception as e:
+                    logger.warning("Error processing item %d: %s", i, e)
                     continue
-                
-                # Вычисляем дополнительные метрики bbox
-                x_coords = [p[0] for p in box]
-                y_coords = [p[1] for p in box]
-                
-                normalized.append({
-                    'box': box,
-                    'text': text,
-                    'conf': float(conf),
-                    'left': min(x_coords),
-                    'top': min(y_coords),
-                    'right': max(x_coords),
-                    'bottom': max(y_coords),
-                    'width': max(x_coords) - min(x_coords),
-                    'height': max(y_coords) - min(y_coords),
-                    'center_x': (min(x_coords) + max(x_coords)) / 2,
-                    'center_y': (min(y_coords) + max(y_coords)) / 2
-                })
-                
-            except Exception as e:
-                print(f"Error processing item {i}: {e}")
-                continue
+            
+            normalized = _build_items(boxes, texts, confs)
         
-        print(f"DEBUG: Normalized {len(normalized)} items")
+        logger.debug("Normalized %d items", len(normalized))
         return normalized
     
     # Старый формат: список кортежей (оставляем для совместимости)
     else:
-        print("DEBUG: Trying legacy format")
+        logger.debug("Trying legacy format")
         return normalize_legacy_format(raw_output)
 
 
+def _normalize_legacy_fast(lines: List) -> Optional[List[Dict]]:
+    """
+    Старый формат, когда все строки корректны: полигоны собираются в один массив
+    и метрики считаются одним проходом NumPy, без разбора каждой точки.
+    
+    Returns:
+        Нормализованные элементы или None, если есть строки, требующие поштучной обработки
+    """
+    if not all(
+        isinstance(line, (list, tuple)) and len(line) >= 2
+        and isinstance(line[1], (list, tuple)) and len(line[1]) >= 2
+        for line in lines
+    ):
+        return None
+    
+    polys = _stack_polys([line[0] for line in lines])
+    if polys is None:
+        return None
+    
+    try:
+        confs = np.asarray([line[1][1] for line in lines], dtype=np.float64)
+    except (ValueError, TypeError):
+        return None
+    
+    keep = [i for i, line in enumerate(lines) if line[1][0]]
+    polys = polys[keep]
+    return _build_items(polys.tolist(), [lines[i][1][0] for i in keep], confs[keep].tolist(), polys)
+
+
 def normalize_legacy_format(raw_output: List) -> List[Dict]:
     """
     Обрабатывает старый формат PaddleOCR (список кортежей)
     """
-    normalized = []
+    fast = _normalize_legacy_fast(raw_output[0]) if isinstance(raw_output[0], (list, tuple)) else None
+    if fast is not None:
+        return fast
+    
+    boxes, texts, confs = [], [], []
     
     try:
         for line_idx, line in enumerate(raw_output[0]):
@@ -322,40 +664,27 @@ def normalize_legacy_format(raw_output: List) -> List[Dict]:
                 if not box or not text:
                     continue
                 
-                # Вычисляем дополнительные метрики bbox
-                x_coords = [p[0] for p in box]
-                y_coords = [p[1] for p in box]
-                
-                normalized.append({
-                    'box': box,
-                    'text': text,
-                    'conf': float(conf),
-                    'left': min(x_coords),
-                    'top': min(y_coords),
-                    'right': max(x_coords),
-                    'bottom': max(y_coords),
-                    'width': max(x_coords) - min(x_coords),
-                    'height': max(y_coords) - min(y_coords),
-                    'center_x': (min(x_coords) + max(x_coords)) / 2,
-                    'center_y': (min(y_coords) + max(y_coords)) / 2
-                })
+                boxes.append(box)
+                texts.append(text)
+                confs.append(float(conf))
                 
             except Exception as e:
-                print(f"Error processing legacy line {line_idx}: {e}")
+                logger.warning("Error processing legacy line %d: %s", line_idx, e)
                 continue
                 
     except Exception as e:
-        print(f"Error in legacy format processing: {e}")
+        logger.warning("Error in legacy format processing: %s", e)
     
-    return normalized
+    # Метрики bbox считаем одним проходом для всех строк
+    return _build_items(boxes, texts, confs)
 
 
-def run_paddle(path: str, lang: str = 'ru') -> List[Dict]:
+def run_paddle(path: Union[str, np.ndarray], lang: str = 'ru') -> List[Dict]:
     """
     Выполняет OCR с помощью PaddleOCR.
     
     Args:
-        path: Путь к изображению
+        path: Путь к изображению или уже декодированное изображение (BGR, как у cv2)
         lang: Язык для распознавания
     
     Returns:
@@ -367,28 +696,324 @@ def run_paddle(path: str, lang: str = 'ru') -> List[Dict]:
         - width, height: размеры bbox
         - center_x, center_y: центр bbox
     """
+    if isinstance(path, np.ndarray):
+        return _run_paddle_array(path, lang)
+    
+    file_path = _check_image_path(path)
+    
+    # Повторное распознавание того же содержимого берем из кэша
+    digest = _file_digest(file_path)
+    cache_key = (digest, lang)
+    if digest is not None:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+    
+    # Получаем экземпляр PaddleOCR
+    ocr = get_paddle_instance(lang=lang)
+    
+    # Выполняем OCR по уже декодированному изображению (большие - по уменьшенной копии),
+    # путь передается PaddleOCR только если декодировать не удалось
+    image, scale = _read_image_scaled(file_path)
+    result, scale = _ocr_with_retry(ocr, file_path, image, scale)
+    
+    normalized = _postprocess_result(result, scale)
+    if digest is not None and normalized:
+        _cache_put(cache_key, normalized)
+    return normalized
+
+
+def _run_paddle_array(image: np.ndarray, lang: str) -> List[Dict]:
+    """run_paddle для уже декодированного изображения (файл повторно не читается)."""
+    digest = _array_digest(image)
+    cache_key = (digest, lang)
+    if digest is not None:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+    
+    ocr = get_paddle_instance(lang=lang)
+    
+    # Большие изображения распознаем по прореженной копии
+    scale = _factor_for_side(max(image.shape[:2]), PADDLE_MAX_SIDE)
+    if scale != 1:
+        image = np.ascontiguousarray(image[::scale, ::scale])
+    result, scale = _ocr_with_retry(ocr, None, image, scale)
+    
+    normalized = _postprocess_result(result, scale)
+    if digest is not None and normalized:
+        _cache_put(cache_key, normalized)
+    return normalized
+
+
+def _array_digest(image: np.ndarray) -> Optional[str]:
+    """Хэш пикселей изображения для кэша OCR (None для слишком больших изображений)."""
+    if image.nbytes > _OCR_CACHE_MAX_BYTES:
+        return None
+    digest = hashlib.blake2b(str(image.shape).encode(), digest_size=16)
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def _file_digest(file_path: Path) -> Optional[str]:
+    """Хэш содержимого файла для кэша OCR (None для слишком больших файлов)."""
+    if file_path.stat().st_size > _OCR_CACHE_MAX_BYTES:
+        return None
+    return hashlib.blake2b(file_path.read_bytes(), digest_size=16).hexdigest()
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[List[Dict]]:
+    """Возвращает копию закэшированного результата OCR или None."""
+    with _ocr_cache_lock:
+        cached = _ocr_cache.get(key)
+        if cached is not None:
+            _ocr_cache.move_to_end(key)
+    
+    if cached is None and PADDLE_CACHE_DIR:
+        sidecar = Path(PADDLE_CACHE_DIR) / f"{key[0]}_{key[1]}.json"
+        if sidecar.exists():
+            try:
+                cached = json.loads(sidecar.read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read OCR cache %s: %s", sidecar, e)
+            else:
+                _cache_put(key, cached, persist=False)
+    
+    if cached is None:
+        return None
+    # Копируем элементы, чтобы изменения вызывающего кода не портили кэш
+    return [dict(item) for item in cached]
+
+
+def _cache_put(key: Tuple[str, str], ocr_output: List[Dict], persist: bool = True) -> None:
+    """Сохраняет результат OCR в LRU-кэш и, если задан PADDLE_CACHE_DIR, на диск."""
+    with _ocr_cache_lock:
+        _ocr_cache[key] = [dict(item) for item in ocr_output]
+        _ocr_cache.move_to_end(key)
+        while len(_ocr_cache) > _OCR_CACHE_SIZE:
+            _ocr_cache.popitem(last=False)
+    
+    if persist and PADDLE_CACHE_DIR:
+        cache_dir = Path(PADDLE_CACHE_DIR)
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            (cache_dir / f"{key[0]}_{key[1]}.json").write_bytes(_dumps(list(ocr_output)))
+        except (OSError, TypeError) as e:
+            logger.warning("Could not write OCR cache: %s", e)
+
+
+def run_paddle_batch(paths: List[str], lang: str = 'ru') -> List[List[Dict]]:
+    """
+    Выполняет OCR для нескольких изображений одним вызовом модели.
+    
+    На GPU все пути передаются в PaddleOCR одним списком. На CPU изображения
+    читаются в пуле потоков, пока модель распознает предыдущие.
+    
+    Args:
+        paths: Пути к изображениям
+        lang: Язык для распознавания
+    
+    Returns:
+        Список результатов (как у run_paddle) в порядке входных путей
+    """
+    file_paths = [_check_image_path(path) for path in paths]
+    if not file_paths:
+        return []
+    
+    ocr = get_paddle_instance(lang=lang)
+    
+    if _use_gpu():
+        results = ocr.ocr([str(file_path) for file_path in file_paths])
+        if results is not None and len(results) == len(file_paths):
+            return [_postprocess_result([raw]) for raw in results]
+        logger.warning("Batch OCR returned %s results for %d images, falling back to per-image OCR",
+                       None if results is None else len(results), len(file_paths))
+    
+    # CPU: чтение/декодирование следующих файлов идет параллельно с распознаванием
+    with ThreadPoolExecutor(max_workers=_LOADER_THREADS) as pool:
+        images = pool.map(_read_image_scaled, file_paths)
+        return [
+            _postprocess_result(*_ocr_with_retry(ocr, file_path, image, scale))
+            for file_path, (image, scale) in zip(file_paths, images)
+        ]
+
+
+def _check_image_path(path: str) -> Path:
+    """Проверяет существование и формат файла изображения."""
     file_path = Path(path)
     
     if not file_path.exists():
         raise FileNotFoundError(f"Файл не найден: {path}")
     
-    # Получаем экземпляр PaddleOCR
-    ocr = get_paddle_instance(lang=lang)
+    if file_path.suffix.lower() not in IMAGE_EXTENSIONS:
+        raise ValueError(f"Неподдерживаемый формат файла: {file_path.suffix}")
     
-    # Загружаем изображение
-    if file_path.suffix.lower() in ['.png', '.jpg', '.jpeg', '.bmp', '.tiff']:
-        # Выполняем OCR
-        result = ocr.ocr(str(file_path))
-        
-        # Нормализуем вывод
-        normalized = normalize_paddle_output(result)
+    return file_path
+
+
+def _read_image(file_path: Path) -> Optional[np.ndarray]:
+    """Читает изображение в BGR (np.fromfile корректно работает с кириллицей в пути)."""
+    import cv2
+    
+    try:
+        return cv2.imdecode(np.fromfile(str(file_path), dtype=np.uint8), cv2.IMREAD_COLOR)
+    except (OSError, cv2.error) as e:
+        logger.warning("Could not read %s: %s", file_path, e)
+        return None
+
+
+def _read_image_scaled(file_path: Path, max_side: Optional[int] = None) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Читает изображение; если оно больше max_side, декодер сразу уменьшает его в 2/4/8 раз.
+    
+    Returns:
+        (изображение BGR или None, во сколько раз оно уменьшено)
+    """
+    factor = _reduction_factor(file_path, PADDLE_MAX_SIDE if max_side is None else max_side)
+    if factor == 1:
+        return _read_image(file_path), 1
+    
+    image = _read_image_reduced(file_path, factor)
+    if image is None:
+        return _read_image(file_path), 1
+    return image, factor
+
+
+def _read_image_reduced(file_path: Path, factor: int) -> Optional[np.ndarray]:
+    """Читает изображение, уменьшенное в factor (2/4/8) раз на этапе декодирования."""
+    import cv2
+    
+    try:
+        flag = getattr(cv2, _REDUCED_READ_FLAGS[factor])
+        return cv2.imdecode(np.fromfile(str(file_path), dtype=np.uint8), flag)
+    except (OSError, cv2.error) as e:
+        logger.warning("Could not read %s: %s", file_path, e)
+        return None
+
+
+def _reduction_factor(file_path: Path, max_side: int) -> int:
+    """Подбирает кратность уменьшения по размеру изображения (читается только заголовок)."""
+    if max_side <= 0:
+        return 1
+    
+    from PIL import Image
+    
+    try:
+        with Image.open(file_path) as img:
+            side = max(img.size)
+    except OSError:
+        return 1
+    return _factor_for_side(side, max_side)
+
+
+def _factor_for_side(side: int, max_side: int) -> int:
+    """Кратность уменьшения (1/2/4/8), при которой сторона side укладывается в max_side."""
+    if max_side <= 0:
+        return 1
+    for factor in (1, 2, 4):
+        if side <= max_side * factor:
+            return factor
+    return 8
+
+
+def _rescale_items(ocr_output: List[Dict], scale: float) -> None:
+    """Переводит координаты элементов OCR из уменьшенного изображения в исходное."""
+    for item in ocr_output:
+        item['box'] = [[x * scale, y * scale] for x, y in item['box']]
+        for key in _BBOX_KEYS:
+            item[key] *= scale
+
+
+def _ocr_with_retry(
+    ocr: "PaddleOCR",
+    file_path: Optional[Path],
+    image: Optional[np.ndarray] = None,
+    scale: int = 1,
+    max_attempts: int = _OCR_MAX_ATTEMPTS
+) -> Tuple[List, int]:
+    """
+    Выполняет ocr.ocr() с повторами при нехватке памяти.
+    
+    Перед каждым повтором освобождается память, выдерживается пауза (1, 2, ... с)
+    и изображение уменьшается вдвое. Прочие ошибки пробрасываются сразу.
+    Без file_path распознается image, а повторы идут по его прореженной копии.
+    
+    Returns:
+        (сырой вывод PaddleOCR, во сколько раз уменьшено изображение);
+        если память так и не удалось выделить - ([], scale)
+    """
+    for attempt in range(max_attempts):
+        try:
+            return ocr.ocr(image if image is not None else str(file_path)), scale
+        except Exception as e:
+            if not (isinstance(e, MemoryError) or _RE_OUT_OF_MEMORY.search(str(e))):
+                raise
+            if attempt == max_attempts - 1:
+                logger.error("PaddleOCR out of memory on %s after %d attempts: %s",
+                             file_path, max_attempts, e)
+                return [], scale
+            logger.warning("PaddleOCR out of memory on %s (attempt %d): %s", file_path, attempt + 1, e)
         
-        # Сортируем по Y-координате для правильного порядка
-        normalized = sort_by_reading_order(normalized)
+        _free_memory()
+        time.sleep(2 ** attempt)
         
-        return normalized
-    else:
-        raise ValueError(f"Неподдерживаемый формат файла: {file_path.suffix}")
+        # Следующая попытка - на уменьшенном вдвое изображении
+        if file_path is None:
+            image, scale = np.ascontiguousarray(image[::2, ::2]), scale * 2
+        elif scale * 2 in _REDUCED_READ_FLAGS:
+            reduced = _read_image_reduced(file_path, scale * 2)
+            if reduced is not None:
+                image, scale = reduced, scale * 2
+    
+    return [], scale
+
+
+def _free_memory() -> None:
+    """Освобождает память после ошибки нехватки памяти (в т.ч. кэш GPU)."""
+    gc.collect()
+    try:
+        import paddle
+        if paddle.device.is_compiled_with_cuda():
+            paddle.device.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+def _use_gpu() -> bool:
+    """Проверяет, выполняется ли Paddle на GPU."""
+    try:
+        import paddle
+        return paddle.device.is_compiled_with_cuda() and paddle.device.get_device().startswith('gpu')
+    except Exception:
+        return False
+
+
+def _postprocess_result(result: List, scale: int = 1) -> List[Dict]:
+    """
+    Нормализует сырой вывод PaddleOCR и сортирует его в порядке чтения.
+    
+    Args:
+        result: Сырой вывод PaddleOCR
+        scale: Во сколько раз было уменьшено изображение перед OCR
+    """
+    # Нормализуем вывод
+    normalized = normalize_paddle_output(result)
+    if scale != 1:
+        _rescale_items(normalized, scale)
+    
+    # Сортируем по Y-координате для правильного порядка
+    return sort_by_reading_order(normalized)
+
+
+class ReadingOrder(list):
+    """
+    Элементы OCR в порядке чтения; в атрибуте lines сохраняется
+    разбивка на строки, чтобы get_plaintext не группировал заново.
+    """
+    
+    def __init__(self, lines: List[List[Dict]]):
+        super().__init__(item for line in lines for item in line)
+        self.lines = lines
 
 
 def sort_by_reading_order(ocr_output: List[Dict], line_threshold: float = 10) -> List[Dict]:
@@ -400,42 +1025,39 @@ def sort_by_reading_order(ocr_output: List[Dict], line_threshold: float = 10) ->
         line_threshold: Порог для группировки элементов в строки (по Y-координате)
     
     Returns:
-        Отсортированный список результатов
+        Отсортированный список результатов (ReadingOrder со строками в .lines)
     """
     if not ocr_output:
         return []
     
-    # Группируем элементы по строкам
-    lines = []
-    for item in ocr_output:
-        placed = False
-        
-        # Ищем подходящую строку
-        for line in lines:
-            # Проверяем, находится ли элемент на той же строке
-            line_y = sum(i['center_y'] for i in line) / len(line)
-            if abs(item['center_y'] - line_y) < line_threshold:
-                line.append(item)
-                placed = True
-                break
-        
-        # Если не нашли подходящую строку, создаем новую
-        if not placed:
-            lines.append([item])
-    
-    # Сортируем строки по Y-координате
-    lines.sort(key=lambda line: sum(i['center_y'] for i in line) / len(line))
+    # Один раз сортируем элементы по Y, затем группируем в строки линейным проходом
+    ys = np.fromiter((item['center_y'] for item in ocr_output), dtype=np.float64, count=len(ocr_output))
+    order = np.argsort(ys, kind='stable').tolist()
+    ys = ys.tolist()
     
-    # Сортируем элементы внутри каждой строки по X-координате
-    sorted_output = []
+    lines = []
+    current_line = []
+    line_sum = 0.0
+    for idx in order:
+        y = ys[idx]
+        # Элемент слишком далеко от средней Y текущей строки - начинаем новую
+        if current_line and abs(y - line_sum / len(current_line)) >= line_threshold:
+            lines.append(current_line)
+            current_line = []
+            line_sum = 0.0
+        current_line.append(ocr_output[idx])
+        line_sum += y
+    lines.append(current_line)
+    
+    # Строки уже идут по возрастанию Y; сортируем элементы внутри строки по X
+    by_x = itemgetter('center_x')
     for line_idx, line in enumerate(lines):
-        line.sort(key=lambda item: item['center_x'])
+        line.sort(key=by_x)
         # Добавляем номер строки
         for item in line:
             item['line_num'] = line_idx
-        sorted_output.extend(line)
     
-    return sorted_output
+    return ReadingOrder(lines)
 
 
 def get_plaintext(ocr_output: List[Dict], join_lines: str = '\n') -> str:
@@ -452,26 +1074,33 @@ def get_plaintext(ocr_output: List[Dict], join_lines: str = '\n') -> str:
     if not ocr_output:
         return ""
     
+    # Сортируем элементы в строке по X-координате (left есть у всех нормализованных элементов)
+    if all('left' in item for item in ocr_output):
+        x_key = itemgetter('left')
+    else:
+        x_key = lambda x: x.get('left', x.get('center_x', 0))
+    
+    # Строки уже сгруппированы sort_by_reading_order (если список не меняли после),
+    # но внутри строки слова упорядочены по центру рамки - пересортировываем по тому же ключу
+    lines = getattr(ocr_output, 'lines', None)
+    if lines is not None and sum(map(len, lines)) == len(ocr_output):
+        text_lines = (
+            ' '.join(item['text'] for item in sorted(line, key=x_key) if item.get('text'))
+            for line in lines
+        )
+        return join_lines.join(filter(None, text_lines))
+    
     # Группируем по строкам
-    lines_dict = {}
+    lines_dict = defaultdict(list)
     for item in ocr_output:
-        line_num = item.get('line_num', 0)
-        if line_num not in lines_dict:
-            lines_dict[line_num] = []
-        lines_dict[line_num].append(item)
+        lines_dict[item.get('line_num', 0)].append(item)
     
     # Собираем текст по строкам
-    text_lines = []
-    for line_num in sorted(lines_dict.keys()):
-        line_items = lines_dict[line_num]
-        # Сортируем элементы в строке по X-координате
-        line_items.sort(key=lambda x: x.get('left', x.get('center_x', 0)))
-        # Объединяем текст в строке
-        line_text = ' '.join(item['text'] for item in line_items if item.get('text'))
-        if line_text:
-            text_lines.append(line_text)
-    
-    return join_lines.join(text_lines)
+    text_lines = (
+        ' '.join(item['text'] for item in sorted(lines_dict[line_num], key=x_key) if item.get('text'))
+        for line_num in sorted(lines_dict)
+    )
+    return join_lines.join(filter(None, text_lines))
 
 
 def save_paddle_output(ocr_output: List[Dict], out_path: str) -> None:
@@ -485,21 +1114,8 @@ def save_paddle_output(ocr_output: List[Dict], out_path: str) -> None:
     out_file = Path(out_path)
     out_file.parent.mkdir(parents=True, exist_ok=True)
     
-    # Подготавливаем данные для сериализации
-    serializable_output = []
-    for item in ocr_output:
-        serializable_item = {}
-        for key, value in item.items():
-            # Преобразуем numpy arrays если есть
-            if isinstance(value, np.ndarray):
-                serializable_item[key] = value.tolist()
-            else:
-                serializable_item[key] = value
-        serializable_output.append(serializable_item)
-    
-    # Сохраняем в JSON
-    with open(out_file, 'w', encoding='utf-8') as f:
-        json.dump(serializable_output, f, ensure_ascii=False, indent=2)
+    # Сохраняем в JSON (numpy-массивы сериализуются без отдельного прохода)
+    out_file.write_bytes(_dumps(list(ocr_output)))
     
     print(f"Результаты PaddleOCR сохранены в: {out_file}")
 
@@ -522,49 +1138,61 @@ def visualize_results(
     Returns:
         Изображение с нанесенными bbox и текстом
     """
-    # Загружаем изображение
-    image = cv2.imread(image_path)
+    import cv2
+    
+    # Загружаем изображение (большие - сразу уменьшенными, координаты пересчитываем)
+    image, scale = _read_image_scaled(Path(image_path))
     if image is None:
-        image = np.array(Image.open(image_path))
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        raise ValueError(f"Не удалось декодировать изображение: {image_path}")
     
-    # Копируем для рисования
-    vis_image = image.copy()
+    # Изображение декодировано только для визуализации - рисуем прямо на нем, без копии
+    vis_image = image
     
     # Настройки визуализации
     font = cv2.FONT_HERSHEY_SIMPLEX
     font_scale = 0.5
     thickness = 1
     
-    for item in ocr_output:
-        box = item['box']
-        text = item['text']
-        conf = item['conf']
+    # Цвет в зависимости от confidence
+    colors = (
+        (0, 255, 0),    # Зеленый - высокая уверенность
+        (0, 165, 255),  # Оранжевый - средняя уверенность
+        (0, 0, 255),    # Красный - низкая уверенность
+    )
+    
+    if ocr_output:
+        confs = np.fromiter((item['conf'] for item in ocr_output), dtype=np.float64, count=len(ocr_output))
+        color_idx = np.where(confs > 0.9, 0, np.where(confs > 0.7, 1, 2))
         
         # Преобразуем координаты в целые числа
-        pts = np.array(box, dtype=np.int32)
+        polys = [(np.asarray(item['box']) / scale).astype(np.int32) for item in ocr_output]
         
-        # Цвет в зависимости от confidence
-        if conf > 0.9:
-            color = (0, 255, 0)  # Зеленый - высокая уверенность
-        elif conf > 0.7:
-            color = (0, 165, 255)  # Оранжевый - средняя уверенность
-        else:
-            color = (0, 0, 255)  # Красный - низкая уверенность
-        
-        # Рисуем bbox
-        cv2.polylines(vis_image, [pts], True, color, 2)
-        
-        # Добавляем текст и confidence
-        x, y = int(item['left']), int(item['top'])
-        label = f"{text[:20]}... ({conf:.2f})" if len(text) > 20 else f"{text} ({conf:.2f})"
+        # Подписи (текст и confidence) и прямоугольники фона под ними
+        labels = []
+        backgrounds = []
+        for item, conf in zip(ocr_output, confs.tolist()):
+            text = item['text']
+            x, y = int(item['left'] / scale), int(item['top'] / scale)
+            label = f"{text[:20]}... ({conf:.2f})" if len(text) > 20 else f"{text} ({conf:.2f})"
+            (text_width, text_height), _ = cv2.getTextSize(label, font, font_scale, thickness)
+            top = y - text_height - 4
+            backgrounds.append(np.array(
+                [[x, top], [x + text_width, top], [x + text_width, y], [x, y]], dtype=np.int32
+            ))
+            labels.append((label, (x, y - 2)))
         
-        # Фон для текста
-        (text_width, text_height), _ = cv2.getTextSize(label, font, font_scale, thickness)
-        cv2.rectangle(vis_image, (x, y - text_height - 4), (x + text_width, y), color, -1)
+        # Рисуем bbox и фон подписей одним вызовом на каждый цвет
+        groups = [(color, np.flatnonzero(color_idx == i)) for i, color in enumerate(colors)]
+        for color, idx in groups:
+            if idx.size:
+                cv2.polylines(vis_image, [polys[i] for i in idx], True, color, 2)
+        for color, idx in groups:
+            if idx.size:
+                cv2.fillPoly(vis_image, [backgrounds[i] for i in idx], color)
         
         # Текст
-        cv2.putText(vis_image, label, (x, y - 2), font, font_scale, (255, 255, 255), thickness)
+        for label, org in labels:
+            cv2.putText(vis_image, label, org, font, font_scale, (255, 255, 255), thickness)
     
     # Сохраняем результат
     if output_path:
@@ -581,18 +1209,18 @@ def visualize_results(
 
 
 def process_document(
-    input_path: str,
+    input_path: Union[str, List[str]],
     output_dir: str = "./output",
     lang: str = 'ru',
     save_json: bool = True,
     save_text: bool = True,
     save_visualization: bool = False
-) -> Dict:
+) -> Union[Dict, List[Dict]]:
     """
     Полная обработка документа с PaddleOCR.
     
     Args:
-        input_path: Путь к входному изображению
+        input_path: Путь к входному изображению или список путей
         output_dir: Директория для сохранения результатов
         lang: Язык распознавания
         save_json: Сохранять ли JSON с результатами
@@ -600,20 +1228,164 @@ def process_document(
         save_visualization: Сохранять ли визуализацию
     
     Returns:
-        Словарь с результатами и статистикой
+        Словарь с результатами и статистикой (список словарей для списка путей)
     """
-    input_file = Path(input_path)
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
-    base_name = input_file.stem
-    results = {'input_file': str(input_file)}
+    if isinstance(input_path, (list, tuple)):
+        input_files = [Path(path) for path in input_path]
+        print(f"Обработка {len(input_files)} файлов")
+        
+        print("Выполнение OCR с PaddleOCR...")
+        
+        # На CPU выгоднее конвейер: чтение и сохранение идут параллельно с OCR
+        if not _use_gpu():
+            results = add_multi_document(input_files, output_dir, lang,
+                                         save_json, save_text, save_visualization)
+            print(f"Обработка завершена!")
+            return results
+        
+        # На GPU - OCR одним пакетом
+        ocr_outputs = run_paddle_batch([str(path) for path in input_files], lang=lang)
+        
+        results = [
+            _save_document(input_file, ocr_output, output_path,
+                           save_json, save_text, save_visualization)
+            for input_file, ocr_output in zip(input_files, ocr_outputs)
+        ]
+        print(f"Обработка завершена!")
+        return results
     
+    input_file = Path(input_path)
     print(f"Обработка: {input_file}")
     
     # Выполняем OCR
     print("Выполнение OCR с PaddleOCR...")
     ocr_output = run_paddle(str(input_file), lang=lang)
+    
+    results = _save_document(input_file, ocr_output, output_path,
+                              save_json, save_text, save_visualization)
+    print(f"Обработка завершена!")
+    return results
+
+
+def add_multi_document(
+    paths: List[str],
+    output_dir: str = "./output",
+    lang: str = 'ru',
+    save_json: bool = True,
+    save_text: bool = True,
+    save_visualization: bool = False
+) -> List[Dict]:
+    """
+    Обрабатывает несколько документов конвейером из трех потоков:
+    чтение изображений -> OCR -> нормализация и сохранение результатов.
+    
+    Стадии связаны ограниченными очередями, поэтому чтение следующих файлов
+    и запись предыдущих идут параллельно с распознаванием.
+    
+    Args:
+        paths: Пути к изображениям
+        output_dir: Директория для сохранения результатов
+        lang: Язык распознавания
+        save_json: Сохранять ли JSON с результатами
+        save_text: Сохранять ли текстовые файлы
+        save_visualization: Сохранять ли визуализацию
+    
+    Returns:
+        Список словарей с результатами в порядке входных путей
+    """
+    input_files = [_check_image_path(path) for path in paths]
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    ocr = get_paddle_instance(lang=lang)
+    
+    loaded = queue.Queue(maxsize=_PIPELINE_QUEUE_SIZE)
+    recognized = queue.Queue(maxsize=_PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    errors = []
+    results = [None] * len(input_files)
+    
+    def put(q, item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _PIPELINE_DONE
+    
+    def stage(func):
+        def run():
+            try:
+                func()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+        return threading.Thread(target=run, name=f"paddle-{func.__name__}", daemon=True)
+    
+    def loader():
+        try:
+            for idx, file_path in enumerate(input_files):
+                if not put(loaded, (idx, *_read_image_scaled(file_path))):
+                    return
+        finally:
+            put(loaded, _PIPELINE_DONE)
+    
+    def ocrer():
+        try:
+            while (item := get(loaded)) is not _PIPELINE_DONE:
+                idx, image, scale = item
+                raw, scale = _ocr_with_retry(ocr, input_files[idx], image, scale)
+                if not put(recognized, (idx, raw, scale)):
+                    return
+        finally:
+            put(recognized, _PIPELINE_DONE)
+    
+    def writer():
+        while (item := get(recognized)) is not _PIPELINE_DONE:
+            idx, raw, scale = item
+            results[idx] = _save_document(input_files[idx], _postprocess_result(raw, scale), output_path,
+                                          save_json, save_text, save_visualization)
+    
+    threads = [stage(loader), stage(ocrer), stage(writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    if errors:
+        raise errors[0]
+    
+    return results
+
+
+def _save_document(
+    input_file: Path,
+    ocr_output: List[Dict],
+    output_path: Path,
+    save_json: bool,
+    save_text: bool,
+    save_visualization: bool
+) -> Dict:
+    """
+    Считает статистику и сохраняет результаты OCR одного документа.
+    
+    Returns:
+        Словарь с результатами и статистикой
+    """
+    base_name = input_file.stem
+    results = {'input_file': str(input_file)}
     results['total_items'] = len(ocr_output)
     
     # Статистика
@@ -634,8 +1406,7 @@ def process_document(
     if save_text:
         text = get_plaintext(ocr_output)
         text_file = output_path / f"{base_name}_text.txt"
-        with open(text_file, 'w', encoding='utf-8') as f:
-            f.write(text)
+        text_file.write_bytes(text.encode('utf-8'))
         print(f"Текст сохранен в: {text_file}")
         results['text_file'] = str(text_file)
         results['text_length'] = len(text)
@@ -646,7 +1417,6 @@ def process_document(
         visualize_results(str(input_file), ocr_output, str(vis_file))
         results['visualization_file'] = str(vis_file)
     
-    print(f"Обработка завершена!")
     return results
 
 
@@ -673,15 +1443,26 @@ def compare_with_tesseract(
     
     print("Сравнение PaddleOCR и Tesseract...")
     
-    # PaddleOCR
-    paddle_output = run_paddle(input_path)
-    paddle_text = get_plaintext(paddle_output)
-    
-    # Tesseract
+    # Изображение для Tesseract декодируем заранее, в основном потоке
     image = Image.open(input_path)
-    tesseract_text = pytesseract.image_to_string(image, lang='rus+eng')
+    image.load()
+    
+    # PaddleOCR и Tesseract независимы - выполняем их параллельно
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        paddle_future = executor.submit(run_paddle, input_path)
+        tesseract_future = executor.submit(pytesseract.image_to_string, image, lang='rus+eng')
+        paddle_output = paddle_future.result()
+        tesseract_text = tesseract_future.result()
+    
+    paddle_text = get_plaintext(paddle_output)
     
     # Сравнение
+    paddle_avg_conf = 0
+    if paddle_output:
+        paddle_avg_conf = float(np.fromiter(
+            (item['conf'] for item in paddle_output), dtype=np.float64, count=len(paddle_output)
+        ).mean())
+    
     comparison = {
         'paddle_chars': len(paddle_text),
         'tesseract_chars': len(tesseract_text),
@@ -690,7 +1471,7 @@ def compare_with_tesseract(
         'paddle_lines': len(paddle_text.splitlines()),
         'tesseract_lines': len(tesseract_text.splitlines()),
         'paddle_items': len(paddle_output),
-        'paddle_avg_conf': sum(item['conf'] for item in paddle_output) / len(paddle_output) if paddle_output else 0
+        'paddle_avg_conf': paddle_avg_conf
     }
     
     # Сохраняем оба результата
@@ -699,14 +1480,9 @@ def compare_with_tesseract(
     
     base_name = Path(input_path).stem
     
-    with open(output_path / f"{base_name}_paddle.txt", 'w', encoding='utf-8') as f:
-        f.write(paddle_text)
-    
-    with open(output_path / f"{base_name}_tesseract.txt", 'w', encoding='utf-8') as f:
-        f.write(tesseract_text)
-    
-    with open(output_path / f"{base_name}_comparison.json", 'w', encoding='utf-8') as f:
-        json.dump(comparison, f, ensure_ascii=False, indent=2)
+    (output_path / f"{base_name}_paddle.txt").write_bytes(paddle_text.encode('utf-8'))
+    (output_path / f"{base_name}_tesseract.txt").write_bytes(tesseract_text.encode('utf-8'))
+    (output_path / f"{base_name}_comparison.json").write_bytes(_dumps(comparison))
     
     print(f"Результаты сравнения сохранены в: {output_dir}")
     return comparison
@@ -716,26 +1492,34 @@ if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="PaddleOCR wrapper для кириллицы")
-    parser.add_argument("input", help="Путь к изображению")
+    parser.add_argument("input", nargs="+", help="Путь к изображению (можно несколько)")
     parser.add_argument("-o", "--output", default="./output", help="Директория для результатов")
     parser.add_argument("-l", "--lang", default="ru", help="Язык OCR (ru, en, ch)")
     parser.add_argument("--visualize", action="store_true", help="Создать визуализацию")
     parser.add_argument("--compare", action="store_true", help="Сравнить с Tesseract")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Подробный отладочный вывод")
     
     args = parser.parse_args()
     
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(levelname)s %(name)s: %(message)s"
+    )
+    
     if args.compare:
-        comparison = compare_with_tesseract(args.input, args.output)
-        print("\nСравнение PaddleOCR vs Tesseract:")
-        for key, value in comparison.items():
-            print(f"  {key}: {value}")
+        for input_path in args.input:
+            comparison = compare_with_tesseract(input_path, args.output)
+            print("\nСравнение PaddleOCR vs Tesseract:")
+            for key, value in comparison.items():
+                print(f"  {key}: {value}")
     else:
         result = process_document(
-            args.input,
+            args.input if len(args.input) > 1 else args.input[0],
             output_dir=args.output,
             lang=args.lang,
             save_visualization=args.visualize
         )
-        print("\nРезультаты:")
-        for key, value in result.items():
-            print(f"  {key}: {value}")
\ No newline at end of file
+        for doc_result in (result if isinstance(result, list) else [result]):
+            print("\nРезультаты:")
+            for key, value in doc_result.items():
+                print(f"  {key}: {value}")
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+ocr_server.py - Отдельный процесс OCR для веб-приложения
+
+Процесс держит единственный экземпляр OCRCoordinator (модели загружаются
+в память / видеопамять один раз) и выполняет вызовы его методов, присланные
+через multiprocessing.connection. Веб-процессы только принимают файлы и
+отдают JSON, поэтому их можно масштабировать без копий моделей.
+
+Соединения multiprocessing.connection передают pickle, поэтому ключ
+OCR_SERVER_AUTHKEY обязателен и должен быть секретным (одинаковым у сервера и клиентов).
+
+Запуск (один процесс на GPU):
+    export OCR_SERVER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    OCR_SERVER_ADDRESS=127.0.0.1:6000 python ocr_server.py
+    OCR_SERVER_ADDRESS=127.0.0.1:6000 gunicorn -w 4 --worker-class gthread --threads 4 -b 0.0.0.0:5000 web_app:app
+"""
+
+import logging
+import os
+import threading
+from multiprocessing.connection import Client, Listener
+
+# Адрес сервера "host:port" и ключ аутентификации соединений (без значения по умолчанию:
+# известный ключ дал бы любому, кто достучится до порта, выполнение кода через pickle)
+OCR_SERVER_ADDRESS = os.environ.get('OCR_SERVER_ADDRESS', '')
+OCR_SERVER_AUTHKEY = os.environ.get('OCR_SERVER_AUTHKEY', '').encode('utf-8')
+
+logger = logging.getLogger(__name__)
+
+# Методы OCRCoordinator, доступные удаленно
+REMOTE_METHODS = frozenset({
+    'get_available_engines',
+    'recommend_engine',
+    'process_document',
+    'compare_engines',
+    'calculate_metrics',
+    'batch_process',
+})
+
+
+def _require_authkey(authkey):
+    """Проверяет, что ключ аутентификации задан"""
+    if not authkey:
+        raise RuntimeError("Не задан OCR_SERVER_AUTHKEY: OCR сервер не работает без секретного ключа")
+    return authkey
+
+
+def parse_address(address):
+    """Преобразует строку "host:port" в кортеж для multiprocessing.connection"""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+class RemoteOCRCoordinator:
+    """
+    Клиент OCR-сервера с интерфейсом OCRCoordinator
+
+    У каждого потока свое соединение: Connection не рассчитан на
+    одновременные send/recv из нескольких потоков.
+    """
+
+    def __init__(self, address=OCR_SERVER_ADDRESS, authkey=OCR_SERVER_AUTHKEY):
+        self.address = parse_address(address)
+        self.authkey = _require_authkey(authkey)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, authkey=self.authkey)
+        return conn
+
+    def _call(self, method, *args, **kwargs):
+        conn = self._connection()
+        try:
+            conn.send((method, args, kwargs))
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            # Сервер перезапущен - следующий вызов откроет новое соединение
+            self._local.conn = None
+            conn.close()
+            raise
+
+        if status == 'error':
+            raise RuntimeError(f"OCR сервер: {payload}")
+        return payload
+
+    def __getattr__(self, name):
+        if name not in REMOTE_METHODS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+
+def _serve_connection(conn, coordinator):
+    """Обрабатывает вызовы одного клиента, пока соединение открыто"""
+    with conn:
+        while True:
+            try:
+                method, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            if method not in REMOTE_METHODS:
+                conn.send(('error', f"Неизвестный метод: {method}"))
+                continue
+
+            try:
+                result = getattr(coordinator, method)(*args, **kwargs)
+            except Exception as e:
+                # Трассировка остается в логе сервера, клиенту - только текст ошибки
+                logger.exception("Ошибка вызова %s", method)
+                conn.send(('error', str(e)))
+            else:
+                conn.send(('ok', result))
+
+
+def serve(address=OCR_SERVER_ADDRESS or '127.0.0.1:6000', authkey=OCR_SERVER_AUTHKEY):
+    """Запускает OCR-сервер (блокирует текущий поток)"""
+    _require_authkey(authkey)
+    from ocr_coordinator import OCRCoordinator
+
+    # Модели загружаются до первого запроса
+    coordinator = OCRCoordinator(enable_warmup=True)
+    try:
+        with Listener(parse_address(address), authkey=authkey) as listener:
+            print(f"🚀 OCR сервер слушает {address}")
+            print(f"🔧 Доступные OCR движки: {', '.join(coordinator.get_available_engines())}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"⚠️ Ошибка подключения клиента: {e}")
+                    continue
+                threading.Thread(target=_serve_connection, args=(conn, coordinator), daemon=True).start()
+    finally:
+        coordinator.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    serve()
@@ -4,8 +4,16 @@ Alternative OCR solution for high-quality plain text extraction.
 Used as fallback or in ensemble approaches when PaddleOCR struggles.
 """
 
+import contextlib
+import copy
 import logging
-from typing import Optional, List, Union
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import NamedTuple, Optional, List, Tuple, Union
 from pathlib import Path
 import warnings
 
@@ -13,8 +21,14 @@ import torch
 from PIL import Image
 import numpy as np
 
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
 try:
     from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+    from transformers.modeling_outputs import BaseModelOutput
     TROCR_AVAILABLE = True
 except ImportError:
     TROCR_AVAILABLE = False
@@ -24,6 +38,54 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Common hallucination patterns, matched case-insensitively in one pass
+_SUSPICIOUS_PATTERNS = (
+    'INVOICEBOOK', 'COMPERIENCE', 'AAAAAAA', 'XXXXXXX',
+    'THANK YOU FOR FULL', 'GENERATED TEXT', 'NO TEXT FOUND',
+    'ABCDEFGH', 'IIIIIII', 'OOOOOOO', 'MMMMMMM'
+)
+_SUSPICIOUS_RE = re.compile('|'.join(map(re.escape, _SUSPICIOUS_PATTERNS)), re.IGNORECASE)
+
+# Size thresholds on max(width, height), checked from largest to smallest
+_SIZE_LIMITS = ((1500, "too_large"), (1000, "large"), (800, "medium"))
+
+# Log level and message for each threshold, formatted with (width, height)
+_SIZE_MSGS = {
+    "too_large": (logging.WARNING, "Large document image detected ({}x{}). TrOCR is designed for single text lines, not full documents."),
+    "large": (logging.WARNING, "Large image detected ({}x{}). TrOCR works best on cropped text regions."),
+    "medium": (logging.INFO, "Processing large image ({}x{}). TrOCR may not perform optimally on full documents."),
+}
+
+_TOO_LARGE_MSG = (
+    "TrOCR: Изображение слишком большое ({}x{}). Данная модель предназначена для распознавания "
+    "отдельных строк текста, а не полных документов. Рекомендуется использовать PaddleOCR или "
+    "Tesseract для обработки сложных документов."
+)
+
+
+class TrOCRConfig(NamedTuple):
+    """Decoding and size-gating settings of a TrOCRWrapper."""
+    num_beams: int = 1
+    max_new_tokens: int = 64
+    size_limits: Tuple[Tuple[int, str], ...] = _SIZE_LIMITS
+
+
+# Text with fewer distinct non-space characters than this is treated as repetitive
+_REPETITIVE_MIN = 3
+
+# Compile the encoder of shared instances with torch.compile (TROCR_COMPILE=1).
+# Off by default: the first call takes tens of seconds, and on CUDA the encoder
+# already replays captured CUDA graphs
+TROCR_COMPILE = os.environ.get('TROCR_COMPILE', '0') == '1'
+
+
+def _is_repetitive(text: str) -> bool:
+    """Return True if text has fewer than _REPETITIVE_MIN distinct non-space characters."""
+    # UTF-32 gives one fixed-width code unit per character, so Cyrillic letters
+    # sharing a UTF-8 lead byte are still counted as distinct
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return np.unique(codes[codes != 0x20]).size < _REPETITIVE_MIN
+
 
 class TrOCRWrapper:
     """
@@ -35,7 +97,11 @@ class TrOCRWrapper:
         self,
         model_name: str = 'microsoft/trocr-base-printed',
         device: Optional[str] = None,
-        cache_dir: Optional[str] = None
+        cache_dir: Optional[str] = None,
+        compile_encoder: bool = False,
+        num_beams: int = 1,
+        max_new_tokens: int = 64,
+        quantize_cpu: bool = True
     ):
         """
         Initialize TrOCR model and processor.
@@ -47,12 +113,22 @@ class TrOCRWrapper:
                 - 'microsoft/trocr-large-printed' for better quality (slower)
             device: 'cuda', 'cpu', or None (auto-detect)
             cache_dir: Directory for caching downloaded models
+            compile_encoder: Compile the ViT encoder with torch.compile
+                (slow first call, faster steady-state inference)
+            num_beams: Beam width for decoding - the speed/quality knob.
+                1 (greedy) is fastest; 2-4 is slightly more accurate and proportionally slower
+            max_new_tokens: Generation limit; a single text line fits well within 64 tokens
+            quantize_cpu: On CPU, quantize the decoder's linear layers to int8
+                (dynamic quantization; the memory-bound decoder is the CPU bottleneck)
         """
         if not TROCR_AVAILABLE:
             raise ImportError("transformers library is required for TrOCR")
         
         self.model_name = model_name
         self.cache_dir = cache_dir
+        self.compile_encoder = compile_encoder
+        self.config = TrOCRConfig(num_beams=num_beams, max_new_tokens=max_new_tokens)
+        self.quantize_cpu = quantize_cpu
         self.model = None
         self.processor = None
         
@@ -64,6 +140,19 @@ class TrOCRWrapper:
             
         logger.info(f"TrOCR will run on: {self.device}")
         
+        # Pinned staging buffer and copy stream for asynchronous host-to-device uploads.
+        # The instance is shared between threads, so staging is serialized by _staging_lock
+        self._pinned = None
+        self._copy_stream = torch.cuda.Stream() if self.device == 'cuda' else None
+        self._copy_done = None
+        self._staging_lock = threading.Lock()
+        
+        # CUDA graphs of the encoder keyed by batch size: bs -> (graph, static_in, static_out).
+        # torch.compile(mode="reduce-overhead") already captures graphs itself.
+        # The static buffers are shared by all threads, so capture and replay hold _graph_lock
+        self._graphs = {} if self.device == 'cuda' and not compile_encoder else None
+        self._graph_lock = threading.Lock()
+        
         # Initialize model
         self._load_model()
     
@@ -78,27 +167,288 @@ class TrOCRWrapper:
                 cache_dir=self.cache_dir
             )
             
-            # Load model
-            self.model = VisionEncoderDecoderModel.from_pretrained(
-                self.model_name,
-                cache_dir=self.cache_dir
-            )
+            # Load model directly in the inference dtype, with fused SDPA attention when supported
+            self.dtype = self._select_dtype()
+            try:
+                self.model = VisionEncoderDecoderModel.from_pretrained(
+                    self.model_name,
+                    cache_dir=self.cache_dir,
+                    torch_dtype=self.dtype,
+                    attn_implementation="sdpa"
+                )
+            except (TypeError, ValueError) as e:
+                logger.info(f"SDPA attention unavailable ({e}), using default attention")
+                self.model = VisionEncoderDecoderModel.from_pretrained(
+                    self.model_name,
+                    cache_dir=self.cache_dir,
+                    torch_dtype=self.dtype
+                )
             
             # Move model to device
             if self.device == 'cuda':
                 self.model = self.model.cuda()
-                # Enable mixed precision for faster inference
-                self.model = self.model.half()
             
             # Set to evaluation mode
             self.model.eval()
             
+            if self.device == 'cpu' and self.quantize_cpu:
+                self._quantize_decoder()
+            
+            # The encoder always sees a fixed-size image, so it compiles to a single static graph
+            if self.compile_encoder:
+                if hasattr(torch, 'compile'):
+                    self.model.encoder = torch.compile(self.model.encoder, mode="reduce-overhead")
+                else:
+                    logger.warning("torch.compile requires PyTorch 2.0+, encoder left uncompiled")
+            
+            self._init_preprocessing()
+            self._gen_cfg = self._build_generation_config()
+            
             logger.info("TrOCR model loaded successfully")
             
         except Exception as e:
             logger.error(f"Failed to load TrOCR model: {e}")
             raise
     
+    def _quantize_decoder(self):
+        """
+        Replace the decoder's nn.Linear layers with int8 dynamically quantized ones.
+        
+        The encoder stays in fp32: it is compute-bound and gains little from int8.
+        """
+        # oneDNN kernels use VNNI / AVX-512 int8 instructions where available
+        if 'onednn' in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = 'onednn'
+        
+        try:
+            self.model.decoder = torch.quantization.quantize_dynamic(
+                self.model.decoder,
+                {torch.nn.Linear},
+                dtype=torch.qint8
+            )
+            logger.info(f"TrOCR decoder quantized to int8 (engine: {torch.backends.quantized.engine})")
+        except Exception as e:
+            logger.warning(f"Decoder quantization failed, keeping fp32: {e}")
+    
+    def _build_generation_config(self):
+        """
+        Build the generation config once, so generate does not merge
+        keyword arguments into the model defaults on every call.
+        
+        Starts from the model's own config to keep eos/bos token ids.
+        """
+        gen_cfg = copy.deepcopy(self.model.generation_config)
+        gen_cfg.update(
+            max_new_tokens=self.config.max_new_tokens,  # Prevents runaway generations on noisy inputs
+            num_beams=self.config.num_beams,
+            early_stopping=self.config.num_beams > 1,
+            do_sample=False,  # Disable sampling for more deterministic results
+            use_cache=True
+        )
+        if gen_cfg.pad_token_id is None:
+            gen_cfg.pad_token_id = self.processor.tokenizer.pad_token_id
+        if gen_cfg.decoder_start_token_id is None:
+            gen_cfg.decoder_start_token_id = self.model.config.decoder_start_token_id
+        return gen_cfg
+    
+    def _init_preprocessing(self):
+        """
+        Cache the processor's resize target and normalization constants on the
+        model device, so that only the uint8 resize runs on the host.
+        """
+        image_processor = getattr(self.processor, 'image_processor', None) or self.processor.feature_extractor
+        
+        size = image_processor.size
+        if isinstance(size, dict):
+            height, width = size['height'], size['width']
+        else:
+            height = width = size
+        self._input_size = (width, height)
+        
+        rescale = image_processor.rescale_factor if getattr(image_processor, 'do_rescale', True) else 1.0
+        if image_processor.do_normalize:
+            mean = np.asarray(image_processor.image_mean, dtype=np.float32)
+            std = np.asarray(image_processor.image_std, dtype=np.float32)
+        else:
+            mean = np.zeros(3, dtype=np.float32)
+            std = np.ones(3, dtype=np.float32)
+        
+        # (x * rescale - mean) / std == x * (rescale / std) - mean / std
+        self._pixel_scale = torch.from_numpy(rescale / std).view(1, 3, 1, 1).to(self.device)
+        self._pixel_offset = torch.from_numpy(mean / std).view(1, 3, 1, 1).to(self.device)
+    
+    def _preprocess(self, images: List[Union[Image.Image, np.ndarray]]) -> torch.Tensor:
+        """
+        Resize RGB images into a (N, H, W, 3) uint8 tensor.
+        
+        Resizing uses OpenCV when available; normalization happens on the
+        model device in _normalize. Arrays already at the model input size
+        are not resized.
+        """
+        width, height = self._input_size
+        
+        # A single array of the right size is wrapped without any copy
+        if len(images) == 1 and isinstance(images[0], np.ndarray) \
+                and images[0].shape[:2] == (height, width) and images[0].flags['C_CONTIGUOUS']:
+            return torch.from_numpy(images[0])[None]
+        
+        batch = np.empty((len(images), height, width, 3), dtype=np.uint8)
+        
+        for i, image in enumerate(images):
+            pixels = np.asarray(image)
+            if pixels.shape[:2] == (height, width):
+                batch[i] = pixels
+            elif cv2 is not None:
+                batch[i] = cv2.resize(pixels, (width, height), interpolation=cv2.INTER_LINEAR)
+            else:
+                if isinstance(image, np.ndarray):
+                    image = Image.fromarray(image)
+                batch[i] = np.asarray(image.resize((width, height), Image.BILINEAR))
+        
+        return torch.from_numpy(batch)
+    
+    def _normalize(self, pixels: torch.Tensor) -> torch.Tensor:
+        """
+        Convert a (N, H, W, 3) uint8 tensor on the model device into normalized
+        (N, 3, H, W) pixel values in the inference dtype.
+        """
+        pixel_values = pixels.permute(0, 3, 1, 2).float()
+        pixel_values.mul_(self._pixel_scale).sub_(self._pixel_offset)
+        return pixel_values.to(self.dtype)
+    
+    def _to_device(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        """
+        Move preprocessed uint8 pixels to the model device.
+        
+        On CUDA the batch is staged in a reused pinned buffer and uploaded with
+        a non-blocking copy on a dedicated stream. Concurrent callers take turns:
+        each one waits for the previous upload to finish reading the buffer.
+        """
+        if self.device != 'cuda':
+            return pixel_values.to(self.device)
+        
+        n = pixel_values.shape[0]
+        with self._staging_lock:
+            if self._pinned is None or self._pinned.shape[0] < n or self._pinned.shape[1:] != pixel_values.shape[1:]:
+                if self._copy_done is not None:
+                    # The old buffer may still be read by an upload in flight
+                    self._copy_done.synchronize()
+                self._pinned = torch.empty(pixel_values.shape, dtype=pixel_values.dtype, pin_memory=True)
+                self._copy_done = None
+            elif self._copy_done is not None:
+                # The previous upload must finish reading the buffer before it is overwritten
+                self._copy_done.synchronize()
+            
+            staging = self._pinned[:n]
+            staging.copy_(pixel_values)
+            
+            with torch.cuda.stream(self._copy_stream):
+                device_values = staging.to(self.device, non_blocking=True)
+                self._copy_done = torch.cuda.Event()
+                self._copy_done.record(self._copy_stream)
+        
+        current = torch.cuda.current_stream()
+        current.wait_stream(self._copy_stream)
+        device_values.record_stream(current)
+        return device_values
+    
+    def _select_dtype(self) -> torch.dtype:
+        """
+        Pick the inference dtype: bf16 on Ampere+ GPUs (no fp16 softmax overflow),
+        fp16 on older GPUs, fp32 on CPU.
+        """
+        if self.device != 'cuda':
+            return torch.float32
+        if torch.cuda.get_device_capability()[0] >= 8:
+            return torch.bfloat16
+        return torch.float16
+    
+    def _encode(self, pixel_values: torch.Tensor) -> Optional[torch.Tensor]:
+        """
+        Run the encoder by replaying its CUDA graph for this batch size.
+        
+        The graph is captured on the first call with a new batch size. Returns
+        None when graphs are disabled or capture failed, so the caller falls
+        back to the regular encoder path. The result is copied out of the
+        graph's static buffer before the lock is released, so concurrent
+        callers never see each other's encoder states.
+        """
+        if self._graphs is None:
+            return None
+        
+        with self._graph_lock:
+            if self._graphs is None:
+                return None
+            
+            entry = self._graphs.get(pixel_values.shape[0])
+            if entry is None:
+                try:
+                    entry = self._capture_encoder(pixel_values)
+                except Exception as e:
+                    logger.warning(f"CUDA graph capture failed, using eager encoder: {e}")
+                    self._graphs = None
+                    return None
+            
+            graph, static_in, static_out = entry
+            static_in.copy_(pixel_values)
+            graph.replay()
+            return static_out.clone()
+    
+    def _capture_encoder(self, pixel_values: torch.Tensor) -> tuple:
+        """Warm up the encoder on a side stream and capture it into a CUDA graph."""
+        static_in = pixel_values.clone()
+        
+        # Warm-up runs allocate workspaces and pick kernels outside the capture
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            for _ in range(2):
+                self.model.encoder(pixel_values=static_in)
+        torch.cuda.current_stream().wait_stream(stream)
+        
+        # Without the autocast weight cache the graph does not keep cast copies of the weights alive
+        graph = torch.cuda.CUDAGraph()
+        with torch.autocast(device_type='cuda', dtype=self.dtype, cache_enabled=False), torch.cuda.graph(graph):
+            static_out = self.model.encoder(pixel_values=static_in).last_hidden_state
+        
+        entry = (graph, static_in, static_out)
+        self._graphs[pixel_values.shape[0]] = entry
+        logger.info(f"Captured TrOCR encoder CUDA graph for batch size {pixel_values.shape[0]}")
+        return entry
+    
+    def _autocast(self):
+        """Mixed-precision context for generation on CUDA."""
+        if self.device == 'cuda':
+            return torch.autocast(device_type='cuda', dtype=self.dtype)
+        return contextlib.nullcontext()
+    
+    def export_onnx(self, output_dir: str) -> Path:
+        """
+        Export the model to ONNX (encoder and decoder graphs) for ONNX Runtime / TensorRT.
+        
+        Requires the optimum package: pip install optimum[exporters]
+        
+        Args:
+            output_dir: Directory for the exported model files
+            
+        Returns:
+            Path to the export directory
+        """
+        try:
+            from optimum.exporters.onnx import main_export
+        except ImportError:
+            raise ImportError("optimum is required for ONNX export. Install with: pip install optimum[exporters]")
+        
+        output_path = Path(output_dir)
+        logger.info(f"Exporting {self.model_name} to ONNX: {output_path}")
+        main_export(
+            self.model_name,
+            output=output_path,
+            task="image-to-text",
+            cache_dir=self.cache_dir
+        )
+        return output_path
+    
     def process_image(self, image: Union[Image.Image, np.ndarray]) -> str:
         """
         Process single image and extract text.
@@ -121,111 +471,220 @@ class TrOCRWrapper:
         Returns:
             Extracted text string
         """
-        # Convert numpy array to PIL Image if needed
+        image = self._to_rgb(image)
+
+        # For very large images, return a warning instead of trying to process
+        rejection = self._check_size(*self._image_size(image))
+        if rejection is not None:
+            return rejection
+
+        return self._recognize_one(image)
+
+    def _recognize_one(self, image: Union[Image.Image, np.ndarray]) -> str:
+        """Recognize a single prepared RGB image that already passed the size check."""
+        try:
+            generated_text = self._generate([image])[0]
+            return self._validate_text(generated_text)
+
+        except Exception as e:
+            logger.error(f"TrOCR processing error: {e}")
+            return f"TrOCR: Ошибка обработки - {str(e)}"
+
+    @staticmethod
+    def _to_rgb(image: Union[Image.Image, np.ndarray]) -> Union[Image.Image, np.ndarray]:
+        """
+        Convert numpy arrays and non-RGB images to an RGB PIL Image.
+        
+        (H, W, 3) uint8 arrays are already RGB pixels and are returned as is.
+        """
         if isinstance(image, np.ndarray):
+            if image.ndim == 3 and image.shape[2] == 3 and image.dtype == np.uint8:
+                return image
+            # Convert numpy array to PIL Image if needed
             image = Image.fromarray(image)
 
         # Convert to RGB if needed
         if image.mode != 'RGB':
             image = image.convert('RGB')
 
-        # Check image size and warn if too complex
-        width, height = image.size
-        
-        # For very large images, return a warning instead of trying to process
-        if width > 1500 or height > 1500:
-            logger.warning(f"Large document image detected ({width}x{height}). TrOCR is designed for single text lines, not full documents.")
-            return "TrOCR: Изображение слишком большое для данной модели. TrOCR предназначен для распознавания отдельных строк текста, а не полных документов. Используйте PaddleOCR или Tesseract."
-        
-        if width > 1000 or height > 1000:
-            logger.warning(f"Large image detected ({width}x{height}). TrOCR works best on cropped text regions.")
+        return image
 
-        try:
-            # Process image
-            with torch.no_grad():
-                pixel_values = self.processor(image, return_tensors="pt").pixel_values
-
-                if self.device == 'cuda':
-                    pixel_values = pixel_values.cuda()
-
-                # Generate text with more controlled parameters
-                generated_ids = self.model.generate(
-                    pixel_values,
-                    max_length=256,  # Reduced limit for better quality
-                    num_beams=4,     # Increased beam search for better quality
-                    early_stopping=True,
-                    do_sample=False  # Disable sampling for more deterministic results
-                )
-                generated_text = self.processor.batch_decode(
-                    generated_ids,
-                    skip_special_tokens=True
-                )[0]
-
-            # Enhanced validation - check if result looks like nonsense
-            if generated_text and len(generated_text.strip()) > 0:
-                # Clean the text
-                generated_text = generated_text.strip()
-                
-                # Check for common hallucination patterns
-                suspicious_patterns = [
-                    'INVOICEBOOK', 'COMPERIENCE', 'AAAAAAA', 'XXXXXXX', 
-                    'THANK YOU FOR FULL', 'GENERATED TEXT', 'NO TEXT FOUND',
-                    'ABCDEFGH', 'IIIIIII', 'OOOOOOO', 'MMMMMMM'
-                ]
-                
-                # Check if the text is mostly repeating characters
-                if len(set(generated_text.replace(' ', ''))) < 3 and len(generated_text) > 5:
-                    logger.warning(f"TrOCR generated repetitive text: {generated_text}")
-                    return "TrOCR: Обнаружен повторяющийся результат. Возможно, изображение нечеткое или содержит много текста."
-                
-                # Check for suspicious patterns
-                if any(pattern in generated_text.upper() for pattern in suspicious_patterns):
-                    logger.warning(f"TrOCR generated suspicious text: {generated_text}")
-                    return "TrOCR: Обнаружен подозрительный результат распознавания. Изображение может быть слишком сложным для данной модели."
-
-                return generated_text
+    @staticmethod
+    def _image_size(image: Union[Image.Image, np.ndarray]) -> tuple:
+        """Return (width, height) of a PIL Image or numpy array."""
+        if isinstance(image, np.ndarray):
+            height, width = image.shape[:2]
+            return width, height
+        return image.size
+
+    def _check_size(self, width: int, height: int) -> Optional[str]:
+        """
+        Check image size and warn if too complex.
+
+        Returns:
+            Rejection message for images too large for TrOCR, otherwise None
+        """
+        side = max(width, height)
+        for limit, key in self.config.size_limits:
+            if side > limit:
+                level, message = _SIZE_MSGS[key]
+                logger.log(level, message.format(width, height))
+                return _TOO_LARGE_MSG.format(width, height) if key == "too_large" else None
+
+        return None
+
+    def _generate(self, images: List[Union[Image.Image, np.ndarray]]) -> List[str]:
+        """
+        Run the encoder and decoder once over a batch of RGB images.
+
+        Args:
+            images: Prepared RGB images
+
+        Returns:
+            Raw decoded strings, one per image
+        """
+        with torch.no_grad(), self._autocast():
+            pixel_values = self._normalize(self._to_device(self._preprocess(images)))
+
+            # Feed the graph-replayed encoder states straight to the decoder when available
+            encoder_hidden = self._encode(pixel_values)
+            if encoder_hidden is not None:
+                inputs = {'encoder_outputs': BaseModelOutput(last_hidden_state=encoder_hidden)}
             else:
-                return "TrOCR: Текст не распознан"
+                inputs = {'pixel_values': pixel_values}
 
-        except Exception as e:
-            logger.error(f"TrOCR processing error: {e}")
-            return f"TrOCR: Ошибка обработки - {str(e)}"
+            generated_ids = self.model.generate(**inputs, generation_config=self._gen_cfg)
+            return self.processor.batch_decode(
+                generated_ids,
+                skip_special_tokens=True
+            )
+
+    @staticmethod
+    def _validate_text(generated_text: str) -> str:
+        """Check a decoded string for hallucination patterns and return the final text."""
+        # Enhanced validation - check if result looks like nonsense
+        if not generated_text or len(generated_text.strip()) == 0:
+            return "TrOCR: Текст не распознан"
+
+        # Clean the text
+        generated_text = generated_text.strip()
+
+        # Check if the text is mostly repeating characters
+        if len(generated_text) > 5 and _is_repetitive(generated_text):
+            logger.warning(f"TrOCR generated repetitive text: {generated_text}")
+            return "TrOCR: Обнаружен повторяющийся результат. Возможно, изображение нечеткое или содержит много текста."
+
+        # Check for suspicious patterns
+        if _SUSPICIOUS_RE.search(generated_text):
+            logger.warning(f"TrOCR generated suspicious text: {generated_text}")
+            return "TrOCR: Обнаружен подозрительный результат распознавания. Изображение может быть слишком сложным для данной модели."
+
+        return generated_text
     
-    def process_image_regions(self, image: Image.Image, regions: List[tuple]) -> List[str]:
+    def process_image_regions(
+        self,
+        image: Union[Image.Image, np.ndarray],
+        regions: List[tuple],
+        batch_size: int = 16
+    ) -> List[str]:
         """
         Process multiple regions from an image.
         
         Args:
-            image: PIL Image
+            image: PIL Image or numpy array
             regions: List of (x1, y1, x2, y2) bounding boxes
+            batch_size: Number of regions recognized per model call
             
         Returns:
             List of extracted text strings
         """
-        results = []
+        # Convert the page once; crops are slices (views) of it, not copies
+        pixels = np.asarray(self._to_rgb(image))
+        crops = []
+        for x1, y1, x2, y2 in regions:
+            x1, y1 = max(int(x1), 0), max(int(y1), 0)
+            crops.append(pixels[y1:int(y2), x1:int(x2)])
         
-        for region in regions:
-            x1, y1, x2, y2 = region
-            # Crop region
-            cropped = image.crop((x1, y1, x2, y2))
-            # Extract text
-            text = self.process_image(cropped)
-            results.append(text)
+        return self.recognize_many(crops, batch_size=batch_size)
+    
+    def recognize_many(
+        self,
+        images: List[Union[Image.Image, np.ndarray]],
+        batch_size: int = 16
+    ) -> List[str]:
+        """
+        Recognize any number of text-line crops in batches of similar shape.
+        
+        Every crop is resized to the same model input, so batches need no
+        padding; but generate runs until the longest line in a batch is done.
+        Grouping crops by aspect ratio (a proxy for text length) keeps lines
+        of similar length together and cuts wasted decoding steps.
+        
+        Args:
+            images: PIL Images or RGB arrays
+            batch_size: Number of crops recognized per model call (bounds memory)
+            
+        Returns:
+            List of extracted text strings, same order as images
+        """
+        def aspect(idx):
+            width, height = self._image_size(images[idx])
+            return width / max(height, 1)
+        
+        order = sorted(range(len(images)), key=aspect)
+        results = [None] * len(images)
+        for i in range(0, len(order), batch_size):
+            chunk = order[i:i + batch_size]
+            for idx, text in zip(chunk, self.recognize_batch([images[idx] for idx in chunk])):
+                results[idx] = text
         
         return results
     
-    def run(self, path: str) -> str:
+    def recognize_batch(self, images: List[Image.Image]) -> List[str]:
+        """
+        Extract text from several images with one encoder+decoder pass.
+        
+        Args:
+            images: PIL Images (all are processed in a single batch)
+            
+        Returns:
+            List of extracted text strings, same order as images
+        """
+        images = [self._to_rgb(img) for img in images]
+        results = [self._check_size(*self._image_size(img)) for img in images]
+        ready = [idx for idx, rejection in enumerate(results) if rejection is None]
+        
+        if ready:
+            try:
+                texts = self._generate([images[idx] for idx in ready])
+                for idx, text in zip(ready, texts):
+                    results[idx] = self._validate_text(text)
+            except Exception as e:
+                # Fall back to per-image processing so one bad image does not fail the batch
+                logger.error(f"Batched TrOCR inference failed, processing one by one: {e}")
+                for idx in ready:
+                    results[idx] = self.extract_text(images[idx])
+        
+        return results
+    
+    def run(self, path: Union[str, np.ndarray]) -> str:
         """
         Main method to extract text from an image file.
 
         Args:
-            path: Path to image file
+            path: Path to image file, or an already decoded (H, W, 3) RGB array
 
         Returns:
             Extracted text string
         """
         try:
-            from pathlib import Path
+            # Decoded pixels: nothing to open, only the size check applies
+            if isinstance(path, np.ndarray):
+                rejection = self._check_size(*self._image_size(path))
+                if rejection is not None:
+                    return rejection
+                text = self._recognize_one(self._to_rgb(path))
+                return text if text else "TrOCR не смог распознать текст в изображении"
 
             file_path = Path(path)
 
@@ -235,26 +694,26 @@ class TrOCRWrapper:
                 logger.warning(f"PDF files not supported in TrOCR: {path}")
                 return "TrOCR не поддерживает PDF файлы. Используйте изображения PNG/JPG."
 
-            # Load image
-            image = Image.open(path)
-
-            # Add warning for complex documents
-            width, height = image.size
-            if width > 1500 or height > 1500:
-                logger.warning(f"Large complex image ({width}x{height}). TrOCR is designed for single text lines.")
-                return f"TrOCR: Изображение слишком большое ({width}x{height}). Данная модель предназначена для распознавания отдельных строк текста, а не полных документов. Рекомендуется использовать PaddleOCR или Tesseract для обработки сложных документов."
+            # Open lazily: only the header is read until the size check passes
+            with Image.open(path) as image:
+                rejection = self._check_size(*image.size)
+                if rejection is not None:
+                    return rejection
 
-            # For medium-large images, warn but still try to process
-            if width > 800 or height > 800:
-                logger.info(f"Processing large image ({width}x{height}). TrOCR may not perform optimally on full documents.")
+                # The model input is small, so let libjpeg decode at a reduced DCT scale
+                # (1/2, 1/4 or 1/8) that still covers the input size. Accepted images
+                # are at most 1500 px, so a larger target would never reduce anything
+                if image.format == 'JPEG':
+                    image.draft('RGB', self._input_size)
 
-            # Process entire image
-            text = self.extract_text(image)
+                # Process entire image
+                text = self._recognize_one(self._to_rgb(image))
 
             return text if text else "TrOCR не смог распознать текст в изображении"
 
         except Exception as e:
-            logger.error(f"Error processing {path}: {e}")
+            source = 'decoded image' if isinstance(path, np.ndarray) else path
+            logger.error(f"Error processing {source}: {e}")
             return f"Ошибка TrOCR: {str(e)}"
 
 
@@ -283,11 +742,35 @@ def init_trocr(
         # Можно попробовать другие модели для русского
         logger.info("Russian language detected. Using base model with warning.")
 
-    return TrOCRWrapper(model_name=model_name, device=device, cache_dir=cache_dir)
+    return TrOCRWrapper(model_name=model_name, device=device, cache_dir=cache_dir, compile_encoder=TROCR_COMPILE)
+
+
+# Serializes first-time model construction in _get_trocr
+_trocr_init_lock = threading.Lock()
+
+
+def _get_trocr(
+    model_name: str = 'microsoft/trocr-base-printed',
+    device: Optional[str] = None,
+    cache_dir: Optional[str] = None
+) -> TrOCRWrapper:
+    """
+    Return a shared TrOCRWrapper for (model_name, device, cache_dir).
+    
+    Loading the model takes seconds and over a gigabyte of memory,
+    so instances are reused across run_trocr/ensemble_with_paddle calls.
+    """
+    with _trocr_init_lock:
+        return _cached_trocr(model_name, device, cache_dir)
+
+
+@lru_cache(maxsize=4)
+def _cached_trocr(model_name: str, device: Optional[str], cache_dir: Optional[str]) -> TrOCRWrapper:
+    return init_trocr(model_name=model_name, device=device, cache_dir=cache_dir)
 
 
 def run_trocr(
-    path: str,
+    path: Union[str, np.ndarray],
     model: Optional[TrOCRWrapper] = None,
     model_name: str = 'microsoft/trocr-base-printed',
     device: Optional[str] = None
@@ -296,7 +779,7 @@ def run_trocr(
     Extract text from image using TrOCR.
     
     Args:
-        path: Path to image file
+        path: Path to image file or decoded RGB array
         model: Existing TrOCRWrapper instance (optional)
         model_name: Model to use if creating new instance
         device: Device to use if creating new instance
@@ -304,13 +787,39 @@ def run_trocr(
     Returns:
         Extracted text string
     """
-    # Use provided model or create new one
+    # Use provided model or the shared cached one
     if model is None:
-        model = init_trocr(model_name=model_name, device=device)
+        model = _get_trocr(model_name=model_name, device=device)
     
     return model.run(path)
 
 
+def run_trocr_batch(
+    images: List[Union[Image.Image, np.ndarray]],
+    model: Optional[TrOCRWrapper] = None,
+    model_name: str = 'microsoft/trocr-base-printed',
+    device: Optional[str] = None,
+    batch_size: int = 16
+) -> List[str]:
+    """
+    Extract text from many cropped text lines, batched by similar shape.
+    
+    Args:
+        images: PIL Images or decoded RGB arrays, one text line each
+        model: Existing TrOCRWrapper instance (optional)
+        model_name: Model to use if creating new instance
+        device: Device to use if creating new instance
+        batch_size: Number of crops per model call
+        
+    Returns:
+        List of extracted text strings, same order as images
+    """
+    if model is None:
+        model = _get_trocr(model_name=model_name, device=device)
+    
+    return model.recognize_many(images, batch_size=batch_size)
+
+
 # Ensemble helper function
 def ensemble_with_paddle(
     path: str,
@@ -356,7 +865,8 @@ class BatchTrOCR:
         self,
         model_name: str = 'microsoft/trocr-base-printed',
         device: Optional[str] = None,
-        batch_size: int = 8
+        batch_size: int = 8,
+        wrapper: Optional[TrOCRWrapper] = None
     ):
         """
         Initialize batch processor.
@@ -365,9 +875,47 @@ class BatchTrOCR:
             model_name: TrOCR model to use
             device: Device for processing
             batch_size: Number of images to process at once
+            wrapper: Existing TrOCRWrapper; by default the shared instance for
+                (model_name, device) is used, so no second copy of the model is loaded
         """
-        self.wrapper = TrOCRWrapper(model_name=model_name, device=device)
+        self.wrapper = wrapper if wrapper is not None else _get_trocr(model_name=model_name, device=device)
         self.batch_size = batch_size
+        # Decoding releases the GIL, so the next batch is loaded while the model runs.
+        # The loader pool is created on first use in each process: an executor used
+        # before fork never starts worker threads again in the child
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+    
+    def _loader_pool(self) -> ThreadPoolExecutor:
+        """Image loading pool of the current process."""
+        with self._executor_lock:
+            if self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+                self._executor_pid = os.getpid()
+            return self._executor
+    
+    def close(self) -> None:
+        """Shut down the image loading pool (it is recreated if the processor is used again)."""
+        with self._executor_lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=True)
+            self._executor = None
+            self._executor_pid = None
+    
+    @staticmethod
+    def _load_image(path: str) -> Optional[Union[Image.Image, np.ndarray]]:
+        """Load an image as RGB; returns None if it cannot be read."""
+        try:
+            if cv2 is not None:
+                # np.fromfile handles non-ASCII paths that cv2.imread cannot open
+                image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image is not None:
+                    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            return Image.open(path).convert('RGB')
+        except Exception as e:
+            logger.error(f"Error loading {path}: {e}")
+            return None
     
     def process_batch(self, image_paths: List[str]) -> List[str]:
         """
@@ -380,27 +928,30 @@ class BatchTrOCR:
             List of extracted text strings
         """
         results = []
+        chunks = [image_paths[i:i + self.batch_size] for i in range(0, len(image_paths), self.batch_size)]
         
-        for i in range(0, len(image_paths), self.batch_size):
-            batch_paths = image_paths[i:i + self.batch_size]
-            batch_images = []
+        executor = self._loader_pool()
+        
+        def submit(chunk):
+            return [executor.submit(self._load_image, path) for path in chunk]
+        
+        # Double buffering: batch N+1 is being loaded while batch N is recognized
+        pending = deque()
+        if chunks:
+            pending.append(submit(chunks[0]))
+        
+        for n in range(len(chunks)):
+            futures = pending.popleft()
+            if n + 1 < len(chunks):
+                pending.append(submit(chunks[n + 1]))
             
             # Load batch
-            for path in batch_paths:
-                try:
-                    img = Image.open(path).convert('RGB')
-                    batch_images.append(img)
-                except Exception as e:
-                    logger.error(f"Error loading {path}: {e}")
-                    batch_images.append(None)
+            batch_images = [future.result() for future in futures]
             
-            # Process batch
-            for img in batch_images:
-                if img is not None:
-                    text = self.wrapper.process_image(img)
-                    results.append(text)
-                else:
-                    results.append("")
+            # Process batch: one encoder+decoder pass for all loaded images
+            loaded = [img for img in batch_images if img is not None]
+            texts = iter(self.wrapper.recognize_batch(loaded))
+            results.extend(next(texts) if img is not None else "" for img in batch_images)
         
         return results
 
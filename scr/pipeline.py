@@ -0,0 +1,185 @@
+"""
+pipeline.py - Конвейер OCR многостраничных PDF
+
+Стадии работают в отдельных потоках и связаны очередями:
+рендер страниц (PyMuPDF) -> пакетный OCR -> сборка результата по страницам.
+Пока распознается пакет страниц, следующие страницы уже рендерятся.
+Пакет отправляется в OCR, когда набрано OCR_BATCH_SIZE страниц или
+с момента поступления самой старой прошло OCR_BATCH_TIMEOUT_MS.
+"""
+
+import importlib.util
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+PDF_SUPPORT = importlib.util.find_spec('fitz') is not None
+
+OCR_BATCH_SIZE = int(os.environ.get('OCR_BATCH_SIZE', '8'))
+OCR_BATCH_TIMEOUT_MS = int(os.environ.get('OCR_BATCH_TIMEOUT_MS', '50'))
+PDF_RENDER_DPI = int(os.environ.get('PDF_RENDER_DPI', '200'))
+
+# Сколько отрендеренных страниц может ждать OCR (ограничивает память и диск)
+PIPELINE_QUEUE_SIZE = 32
+
+
+class PdfJob:
+    """Задача распознавания одного PDF"""
+
+    def __init__(self, pdf_path: str, engine: str, language: str, use_llm: bool):
+        self.pdf_path = pdf_path
+        self.engine = engine
+        self.language = language
+        self.use_llm = use_llm
+        self.workdir = tempfile.mkdtemp(prefix='pdf_pages_')
+        self.total: Optional[int] = None
+        self.pages: Dict[int, Dict[str, Any]] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.done = threading.Event()
+
+    def finish(self, error: Optional[Exception] = None) -> None:
+        """Собирает результат по страницам (или ошибку) и будит ожидающих"""
+        if self.done.is_set():
+            return
+
+        if error is not None:
+            self.result = {
+                'success': False,
+                'error': str(error),
+                'engine': self.engine
+            }
+        else:
+            pages = [self.pages[i] for i in range(self.total)]
+            self.result = {
+                'success': any(page.get('success') for page in pages) or not pages,
+                'engine': self.engine,
+                'raw_text': '\n\n'.join(page.get('raw_text', '') for page in pages),
+                'page_count': self.total,
+                'pages': pages
+            }
+
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        self.done.set()
+
+
+class PdfPipeline:
+    """Трехстадийный конвейер OCR для PDF поверх OCRCoordinator.batch_process"""
+
+    def __init__(
+        self,
+        coordinator,
+        batch_size: int = OCR_BATCH_SIZE,
+        batch_timeout_ms: int = OCR_BATCH_TIMEOUT_MS,
+        dpi: int = PDF_RENDER_DPI
+    ):
+        self.coordinator = coordinator
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout_ms / 1000
+        self.dpi = dpi
+
+        self._jobs = queue.Queue()
+        self._pages = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._results = queue.Queue()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def process(
+        self,
+        pdf_path: str,
+        engine: str = 'PaddleOCR',
+        language: str = 'ru',
+        use_llm: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Распознает PDF постранично
+
+        Returns:
+            Результат с общим текстом (raw_text) и результатами страниц (pages)
+        """
+        job = PdfJob(pdf_path, engine, language, use_llm)
+        self._ensure_started()
+        self._jobs.put(job)
+        job.done.wait()
+        return job.result
+
+    def _ensure_started(self) -> None:
+        """Запускает потоки стадий в текущем процессе (потоки не переживают fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            for target in (self._render_worker, self._ocr_worker, self._collect_worker):
+                threading.Thread(target=target, name=f"pdf{target.__name__}", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _render_worker(self) -> None:
+        """Стадия 1: рендерит страницы PDF в PNG"""
+        import fitz
+
+        while True:
+            job = self._jobs.get()
+            try:
+                with fitz.open(job.pdf_path) as document:
+                    job.total = document.page_count
+                    if job.total == 0:
+                        job.finish()
+                        continue
+                    for page_idx, page in enumerate(document):
+                        page_path = os.path.join(job.workdir, f"page_{page_idx:04d}.png")
+                        page.get_pixmap(dpi=self.dpi).save(page_path)
+                        self._pages.put((job, page_idx, page_path))
+            except Exception as e:
+                job.finish(e)
+
+    def _next_batch(self) -> List[Tuple[PdfJob, int, str]]:
+        """Ждет первую страницу и добирает пакет до batch_size или до истечения batch_timeout"""
+        batch = [self._pages.get()]
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._pages.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _ocr_worker(self) -> None:
+        """Стадия 2: распознает пакеты страниц, сгруппированные по параметрам задач"""
+        while True:
+            groups = {}
+            for item in self._next_batch():
+                job = item[0]
+                groups.setdefault((job.engine, job.language, job.use_llm), []).append(item)
+
+            for (engine, language, use_llm), items in groups.items():
+                try:
+                    results = self.coordinator.batch_process(
+                        [page_path for _, _, page_path in items],
+                        engine=engine,
+                        micro_batch=len(items),
+                        language=language,
+                        use_llm=use_llm
+                    )
+                except Exception as e:
+                    results = [{'success': False, 'error': str(e), 'engine': engine} for _ in items]
+
+                for (job, page_idx, _), result in zip(items, results):
+                    self._results.put((job, page_idx, result))
+
+    def _collect_worker(self) -> None:
+        """Стадия 3: раскладывает результаты страниц по задачам"""
+        while True:
+            job, page_idx, result = self._results.get()
+            if job.done.is_set():
+                continue
+            result['page_num'] = page_idx + 1
+            job.pages[page_idx] = result
+            if len(job.pages) == job.total:
+                job.finish()
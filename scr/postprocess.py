@@ -3,14 +3,232 @@ postprocess.py - Постобработка результатов OCR
 Включает LLM обработку, правила и улучшение качества извлеченных данных
 """
 
+import asyncio
+import copy
+import hashlib
 import re
 import json
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
+from datetime import date, datetime
 import requests
 import os
 
 
+# Быстрая (де)сериализация JSON (orjson), с откатом на стандартный json
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+
+    def _dumps(obj, indent: bool = False, sort_keys: bool = False) -> str:
+        """Сериализация объекта в JSON строку (UTF-8 без экранирования кириллицы)"""
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=str, option=option).decode('utf-8')
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj, indent: bool = False, sort_keys: bool = False) -> str:
+        """Сериализация объекта в JSON строку (UTF-8 без экранирования кириллицы)"""
+        return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None,
+                          sort_keys=sort_keys, default=str)
+
+
+# Регулярные выражения компилируются один раз при загрузке модуля.
+# Шаблоны без re.IGNORECASE применяются к тексту, уже приведенному к нижнему регистру
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+_DATE_RE = re.compile(r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\b')
+_SUM_RE = re.compile(r'(\d{1,3}(?:[\s,]\d{3})*(?:[.,]\d{1,2})?)\s*(?:руб|рублей|р\.|₽)')
+# ФИО ищется по классифицированному тексту; _FIO_CLASS_RE эквивалентен
+# r'\b([А-ЯЁ][а-яё]+)\s+([А-ЯЁ][а-яё]+)(?:\s+([А-ЯЁ][а-яё]+))?\b' по исходному.
+# Классификатор символов: заглавные кириллические буквы -> 'U', строчные -> 'l',
+# латинские 'U'/'l' -> 'w' (тоже буква, чтобы не менялись границы слов \b), остальные без изменений.
+# Поиск идет по классифицированной строке той же длины, позиции совпадают с исходным текстом
+_FIO_CLASSES = str.maketrans({
+    **{chr(c): 'U' for c in range(ord('А'), ord('Я') + 1)}, 'Ё': 'U',
+    **{chr(c): 'l' for c in range(ord('а'), ord('я') + 1)}, 'ё': 'l',
+    'U': 'w', 'l': 'w',
+})
+_FIO_CLASS_RE = re.compile(r'\b(Ul+)\s+(Ul+)(?:\s+(Ul+))?\b')
+_PHONE_RE = re.compile(r'(?:\+7|8|7)?[\s\-]?\(?\d{3}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}')
+_EMAIL_RE = re.compile(r'\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[|a-z]{2,}\b')
+_EMAIL_FULL_RE = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}$', re.IGNORECASE)
+_INN_RE = re.compile(r'\b\d{10}\b|\b\d{12}\b')
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_DATE_ANY_RE = re.compile(r'^(\d{1,4})([.\-/])(\d{1,2})\2(\d{1,4})$')
+_NON_PHONE_CHARS_RE = re.compile(r'[^\d+]')
+_NON_DIGITS_RE = re.compile(r'[^\d]')
+_NON_AMOUNT_CHARS_RE = re.compile(r'[^\d.,]')
+
+# Адрес ищется по ключевым словам в порядке приоритета.
+# Применяется к исходному тексту, чтобы сохранить регистр найденного адреса
+_ADDRESS_RES = {
+    keyword: re.compile(rf'{keyword}[:\s]+([^,\n]+(?:,[^,\n]+)*)', re.IGNORECASE)
+    for keyword in ('адрес', 'проживает', 'зарегистрирован', 'местонахождение')
+}
+
+# Варианты записи номеров документов
+_NUMBER_RES = (
+    re.compile(r'№\s*(\d+(?:[-/]\d+)*)'),
+    re.compile(r'номер[:\s]+(\d+(?:[-/]\d+)*)'),
+    re.compile(r'договор[:\s]+№?\s*(\d+(?:[-/]\d+)*)')
+)
+
+# Ключевые слова типов документов, в порядке приоритета
+_DOC_KEYWORDS = {
+    'договор': ['договор', 'контракт', 'соглашение'],
+    'счет': ['счет', 'invoice', 'фактура'],
+    'заявление': ['заявление', 'заявка'],
+    'акт': ['акт'],
+    'справка': ['справка', 'выписка']
+}
+
+# Варианты написания для нормализации типа документа
+_DOC_TYPE_VARIANTS = {
+    'договор': ['договор', 'контракт', 'соглашение'],
+    'счет': ['счет', 'счёт', 'invoice', 'фактура'],
+    'заявление': ['заявление', 'заявка', 'обращение'],
+    'справка': ['справка', 'выписка', 'подтверждение']
+}
+
+
+def _compile_keyword_index(keywords_by_type: Dict[str, List[str]]):
+    """
+    Сборка одного регулярного выражения по всем ключевым словам
+
+    Просмотр вперед находит ключевые слова на каждой позиции, в том числе
+    вложенные в другие (например, "акт" в "контракт").
+
+    Returns:
+        (скомпилированный шаблон, {ключевое слово: (приоритет, тип)})
+    """
+    index = {}
+    for rank, (doc_type, keywords) in enumerate(keywords_by_type.items()):
+        for keyword in keywords:
+            index.setdefault(keyword, (rank, doc_type))
+    alternation = '|'.join(map(re.escape, sorted(index, key=len, reverse=True)))
+    return re.compile(f'(?=({alternation}))'), index
+
+
+_DOC_KEYWORDS_RE, _DOC_KEYWORDS_INDEX = _compile_keyword_index(_DOC_KEYWORDS)
+_DOC_TYPE_VARIANTS_RE, _DOC_TYPE_VARIANTS_INDEX = _compile_keyword_index(_DOC_TYPE_VARIANTS)
+
+
+def _match_doc_type(text_lower: str, pattern: re.Pattern, index: Dict[str, tuple]) -> Optional[str]:
+    """Тип документа с наивысшим приоритетом среди найденных в тексте ключевых слов"""
+    best = None
+    for match in pattern.finditer(text_lower):
+        rank, doc_type = index[match.group(1)]
+        if rank == 0:
+            return doc_type
+        if best is None or rank < best[0]:
+            best = (rank, doc_type)
+    return best[1] if best else None
+
+
+
+# Кэш ответов LLM и результатов постобработки по хэшу содержимого.
+# При заданном LLM_CACHE_DIR ответы LLM сохраняются и на диск
+_RESPONSE_CACHE_SIZE = 256
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '86400'))
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR')
+
+_response_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+def _cache_key(*parts: str) -> str:
+    """Хэш частей ключа кэша"""
+    return hashlib.blake2b('\0'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Возвращает копию закэшированного результата или None (в том числе по истечении TTL)"""
+    now = time.time()
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry is not None and entry[0] < now:
+            del _response_cache[key]
+            entry = None
+        if entry is not None:
+            _response_cache.move_to_end(key)
+
+    if entry is None and LLM_CACHE_DIR:
+        cache_file = Path(LLM_CACHE_DIR) / f"{key}.json"
+        try:
+            expires = cache_file.stat().st_mtime + LLM_CACHE_TTL
+            if expires >= now:
+                entry = (expires, _loads(cache_file.read_bytes()))
+                _cache_put(key, entry[1], persist=False, expires=expires)
+        except (OSError, ValueError):
+            entry = None
+
+    if entry is None:
+        return None
+    # Копируем, чтобы изменения вызывающего кода не портили кэш
+    return copy.deepcopy(entry[1])
+
+
+def _cache_put(key: str, result: Dict[str, Any], persist: bool = False,
+               expires: Optional[float] = None) -> None:
+    """Сохраняет результат в LRU-кэш и, если persist и задан LLM_CACHE_DIR, на диск"""
+    if expires is None:
+        expires = time.time() + LLM_CACHE_TTL
+    with _response_cache_lock:
+        _response_cache[key] = (expires, copy.deepcopy(result))
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > _RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+    if persist and LLM_CACHE_DIR:
+        try:
+            cache_dir = Path(LLM_CACHE_DIR)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            (cache_dir / f"{key}.json").write_text(_dumps(result), encoding='utf-8')
+        except (OSError, TypeError) as e:
+            print(f"⚠️ Не удалось записать кэш LLM: {e}")
+
+
+def _llm_backend(model_type: str) -> str:
+    """Фактически используемый обработчик: 'openai', 'local' или 'mock'"""
+    if model_type == 'openai' and os.getenv('OPENAI_API_KEY'):
+        return 'openai'
+    if model_type == 'local':
+        return 'local'
+    return 'mock'
+
+
+def _llm_cache_key(raw_text: str, backend: str) -> str:
+    return _cache_key('llm', backend, raw_text)
+
+
+def _cache_llm_result(key: str, result: Optional[Dict[str, Any]]) -> None:
+    """Кэширует только успешные ответы, чтобы ошибки API не закреплялись на время TTL"""
+    if result and result.get('success') and 'error' not in result:
+        _cache_put(key, result, persist=True)
+
+
+# Если правила извлекли поля с такой уверенностью, LLM не вызывается
+LLM_RULES_CONFIDENCE = float(os.getenv('LLM_RULES_CONFIDENCE', '0.8'))
+
+
+def _confident_rules_result(raw_text: str) -> Optional[Dict[str, Any]]:
+    """Результат правил, если он достаточно полный, чтобы не обращаться к LLM"""
+    result = _mock_llm_response(raw_text)
+    if _calculate_extraction_confidence(result) >= LLM_RULES_CONFIDENCE:
+        result['llm_skipped'] = True
+        return result
+    return None
+
+
 def call_llm_to_json(raw_text: str, model_type: str = 'openai') -> Dict[str, Any]:
     """
     Обработка текста с помощью LLM для извлечения структурированных данных
@@ -28,71 +246,198 @@ def call_llm_to_json(raw_text: str, model_type: str = 'openai') -> Dict[str, Any
             'success': False
         }
 
+    # Простые документы полностью разбираются правилами, без медленного вызова LLM
+    backend = _llm_backend(model_type)
+    if backend != 'mock':
+        rules_result = _confident_rules_result(raw_text)
+        if rules_result is not None:
+            return rules_result
+
+    # Повторная обработка того же текста берется из кэша
+    cache_key = _llm_cache_key(raw_text, backend)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
     # Проверяем какой тип LLM использовать
-    if model_type == 'openai' and os.getenv('OPENAI_API_KEY'):
-        return _call_openai_api(raw_text)
-    elif model_type == 'local':
-        return _call_local_llm(raw_text)
+    if backend == 'openai':
+        result = _call_openai_api(raw_text)
+    elif backend == 'local':
+        result = _call_local_llm(raw_text)
     else:
         # Fallback на правила-базированную обработку
         print("⚠️ LLM недоступен, используем правила-базированную обработку")
-        return _mock_llm_response(raw_text)
+        result = _mock_llm_response(raw_text)
 
+    _cache_llm_result(cache_key, result)
+    return result
 
-def _call_openai_api(text: str) -> Dict[str, Any]:
-    """Вызов OpenAI API для обработки текста"""
-    try:
-        import openai
 
-        client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+def call_llm_to_json_batch(raw_texts: List[str], model_type: str = 'openai',
+                           batch_size: int = 10) -> List[Dict[str, Any]]:
+    """
+    Пакетная обработка нескольких текстов через LLM
+
+    Для OpenAI документы группируются по batch_size в один запрос, что
+    экономит задержку и накладные расходы на каждый вызов API.
+
+    Args:
+        raw_texts: Сырые тексты от OCR
+        model_type: Тип модели ('openai', 'local', 'mock')
+        batch_size: Количество документов в одном запросе к API
+
+    Returns:
+        Список словарей с извлеченными полями, в порядке raw_texts
+    """
+    backend = _llm_backend(model_type)
+    if backend == 'local':
+        # Ollama группирует одновременные запросы сам, поэтому документы отправляются параллельно
+        return call_llm_to_json_concurrent(raw_texts, 'local')
+    if backend != 'openai':
+        return [call_llm_to_json(text, model_type) for text in raw_texts]
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(raw_texts)
+    pending = []
+    for i, text in enumerate(raw_texts):
+        if text and text.strip():
+            results[i] = _confident_rules_result(text) or _cache_get(_llm_cache_key(text, 'openai'))
+            if results[i] is None:
+                pending.append(i)
+        else:
+            results[i] = call_llm_to_json(text, model_type)
 
-        prompt = f"""
-        Проанализируй следующий текст документа и извлеки структурированную информацию в JSON формате.
-        Найди и верни следующие поля если они есть:
-        - fio: полное имя человека
-        - date: любые даты в формате YYYY-MM-DD
-        - sum: денежные суммы как числа
-        - contract_number: номера договоров/контрактов
-        - phone: номера телефонов
-        - email: адреса электронной почты
-        - inn: ИНН (10 или 12 цифр)
-        - address: адреса
-        - doc_type: тип документа (договор, счет, заявление и т.д.)
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        batch_results = _call_openai_api_batch([raw_texts[i] for i in chunk])
+        for i, result in zip(chunk, batch_results):
+            # Документы, пропущенные в пакетном ответе, обрабатываются по одному
+            results[i] = result if result is not None else _call_openai_api(raw_texts[i])
+            _cache_llm_result(_llm_cache_key(raw_texts[i], 'openai'), results[i])
 
-        Текст документа:
-        {text}
+    return results
 
-        Ответ в формате JSON:
-        """
+
+# Клиент OpenAI создается один раз и переиспользует пул HTTP соединений между запросами;
+# пересоздается только при смене OPENAI_API_KEY
+_openai_client = None
+_openai_client_key = None
+_openai_client_lock = threading.Lock()
+
+
+def _get_openai_client():
+    """Общий клиент OpenAI для текущего OPENAI_API_KEY"""
+    global _openai_client, _openai_client_key
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    with _openai_client_lock:
+        if _openai_client is None or _openai_client_key != api_key:
+            import httpx
+            import openai
+
+            _openai_client = openai.OpenAI(
+                api_key=api_key,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+                )
+            )
+            _openai_client_key = api_key
+        return _openai_client
+
+
+# Параметры запросов к OpenAI: короткая инструкция и гарантированный JSON в ответе.
+# Ответ - несколько коротких полей, поэтому лимит токенов небольшой
+_OPENAI_MODEL = "gpt-4o-mini"
+_OPENAI_MAX_TOKENS = 256
+_OPENAI_RESPONSE_FORMAT = {"type": "json_object"}
+_OPENAI_SYSTEM_PROMPT = "Extract document fields. Reply with one JSON object."
+_OPENAI_FIELDS = ("fio, date (YYYY-MM-DD), sum (number), contract_number, phone, email, "
+                  "inn (10 or 12 digits), address, doc_type (договор, счет, заявление, ...)")
+
+
+def _call_openai_api_batch(texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Один вызов OpenAI API для нескольких пронумерованных документов
+
+    Returns:
+        Результат для каждого документа; None, если документ отсутствует в ответе
+    """
+    try:
+        client = _get_openai_client()
+
+        documents = '\n\n'.join(f'### {i}\n{text}' for i, text in enumerate(texts))
+        prompt = (f'Fields: {_OPENAI_FIELDS}. Omit missing fields. For each numbered document return '
+                  f'{{"documents": [{{"id": <number>, ...fields}}]}}.\n\n{documents}')
 
         response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+            model=_OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": "Ты эксперт по извлечению данных из документов. Отвечай только в JSON формате."},
+                {"role": "system", "content": _OPENAI_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=1000,
+            max_tokens=_OPENAI_MAX_TOKENS * len(texts),
+            response_format=_OPENAI_RESPONSE_FORMAT,
             temperature=0
         )
 
-        result_text = response.choices[0].message.content
+        parsed = _loads(response.choices[0].message.content)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        for item in parsed.get('documents', []):
+            doc_id = item.pop('id', None)
+            if isinstance(doc_id, int) and 0 <= doc_id < len(texts):
+                item['llm_processed'] = True
+                item['llm_model'] = 'openai'
+                item['success'] = True
+                results[doc_id] = item
+        return results
 
-        # Пытаемся распарсить JSON
-        try:
-            result = json.loads(result_text)
-            result['llm_processed'] = True
-            result['llm_model'] = 'openai'
-            result['success'] = True
-            return result
-        except json.JSONDecodeError:
-            # Если JSON невалидный, возвращаем как есть
-            return {
-                'raw_llm_response': result_text,
-                'llm_processed': True,
-                'llm_model': 'openai',
-                'success': True,
-                'error': 'Невалидный JSON от LLM'
-            }
+    except Exception as e:
+        # При ошибке пакета каждый документ будет обработан отдельным запросом
+        print(f"⚠️ Ошибка пакетного запроса OpenAI: {e}")
+        return [None] * len(texts)
+
+
+def _openai_messages(text: str) -> List[Dict[str, str]]:
+    """Сообщения запроса к OpenAI для одного документа"""
+    return [
+        {"role": "system", "content": _OPENAI_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Fields: {_OPENAI_FIELDS}. Omit missing fields.\n\n{text}"}
+    ]
+
+
+def _parse_openai_response(result_text: str) -> Dict[str, Any]:
+    """Разбор ответа OpenAI в словарь полей"""
+    # JSON режим гарантирует валидный объект, кроме ответа, обрезанного по max_tokens
+    try:
+        result = _loads(result_text)
+        result['llm_processed'] = True
+        result['llm_model'] = 'openai'
+        result['success'] = True
+        return result
+    except json.JSONDecodeError:
+        # Если JSON невалидный, возвращаем как есть
+        return {
+            'raw_llm_response': result_text,
+            'llm_processed': True,
+            'llm_model': 'openai',
+            'success': True,
+            'error': 'Невалидный JSON от LLM'
+        }
+
+
+def _call_openai_api(text: str) -> Dict[str, Any]:
+    """Вызов OpenAI API для обработки текста"""
+    try:
+        client = _get_openai_client()
+
+        response = client.chat.completions.create(
+            model=_OPENAI_MODEL,
+            messages=_openai_messages(text),
+            max_tokens=_OPENAI_MAX_TOKENS,
+            response_format=_OPENAI_RESPONSE_FORMAT,
+            temperature=0
+        )
+
+        return _parse_openai_response(response.choices[0].message.content)
 
     except Exception as e:
         return {
@@ -102,47 +447,136 @@ def _call_openai_api(text: str) -> Dict[str, Any]:
         }
 
 
-def _call_local_llm(text: str) -> Dict[str, Any]:
-    """Вызов локальной LLM модели"""
+def call_llm_to_json_stream(raw_text: str, model_type: str = 'openai') -> Iterator[Dict[str, Any]]:
+    """
+    Потоковая обработка текста через LLM
+
+    Для OpenAI фрагменты ответа отдаются по мере генерации, поэтому
+    интерфейс может показывать прогресс, не дожидаясь полного ответа.
+    Для остальных обработчиков и закэшированных текстов сразу отдается
+    готовый результат.
+
+    Args:
+        raw_text: Сырой текст от OCR
+        model_type: Тип модели ('openai', 'local', 'mock')
+
+    Yields:
+        {'delta': фрагмент ответа}, затем {'result': словарь с извлеченными полями}
+    """
+    backend = _llm_backend(model_type)
+    cache_key = _llm_cache_key(raw_text or '', backend)
+    if backend != 'openai' or not raw_text or not raw_text.strip() or _cache_get(cache_key) is not None \
+            or _confident_rules_result(raw_text) is not None:
+        yield {'result': call_llm_to_json(raw_text, model_type)}
+        return
+
+    chunks = []
     try:
-        # Пример вызова локальной модели (Ollama, LocalAI и т.д.)
-        # Здесь должен быть код для вашей локальной модели
+        for delta in _call_openai_api_stream(raw_text):
+            chunks.append(delta)
+            yield {'delta': delta}
+    except Exception as e:
+        yield {'result': {
+            'error': f'Ошибка OpenAI API: {str(e)}',
+            'success': False,
+            'llm_processed': False
+        }}
+        return
+
+    result = _parse_openai_response(''.join(chunks))
+    _cache_llm_result(cache_key, result)
+    yield {'result': result}
+
+
+def _call_openai_api_stream(text: str) -> Iterator[str]:
+    """Вызов OpenAI API с потоковой выдачей фрагментов ответа"""
+    client = _get_openai_client()
+
+    stream = client.chat.completions.create(
+        model=_OPENAI_MODEL,
+        messages=_openai_messages(text),
+        max_tokens=_OPENAI_MAX_TOKENS,
+        response_format=_OPENAI_RESPONSE_FORMAT,
+        temperature=0,
+        stream=True
+    )
+
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+# Адрес и параметры локальной LLM (Ollama).
+# Параллельные запросы идут в OpenAI-совместимый эндпоинт, который Ollama группирует на сервере
+_LOCAL_LLM_URL = 'http://localhost:11434/api/generate'
+_LOCAL_LLM_CHAT_URL = 'http://localhost:11434/v1/chat/completions'
+_LOCAL_LLM_MODEL = 'llama2'  # или другая модель
+_LOCAL_LLM_TIMEOUT = 30
 
-        # Пример для Ollama
-        response = requests.post('http://localhost:11434/api/generate', json={
-            'model': 'llama2',  # или другая модель
-            'prompt': f'''
+# Одна сессия на модуль: соединение с локальной LLM переиспользуется между вызовами
+_SESSION = requests.Session()
+
+
+def _local_llm_prompt(text: str) -> str:
+    """Запрос к локальной LLM"""
+    return f'''
             Extract structured data from this document text as JSON:
 
             {text}
 
             Return JSON with fields: fio, date, sum, phone, email, inn, doc_type
-            ''',
-            'stream': False
-        }, timeout=30)
+            '''
+
+
+def _local_llm_payload(text: str) -> Dict[str, Any]:
+    """Тело запроса к /api/generate локальной LLM"""
+    return {
+        'model': _LOCAL_LLM_MODEL,
+        'prompt': _local_llm_prompt(text),
+        'stream': False
+    }
+
+
+def _local_llm_chat_payload(text: str) -> Dict[str, Any]:
+    """Тело запроса к OpenAI-совместимому /v1/chat/completions локальной LLM"""
+    return {
+        'model': _LOCAL_LLM_MODEL,
+        'messages': [{'role': 'user', 'content': _local_llm_prompt(text)}],
+        'temperature': 0
+    }
+
+
+def _parse_local_llm_response(llm_text: str) -> Dict[str, Any]:
+    """Разбор ответа локальной LLM в словарь полей"""
+    # Пытаемся извлечь JSON из ответа
+    json_match = _JSON_OBJECT_RE.search(llm_text)
+    if json_match:
+        try:
+            parsed = _loads(json_match.group())
+            parsed['llm_processed'] = True
+            parsed['llm_model'] = 'local'
+            parsed['success'] = True
+            return parsed
+        except json.JSONDecodeError:
+            pass
+
+    return {
+        'raw_llm_response': llm_text,
+        'llm_processed': True,
+        'llm_model': 'local',
+        'success': True
+    }
+
+
+def _call_local_llm(text: str) -> Dict[str, Any]:
+    """Вызов локальной LLM модели"""
+    try:
+        # Пример вызова локальной модели (Ollama, LocalAI и т.д.)
+        # Здесь должен быть код для вашей локальной модели
+        response = _SESSION.post(_LOCAL_LLM_URL, json=_local_llm_payload(text), timeout=_LOCAL_LLM_TIMEOUT)
 
         if response.status_code == 200:
-            result = response.json()
-            llm_text = result.get('response', '')
-
-            # Пытаемся извлечь JSON из ответа
-            json_match = re.search(r'\{.*\}', llm_text, re.DOTALL)
-            if json_match:
-                try:
-                    parsed = json.loads(json_match.group())
-                    parsed['llm_processed'] = True
-                    parsed['llm_model'] = 'local'
-                    parsed['success'] = True
-                    return parsed
-                except json.JSONDecodeError:
-                    pass
-
-            return {
-                'raw_llm_response': llm_text,
-                'llm_processed': True,
-                'llm_model': 'local',
-                'success': True
-            }
+            return _parse_local_llm_response(response.json().get('response', ''))
 
     except Exception as e:
         return {
@@ -152,77 +586,217 @@ def _call_local_llm(text: str) -> Dict[str, Any]:
         }
 
 
+# Параллельная обработка: лимит одновременных запросов и повторы с экспоненциальной задержкой
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '20'))
+_LLM_MAX_ATTEMPTS = 3
+
+
+def call_llm_to_json_concurrent(raw_texts: List[str], model_type: str = 'openai',
+                                max_concurrency: int = LLM_MAX_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Параллельная обработка нескольких текстов через LLM
+
+    Запросы выполняются одновременно (не более max_concurrency) через
+    один пул соединений, поэтому общее время близко к времени самого
+    медленного запроса, а не к сумме всех.
+
+    Args:
+        raw_texts: Сырые тексты от OCR
+        model_type: Тип модели ('openai', 'local', 'mock')
+        max_concurrency: Максимум одновременных запросов
+
+    Returns:
+        Список словарей с извлеченными полями, в порядке raw_texts
+    """
+    use_openai = model_type == 'openai' and os.getenv('OPENAI_API_KEY')
+    if not (use_openai or model_type == 'local'):
+        return [call_llm_to_json(text, model_type) for text in raw_texts]
+
+    return asyncio.run(_call_llm_concurrent(raw_texts, 'openai' if use_openai else 'local', max_concurrency))
+
+
+async def _call_llm_concurrent(raw_texts: List[str], model_type: str,
+                               max_concurrency: int) -> List[Dict[str, Any]]:
+    """Запуск всех запросов с общим семафором и пулом соединений"""
+    import httpx
+
+    sem = asyncio.Semaphore(max_concurrency)
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+
+    async def call_one(text, client):
+        if not text or not text.strip():
+            return call_llm_to_json(text, model_type)
+        cache_key = _llm_cache_key(text, model_type)
+        result = _confident_rules_result(text) or _cache_get(cache_key)
+        if result is None:
+            if model_type == 'openai':
+                result = await _call_openai_api_async(text, sem, client)
+            else:
+                result = await _call_local_llm_async(text, sem, client)
+            _cache_llm_result(cache_key, result)
+        return result
+
+    async with httpx.AsyncClient(limits=limits, timeout=_LOCAL_LLM_TIMEOUT) as http_client:
+        if model_type == 'openai':
+            import openai
+            client = openai.AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=http_client)
+        else:
+            client = http_client
+        return await asyncio.gather(*[call_one(text, client) for text in raw_texts])
+
+
+async def _call_openai_api_async(text: str, sem: asyncio.Semaphore, client) -> Dict[str, Any]:
+    """Асинхронный вызов OpenAI API с повторами при ошибках"""
+    async with sem:
+        for attempt in range(_LLM_MAX_ATTEMPTS):
+            try:
+                response = await client.chat.completions.create(
+                    model=_OPENAI_MODEL,
+                    messages=_openai_messages(text),
+                    max_tokens=_OPENAI_MAX_TOKENS,
+                    response_format=_OPENAI_RESPONSE_FORMAT,
+                    temperature=0
+                )
+                return _parse_openai_response(response.choices[0].message.content)
+
+            except Exception as e:
+                if attempt + 1 == _LLM_MAX_ATTEMPTS:
+                    return {
+                        'error': f'Ошибка OpenAI API: {str(e)}',
+                        'success': False,
+                        'llm_processed': False
+                    }
+                await asyncio.sleep(2 ** attempt)
+
+
+async def _call_local_llm_async(text: str, sem: asyncio.Semaphore, client) -> Dict[str, Any]:
+    """Асинхронный вызов локальной LLM с повторами при ошибках"""
+    async with sem:
+        for attempt in range(_LLM_MAX_ATTEMPTS):
+            try:
+                response = await client.post(_LOCAL_LLM_CHAT_URL, json=_local_llm_chat_payload(text))
+                response.raise_for_status()
+                return _parse_local_llm_response(response.json()['choices'][0]['message']['content'] or '')
+
+            except Exception as e:
+                if attempt + 1 == _LLM_MAX_ATTEMPTS:
+                    return {
+                        'error': f'Ошибка локальной LLM: {str(e)}',
+                        'success': False,
+                        'llm_processed': False
+                    }
+                await asyncio.sleep(2 ** attempt)
+
+
+def _handle_date(match: re.Match, result: Dict[str, Any]) -> None:
+    try:
+        day, month, year = match.groups()
+        date_obj = datetime(int(year), int(month), int(day))
+        result['date'] = date_obj.strftime('%Y-%m-%d')
+    except ValueError:
+        pass
+
+
+def _handle_sum(match: re.Match, result: Dict[str, Any]) -> None:
+    try:
+        sum_str = match.group(1).replace(' ', '').replace(',', '.')
+        result['sum'] = float(sum_str)
+    except ValueError:
+        pass
+
+
+def _find_fio(text: str) -> Optional[Tuple[Optional[str], ...]]:
+    """Части первого ФИО в тексте (третья может быть None) или None"""
+    match = _FIO_CLASS_RE.search(text.translate(_FIO_CLASSES))
+    if match is None:
+        return None
+    return tuple(text[start:end] if start >= 0 else None for start, end in
+                 (match.span(i) for i in range(1, 4)))
+
+
+def _handle_fio(fio_groups: Tuple[Optional[str], ...], result: Dict[str, Any]) -> None:
+    fio_parts = [part for part in fio_groups if part]
+    result['fio'] = ' '.join(fio_parts)
+
+
+def _handle_phone(match: re.Match, result: Dict[str, Any]) -> None:
+    phone = _NON_PHONE_CHARS_RE.sub('', match.group())
+    if len(phone) >= 10:
+        result['phone'] = phone
+
+
+def _handle_email(match: re.Match, result: Dict[str, Any]) -> None:
+    result['email'] = match.group()
+
+
+def _handle_inn(match: re.Match, result: Dict[str, Any]) -> None:
+    result['inn'] = match.group()
+
+
+# Обработчики первого найденного вхождения каждого поля, в порядке полей результата
+_FIELD_HANDLERS = {
+    'date': _handle_date,
+    'sum': _handle_sum,
+    'fio': _handle_fio,
+    'phone': _handle_phone,
+    'email': _handle_email,
+    'inn': _handle_inn,
+}
+
+# Поля, которые ищутся в тексте в нижнем регистре за один проход
+_SCAN_FIELDS = {
+    'date': _DATE_RE,
+    'sum': _SUM_RE,
+    'phone': _PHONE_RE,
+    'email': _EMAIL_RE,
+    'inn': _INN_RE,
+}
+
+# Нулевой ширины просмотр вперед находит каждую позицию, где начинается хотя бы одно поле,
+# включая поля, перекрывающиеся с другими (ИНН также подходит под шаблон телефона)
+_FIELD_SCAN_RE = re.compile('(?=' + '|'.join(f'(?:{p.pattern})' for p in _SCAN_FIELDS.values()) + ')')
+
+
+def _scan_fields(text_lower: str) -> Dict[str, re.Match]:
+    """Первое (самое левое) вхождение каждого поля из _SCAN_FIELDS"""
+    found = {}
+    for candidate in _FIELD_SCAN_RE.finditer(text_lower):
+        pos = candidate.start()
+        for field, pattern in _SCAN_FIELDS.items():
+            if field not in found:
+                match = pattern.match(text_lower, pos)
+                if match:
+                    found[field] = match
+        if len(found) == len(_SCAN_FIELDS):
+            break
+    return found
+
+
 def _mock_llm_response(text: str) -> Dict[str, Any]:
     """Имитация LLM ответа с помощью правил"""
     # Используем простые регулярные выражения для извлечения данных
-    result = {
+    result = ExtractionResult({
         'llm_processed': False,
         'llm_model': 'mock_rules',
         'success': True
-    }
+    })
 
-    # Даты
-    date_pattern = r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\b'
-    date_matches = re.findall(date_pattern, text)
-    if date_matches:
-        try:
-            day, month, year = date_matches[0]
-            date_obj = datetime(int(year), int(month), int(day))
-            result['date'] = date_obj.strftime('%Y-%m-%d')
-        except ValueError:
-            pass
+    # Нижний регистр считается один раз для всех нечувствительных к регистру поисков
+    text_lower = text.lower()
 
-    # Суммы
-    sum_pattern = r'(\d{1,3}(?:[\s,]\d{3})*(?:[.,]\d{1,2})?)\s*(?:руб|рублей|р\.|₽)'
-    sum_matches = re.findall(sum_pattern, text, re.IGNORECASE)
-    if sum_matches:
-        try:
-            sum_str = sum_matches[0].replace(' ', '').replace(',', '.')
-            result['sum'] = float(sum_str)
-        except ValueError:
-            pass
+    # Первое вхождение каждого поля: один проход по тексту для всех шаблонов,
+    # ФИО - отдельно по исходному тексту, так как шаблон зависит от регистра
+    matches = _scan_fields(text_lower)
+    matches['fio'] = _find_fio(text)
 
-    # ФИО (простое извлечение)
-    fio_pattern = r'\b([А-ЯЁ][а-яё]+)\s+([А-ЯЁ][а-яё]+)(?:\s+([А-ЯЁ][а-яё]+))?\b'
-    fio_matches = re.findall(fio_pattern, text)
-    if fio_matches:
-        fio_parts = [part for part in fio_matches[0] if part]
-        result['fio'] = ' '.join(fio_parts)
-
-    # Телефон
-    phone_pattern = r'(?:\+7|8|7)?[\s\-]?\(?\d{3}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}'
-    phone_matches = re.findall(phone_pattern, text)
-    if phone_matches:
-        phone = re.sub(r'[^\d+]', '', phone_matches[0])
-        if len(phone) >= 10:
-            result['phone'] = phone
-
-    # Email
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    email_matches = re.findall(email_pattern, text, re.IGNORECASE)
-    if email_matches:
-        result['email'] = email_matches[0].lower()
-
-    # ИНН
-    inn_pattern = r'\b\d{10}\b|\b\d{12}\b'
-    inn_matches = re.findall(inn_pattern, text)
-    if inn_matches:
-        result['inn'] = inn_matches[0]
-
-    # Тип документа (простая эвристика)
-    doc_keywords = {
-        'договор': ['договор', 'контракт', 'соглашение'],
-        'счет': ['счет', 'invoice', 'фактура'],
-        'заявление': ['заявление', 'заявка'],
-        'акт': ['акт'],
-        'справка': ['справка', 'выписка']
-    }
+    for field, handler in _FIELD_HANDLERS.items():
+        if matches.get(field) is not None:
+            handler(matches[field], result)
 
-    text_lower = text.lower()
-    for doc_type, keywords in doc_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            result['doc_type'] = doc_type
-            break
+    # Тип документа (простая эвристика): один проход по тексту для всех ключевых слов
+    doc_type = _match_doc_type(text_lower, _DOC_KEYWORDS_RE, _DOC_KEYWORDS_INDEX)
+    if doc_type:
+        result['doc_type'] = doc_type
 
     return result
 
@@ -238,16 +812,69 @@ def rules_based_postprocess(extracted_data: Dict, raw_text: str) -> Dict[str, An
     Returns:
         Очищенные и улучшенные данные
     """
-    result = extracted_data.copy() if extracted_data else {}
+    # Повторная обработка тех же данных берется из кэша
+    cache_key = _rules_cache_key(extracted_data, raw_text)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = _rules_postprocess((extracted_data, raw_text))
+    _cache_put(cache_key, result)
+    return result
+
+
+# Меньше документов обрабатывается в текущем процессе: запуск пула процессов дороже
+_RULES_BATCH_MIN_PARALLEL = 16
+
+
+def rules_based_postprocess_batch(items: List[Tuple[Dict, str]]) -> List[Dict[str, Any]]:
+    """
+    Правила-базированная постобработка нескольких документов (например, страниц PDF)
+
+    Регулярные выражения почти не отпускают GIL, поэтому документы
+    распределяются по процессам, а не по потокам.
 
-    # Очистка и валидация данных
-    result = _clean_and_validate_fields(result)
+    Args:
+        items: Пары (extracted_data, raw_text)
+
+    Returns:
+        Результаты rules_based_postprocess, в порядке items
+    """
+    keys = [_rules_cache_key(extracted_data, raw_text) for extracted_data, raw_text in items]
+    results: List[Optional[Dict[str, Any]]] = [_cache_get(key) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    if len(pending) < _RULES_BATCH_MIN_PARALLEL:
+        processed = [_rules_postprocess(items[i]) for i in pending]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(pending))) as executor:
+            processed = list(executor.map(_rules_postprocess, [items[i] for i in pending], chunksize=8))
+
+    for i, result in zip(pending, processed):
+        _cache_put(keys[i], result)
+        results[i] = result
+
+    return results
+
+
+def _rules_cache_key(extracted_data: Dict, raw_text: str) -> str:
+    return _cache_key('rules', raw_text or '', _dumps(extracted_data or {}, sort_keys=True))
+
+
+def _rules_postprocess(item: Tuple[Dict, str]) -> Dict[str, Any]:
+    """Постобработка одного документа без кэша; принимает пару, чтобы работать с executor.map"""
+    extracted_data, raw_text = item
+
+    # Очистка и валидация данных; это единственная копия, дальше словарь изменяется на месте
+    result = _clean_and_validate_fields(extracted_data or {})
 
     # Дополнительное извлечение из raw_text если что-то пропущено
-    result = _extract_missing_fields(result, raw_text)
+    _extract_missing_fields(result, raw_text)
 
     # Применение бизнес-правил
-    result = _apply_business_rules(result)
+    _apply_business_rules(result)
 
     result['postprocessed'] = True
     result['postprocess_method'] = 'rules_based'
@@ -255,89 +882,107 @@ def rules_based_postprocess(extracted_data: Dict, raw_text: str) -> Dict[str, An
     return result
 
 
+def _clean_fio(value: Any) -> Any:
+    """ФИО: лишние пробелы убираются, регистр нормализуется; нужно минимум имя и фамилия"""
+    if not isinstance(value, str):
+        return value
+    fio_clean = ' '.join(word.capitalize() for word in value.split() if word.isalpha())
+    return fio_clean if len(fio_clean.split()) >= 2 else None
+
+
+def _clean_phone(value: Any) -> Any:
+    """Телефон: только цифры и '+', приведение к формату +7..."""
+    if not isinstance(value, str):
+        return value
+    phone_clean = _NON_PHONE_CHARS_RE.sub('', value)
+    if len(phone_clean) < 10:
+        return None
+    if phone_clean.startswith('8'):
+        return '+7' + phone_clean[1:]
+    if phone_clean.startswith('7'):
+        return '+' + phone_clean
+    if not phone_clean.startswith('+'):
+        return '+7' + phone_clean
+    return phone_clean
+
+
+def _clean_email(value: Any) -> Any:
+    """Email: проверка формата и нижний регистр"""
+    if not isinstance(value, str):
+        return value
+    return value.lower() if _EMAIL_FULL_RE.match(value) else None
+
+
+def _clean_inn(value: Any) -> Any:
+    """ИНН: только цифры, 10 или 12 знаков"""
+    if not isinstance(value, str):
+        return value
+    inn_clean = _NON_DIGITS_RE.sub('', value)
+    return inn_clean if len(inn_clean) in (10, 12) else None
+
+
+def _clean_date(value: Any) -> Any:
+    """Дата: формат YYYY-MM-DD, другие форматы конвертируются"""
+    if not isinstance(value, str):
+        return value
+    try:
+        if _ISO_DATE_RE.match(value):
+            datetime.strptime(value, '%Y-%m-%d')
+            return value
+        # Пытаемся конвертировать другие форматы
+        return _normalize_date_string(value)
+    except ValueError:
+        return None
+
+
+def _clean_sum(value: Any) -> Any:
+    """Сумма: число больше нуля"""
+    if not isinstance(value, (int, float, str)):
+        return value
+    try:
+        if isinstance(value, str):
+            value = float(_NON_AMOUNT_CHARS_RE.sub('', value).replace(',', '.'))
+        return value if value > 0 else None
+    except ValueError:
+        return None
+
+
+# Очистка по имени поля; None от функции означает, что поле отбрасывается.
+# Значения неожиданного типа и остальные поля копируются как есть
+_CLEANERS: Dict[str, Callable[[Any], Any]] = {
+    'fio': _clean_fio,
+    'phone': _clean_phone,
+    'email': _clean_email,
+    'inn': _clean_inn,
+    'date': _clean_date,
+    'sum': _clean_sum,
+}
+
+
 def _clean_and_validate_fields(data: Dict) -> Dict[str, Any]:
     """Очистка и валидация полей"""
-    cleaned = {}
+    cleaned = ExtractionResult()
 
     for field, value in data.items():
         if value is None or value == '':
             continue
 
-        # Очистка ФИО
-        if field == 'fio' and isinstance(value, str):
-            # Убираем лишние пробелы, приводим к нормальному регистру
-            fio_clean = ' '.join(word.capitalize() for word in value.split() if word.isalpha())
-            if len(fio_clean.split()) >= 2:  # Минимум имя и фамилия
-                cleaned[field] = fio_clean
-
-        # Очистка телефонов
-        elif field == 'phone' and isinstance(value, str):
-            phone_clean = re.sub(r'[^\d+]', '', value)
-            if len(phone_clean) >= 10:
-                # Приводим к стандартному формату
-                if phone_clean.startswith('8'):
-                    phone_clean = '+7' + phone_clean[1:]
-                elif phone_clean.startswith('7'):
-                    phone_clean = '+' + phone_clean
-                elif not phone_clean.startswith('+'):
-                    phone_clean = '+7' + phone_clean
-                cleaned[field] = phone_clean
-
-        # Валидация email
-        elif field == 'email' and isinstance(value, str):
-            email_pattern = r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}$'
-            if re.match(email_pattern, value, re.IGNORECASE):
-                cleaned[field] = value.lower()
-
-        # Валидация ИНН
-        elif field == 'inn' and isinstance(value, str):
-            inn_clean = re.sub(r'[^\d]', '', value)
-            if len(inn_clean) in [10, 12]:
-                cleaned[field] = inn_clean
-
-        # Валидация дат
-        elif field == 'date' and isinstance(value, str):
-            try:
-                # Пытаемся парсить дату
-                if re.match(r'^\d{4}-\d{2}-\d{2}$', value):
-                    datetime.strptime(value, '%Y-%m-%d')
-                    cleaned[field] = value
-                else:
-                    # Пытаемся конвертировать другие форматы
-                    normalized_date = _normalize_date_string(value)
-                    if normalized_date:
-                        cleaned[field] = normalized_date
-            except ValueError:
-                pass
-
-        # Валидация сумм
-        elif field == 'sum' and (isinstance(value, (int, float)) or isinstance(value, str)):
-            try:
-                if isinstance(value, str):
-                    sum_clean = re.sub(r'[^\d.,]', '', value).replace(',', '.')
-                    value = float(sum_clean)
-                if value > 0:
-                    cleaned[field] = value
-            except ValueError:
-                pass
-
-        else:
-            # Остальные поля копируем как есть
-            cleaned[field] = value
+        cleaner = _CLEANERS.get(field)
+        if cleaner is not None:
+            value = cleaner(value)
+            if value is None:
+                continue
+        cleaned[field] = value
 
     return cleaned
 
 
-def _extract_missing_fields(data: Dict, raw_text: str) -> Dict[str, Any]:
-    """Дополнительное извлечение пропущенных полей"""
-    result = data.copy()
-
+def _extract_missing_fields(result: Dict, raw_text: str) -> None:
+    """Дополнительное извлечение пропущенных полей (изменяет result на месте)"""
     # Если не найден адрес, пытаемся извлечь
     if 'address' not in result:
-        address_keywords = ['адрес', 'проживает', 'зарегистрирован', 'местонахождение']
-        for keyword in address_keywords:
-            pattern = rf'{keyword}[:\s]+([^,\n]+(?:,[^,\n]+)*)'
-            match = re.search(pattern, raw_text, re.IGNORECASE)
+        for pattern in _ADDRESS_RES.values():
+            match = pattern.search(raw_text)
             if match:
                 result['address'] = match.group(1).strip()
                 break
@@ -345,25 +990,16 @@ def _extract_missing_fields(data: Dict, raw_text: str) -> Dict[str, Any]:
     # Дополнительные номера документов
     if 'contract_number' not in result:
         # Ищем различные варианты номеров
-        number_patterns = [
-            r'№\s*(\d+(?:[-/]\d+)*)',
-            r'номер[:\s]+(\d+(?:[-/]\d+)*)',
-            r'договор[:\s]+№?\s*(\d+(?:[-/]\d+)*)'
-        ]
-
-        for pattern in number_patterns:
-            match = re.search(pattern, raw_text, re.IGNORECASE)
+        raw_lower = raw_text.lower()
+        for pattern in _NUMBER_RES:
+            match = pattern.search(raw_lower)
             if match:
                 result['contract_number'] = match.group(1)
                 break
 
-    return result
-
-
-def _apply_business_rules(data: Dict) -> Dict[str, Any]:
-    """Применение бизнес-правил и логических проверок"""
-    result = data.copy()
 
+def _apply_business_rules(result: Dict) -> None:
+    """Применение бизнес-правил и логических проверок (изменяет result на месте)"""
     # Правило: если есть ИНН и счет, скорее всего это коммерческий документ
     if result.get('inn') and result.get('account'):
         if 'doc_type' not in result:
@@ -377,24 +1013,15 @@ def _apply_business_rules(data: Dict) -> Dict[str, Any]:
 
     # Правило: нормализация типов документов
     if 'doc_type' in result:
-        doc_type_mapping = {
-            'договор': ['договор', 'контракт', 'соглашение'],
-            'счет': ['счет', 'счёт', 'invoice', 'фактура'],
-            'заявление': ['заявление', 'заявка', 'обращение'],
-            'справка': ['справка', 'выписка', 'подтверждение']
-        }
-
-        current_type = result['doc_type'].lower()
-        for normalized_type, variants in doc_type_mapping.items():
-            if any(variant in current_type for variant in variants):
-                result['doc_type'] = normalized_type
-                break
+        normalized_type = _match_doc_type(
+            result['doc_type'].lower(), _DOC_TYPE_VARIANTS_RE, _DOC_TYPE_VARIANTS_INDEX
+        )
+        if normalized_type:
+            result['doc_type'] = normalized_type
 
     # Добавляем метаданные
     result['extraction_confidence'] = _calculate_extraction_confidence(result)
-    result['fields_extracted'] = len([k for k, v in result.items() if v and not k.startswith('_')])
-
-    return result
+    result['fields_extracted'] = _count_fields(result)
 
 
 def _normalize_date_string(date_str: str) -> Optional[str]:
@@ -402,31 +1029,126 @@ def _normalize_date_string(date_str: str) -> Optional[str]:
     if not date_str:
         return None
 
-    # Различные форматы дат
-    date_formats = [
-        '%d.%m.%Y', '%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y',
-        '%d.%m.%y', '%d/%m/%y', '%y-%m-%d'
-    ]
+    # Поддерживаемые форматы: ДД.ММ.ГГГГ, ДД/ММ/ГГГГ, ГГГГ-ММ-ДД, ДД-ММ-ГГГГ,
+    # ДД.ММ.ГГ, ДД/ММ/ГГ, ГГ-ММ-ДД; формат определяется по длине групп
+    match = _DATE_ANY_RE.match(date_str.strip())
+    if not match:
+        return None
 
-    for fmt in date_formats:
-        try:
-            date_obj = datetime.strptime(date_str.strip(), fmt)
-            return date_obj.strftime('%Y-%m-%d')
-        except ValueError:
-            continue
+    first, sep, month, last = match.groups()
+    if len(first) <= 2 and len(last) == 4:
+        day, year = first, last
+    elif sep == '-' and len(first) == 4 and len(last) <= 2:
+        year, day = first, last
+    elif sep != '-' and len(first) <= 2 and len(last) == 2:
+        day, year = first, last
+    elif sep == '-' and len(first) == 2 and len(last) <= 2:
+        year, day = first, last
+    else:
+        return None
 
-    return None
+    if len(year) == 2:
+        # Двузначный год: 69-99 -> 19xx, 00-68 -> 20xx (как у strptime %y)
+        year = int(year) + (2000 if int(year) <= 68 else 1900)
+
+    try:
+        return date(int(year), int(month), int(day)).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+# Основные поля, от которых зависит уверенность извлечения
+_IMPORTANT_FIELDS = frozenset(('fio', 'date', 'sum', 'phone', 'email'))
+
+
+def _count_fields(data: Dict) -> int:
+    """Количество заполненных полей (без служебных, начинающихся с '_')"""
+    if isinstance(data, ExtractionResult):
+        return data.n_fields
+    return len([k for k, v in data.items() if v and not k.startswith('_')])
+
+
+class ExtractionResult(dict):
+    """
+    Словарь результата извлечения со счетчиками заполненных полей
+
+    n_fields и important_present обновляются при каждом изменении, поэтому
+    оценка уверенности не перебирает словарь заново.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.n_fields = 0
+        self.important_present = set()
+        self.update(*args, **kwargs)
+
+    def _track(self, key, value, delta: int) -> None:
+        if value and not key.startswith('_'):
+            self.n_fields += delta
+            if key in _IMPORTANT_FIELDS:
+                if delta > 0:
+                    self.important_present.add(key)
+                else:
+                    self.important_present.discard(key)
+
+    def __setitem__(self, key, value):
+        if key in self:
+            self._track(key, dict.__getitem__(self, key), -1)
+        dict.__setitem__(self, key, value)
+        self._track(key, value, 1)
+
+    def __delitem__(self, key):
+        self._track(key, self[key], -1)
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._track(key, value, -1)
+        return key, value
+
+    def clear(self):
+        dict.clear(self)
+        self.n_fields = 0
+        self.important_present.clear()
+
+    def __reduce__(self):
+        # copy/deepcopy/pickle пересобирают объект через __init__, пересчитывая счетчики
+        return ExtractionResult, (dict(self),)
 
 
 def _calculate_extraction_confidence(data: Dict) -> float:
     """Вычисление уверенности извлечения на основе найденных полей"""
-    important_fields = ['fio', 'date', 'sum', 'phone', 'email']
-    found_important = sum(1 for field in important_fields if field in data and data[field])
+    if isinstance(data, ExtractionResult):
+        found_important = len(data.important_present)
+    else:
+        found_important = sum(1 for field in _IMPORTANT_FIELDS if field in data and data[field])
 
-    total_fields = len([k for k, v in data.items() if v and not k.startswith('_')])
+    total_fields = _count_fields(data)
 
     # Базовая уверенность
-    confidence = found_important / len(important_fields) * 0.7
+    confidence = found_important / len(_IMPORTANT_FIELDS) * 0.7
 
     # Бонус за общее количество полей
     confidence += min(total_fields / 10, 0.3)
@@ -473,6 +1195,16 @@ def merge_extraction_results(ocr_result: Dict, llm_result: Dict) -> Dict[str, An
     return merged
 
 
+# Проверки качества отдельных полей
+_FIELD_CHECKS = {
+    'fio': lambda x: len(x.split()) >= 2 if isinstance(x, str) else False,
+    'phone': lambda x: len(_NON_DIGITS_RE.sub('', str(x))) >= 10,
+    'email': lambda x: '@' in str(x) and '.' in str(x),
+    'inn': lambda x: len(_NON_DIGITS_RE.sub('', str(x))) in [10, 12],
+    'date': lambda x: _ISO_DATE_RE.match(str(x)) is not None
+}
+
+
 def validate_extraction_quality(result: Dict) -> Dict[str, Any]:
     """
     Валидация качества извлечения данных
@@ -489,19 +1221,11 @@ def validate_extraction_quality(result: Dict) -> Dict[str, Any]:
         'recommendations': []
     }
 
-    # Проверяем качество отдельных полей
-    field_checks = {
-        'fio': lambda x: len(x.split()) >= 2 if isinstance(x, str) else False,
-        'phone': lambda x: len(re.sub(r'[^\d]', '', str(x))) >= 10,
-        'email': lambda x: '@' in str(x) and '.' in str(x),
-        'inn': lambda x: len(re.sub(r'[^\d]', '', str(x))) in [10, 12],
-        'date': lambda x: re.match(r'^\d{4}-\d{2}-\d{2}$', str(x)) is not None
-    }
-
     total_score = 0
     checked_fields = 0
 
-    for field, check_func in field_checks.items():
+    # Проверяем качество отдельных полей
+    for field, check_func in _FIELD_CHECKS.items():
         if field in result and result[field]:
             is_valid = check_func(result[field])
             quality_report['field_quality'][field] = 'good' if is_valid else 'poor'
@@ -548,14 +1272,14 @@ if __name__ == "__main__":
     # Тест rules-based обработки
     print("\n1. Rules-based постобработка:")
     result = rules_based_postprocess({}, test_text)
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(_dumps(result, indent=True))
 
     # Тест LLM обработки (mock)
     print("\n2. Mock LLM обработка:")
     llm_result = call_llm_to_json(test_text, model_type='mock')
-    print(json.dumps(llm_result, ensure_ascii=False, indent=2))
+    print(_dumps(llm_result, indent=True))
 
     # Тест валидации качества
     print("\n3. Валидация качества:")
     quality = validate_extraction_quality(result)
-    print(json.dumps(quality, ensure_ascii=False, indent=2))
\ No newline at end of file
+    print(_dumps(quality, indent=True))
\ No newline at end of file
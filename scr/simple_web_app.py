@@ -3,19 +3,56 @@
 Без внешних шаблонов - все HTML встроено
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import os
+import re
 import json
+import hashlib
 import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 app = Flask(__name__)
+
+# Быстрая сериализация JSON ответов (orjson), с откатом на стандартный провайдер Flask
+try:
+    import orjson
+    from flask.json.provider import JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """JSON провайдер Flask на orjson"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+except ImportError:
+    pass
+
+# Сжатие JSON и HTML ответов (кириллица в UTF-8 сжимается в несколько раз)
+try:
+    from flask_compress import Compress
+
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html']
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    Compress(app)
+except ImportError:
+    pass
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
 
 # Создаем папки
 os.makedirs('uploads', exist_ok=True)
 os.makedirs('results', exist_ok=True)
 
+# Фоновая обработка загруженных файлов: запрос сразу возвращает job_id,
+# статус задачи хранится в results/<job_id>.json и доступен любому процессу gunicorn
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('OCR_WORKERS', '2')))
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
 @app.route('/')
 def index():
     """Главная страница с встроенным HTML"""
@@ -66,6 +103,18 @@ def index():
     </div>
 
     <script>
+        // Опрос статуса фоновой задачи до завершения обработки
+        function waitForJob(jobId) {
+            return fetch(`/api/jobs/${jobId}`)
+                .then(response => response.json())
+                .then(job => {
+                    if (job.status === 'queued' || job.status === 'processing') {
+                        return new Promise(resolve => setTimeout(resolve, 1000)).then(() => waitForJob(jobId));
+                    }
+                    return job;
+                });
+        }
+
         function processFile() {
             const fileInput = document.getElementById('fileInput');
             const engine = document.getElementById('engine').value;
@@ -89,6 +138,7 @@ def index():
                 body: formData
             })
             .then(response => response.json())
+            .then(data => data.success ? waitForJob(data.job_id) : data)
             .then(data => {
                 if (data.success) {
                     contentDiv.innerHTML = `
@@ -135,10 +185,42 @@ def process_document():
         filepath = os.path.join('uploads', filename)
         file.save(filepath)
 
+        # Обработка идет в фоне, клиент опрашивает /api/jobs/<job_id>
+        job_id = uuid.uuid4().hex
+        _write_job(job_id, {'success': True, 'status': 'queued'})
+        _executor.submit(_run_job, job_id, filepath, file.filename, engine, timestamp)
+
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued'
+        }), 202
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+def _job_path(job_id):
+    return os.path.join('results', f'{job_id}.json')
+
+def _write_job(job_id, payload):
+    """Атомарная запись статуса задачи (читатель не увидит недописанный файл)"""
+    tmp_path = _job_path(job_id) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(app.json.dumps(payload))
+    os.replace(tmp_path, _job_path(job_id))
+
+def _run_job(job_id, filepath, original_name, engine, timestamp):
+    """Фоновая обработка загруженного файла"""
+    try:
+        _write_job(job_id, {'success': True, 'status': 'processing'})
+
         # Простая имитация OCR обработки
         result = {
             'engine': engine,
-            'filename': file.filename,
+            'filename': original_name,
             'file_size': os.path.getsize(filepath),
             'timestamp': timestamp,
             'status': 'processed',
@@ -150,16 +232,41 @@ def process_document():
             'message': 'Файл успешно загружен и сохранен. Для полной обработки установите зависимости OCR.'
         }
 
-        return jsonify({
-            'success': True,
-            'result': result
-        })
+        _write_job(job_id, {'success': True, 'status': 'done', 'result': result})
 
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        })
+        _write_job(job_id, {'success': False, 'status': 'failed', 'error': str(e)})
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Статус и результат фоновой задачи"""
+    if not _JOB_ID_RE.match(job_id):
+        return jsonify({'success': False, 'error': 'Некорректный идентификатор задачи'}), 400
+
+    try:
+        with open(_job_path(job_id), encoding='utf-8') as f:
+            return jsonify(app.json.loads(f.read()))
+    except FileNotFoundError:
+        return jsonify({'success': False, 'error': 'Задача не найдена'}), 404
+
+@app.route('/api/llm/stream', methods=['POST'])
+def stream_llm():
+    """Потоковая LLM обработка текста (Server-Sent Events)"""
+    payload = request.get_json(silent=True) or request.form
+    raw_text = payload.get('text', '')
+    model_type = payload.get('model_type', 'openai')
+
+    from postprocess import call_llm_to_json_stream
+
+    def generate():
+        # Каждый фрагмент кодируется в JSON, чтобы переводы строк не ломали формат SSE
+        for event in call_llm_to_json_stream(raw_text, model_type):
+            if 'delta' in event:
+                yield f"data: {app.json.dumps(event['delta'])}\n\n"
+            else:
+                yield f"event: result\ndata: {app.json.dumps(event['result'])}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
 @app.route('/api/status')
 def status():
@@ -185,13 +292,18 @@ def status():
     except ImportError:
         pass
 
-    return jsonify({
+    response = jsonify({
         'status': 'running',
         'available_modules': available_modules,
-        'total_modules': len(available_modules),
-        'timestamp': datetime.now().isoformat()
+        'total_modules': len(available_modules)
     })
 
+    # Тело ответа зависит только от набора модулей (без метки времени),
+    # поэтому ETag по этому набору корректен и повторный опрос получает 304
+    etag = hashlib.blake2b(','.join(available_modules).encode('utf-8'), digest_size=16).hexdigest()
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
 @app.route('/health')
 def health():
     """Простая проверка здоровья"""
@@ -207,9 +319,16 @@ if __name__ == '__main__':
     print("🌐 Веб-интерфейс: http://localhost:5000")
     print("📋 API эндпоинты:")
     print("  GET  / - главная страница")
-    print("  POST /api/ocr/process - обработка файла")
+    print("  POST /api/ocr/process - обработка файла (возвращает job_id)")
+    print("  GET  /api/jobs/<job_id> - статус и результат обработки")
+    print("  POST /api/llm/stream - потоковая LLM обработка текста")
     print("  GET  /api/status - статус модулей")
     print("  GET  /health - проверка здоровья")
     print()
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Встроенный сервер Werkzeug - только для разработки (DEV=1 включает отладку и перезагрузку).
+    # В продакшене: gunicorn -w $(nproc) --threads 4 -b 0.0.0.0:5000 wsgi:app
+    dev_mode = bool(os.environ.get('DEV'))
+    if not dev_mode:
+        print("⚠️ Для продакшена используйте gunicorn (см. wsgi.py)")
+    app.run(debug=dev_mode, host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+stats.py - Сводная статистика результатов OCR для сравнения движков
+Считается один раз на сервере, клиент только выводит готовые числа.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _mean_jit(confs):
+        """Скомпилированное среднее уверенностей: один проход без временных массивов."""
+        n = confs.shape[0]
+        total = 0.0
+        for i in range(n):
+            total += confs[i]
+        return total / n if n else 0.0
+
+
+def agg(confs: np.ndarray) -> float:
+    """
+    Средняя уверенность распознавания
+
+    Args:
+        confs: Массив уверенностей элементов (float32)
+
+    Returns:
+        Среднее значение или 0.0 для пустого массива
+    """
+    if NUMBA_AVAILABLE:
+        return float(_mean_jit(confs))
+    return float(confs.mean()) if confs.size else 0.0
+
+
+def result_stats(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Статистика результата одного движка для таблицы сравнения
+
+    Args:
+        result: Результат OCRCoordinator.process_document
+
+    Returns:
+        Словарь с полями chars, words, total_items, avg_confidence
+    """
+    raw_text = result.get('raw_text') or ''
+    items = result.get('ocr_data') or []
+
+    if items:
+        confs = np.fromiter((item.get('conf', 0) for item in items), dtype=np.float32, count=len(items))
+        avg_confidence = agg(confs)
+        total_items = len(items)
+    else:
+        # Движки без поэлементного вывода (TrOCR) задают значения сами
+        avg_confidence = result.get('avg_confidence') or 0.0
+        total_items = result.get('total_items') or 0
+
+    return {
+        'chars': len(raw_text),
+        'words': len(raw_text.split()),
+        'total_items': total_items,
+        'avg_confidence': avg_confidence
+    }
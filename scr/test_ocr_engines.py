@@ -3,22 +3,21 @@ Test script to check individual OCR engines without dependencies conflicts
 """
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import numpy as np
+
+TEST_IMAGE = Path("uploads/20250914_224416_1_page-0001_1.jpg")
+
 # Test PaddleOCR first (most important fix)
-def test_paddle_ocr():
+def check_paddle_ocr(img):
     print("Testing PaddleOCR...")
     try:
         from ocr_paddle import run_paddle
         
-        # Use a sample image
-        test_image = Path("uploads/20250914_224416_1_page-0001_1.jpg")
-        if not test_image.exists():
-            print(f"❌ Test image not found: {test_image}")
-            return False
-            
-        print("Initializing PaddleOCR...")
-        result = run_paddle(str(test_image), lang='ru')
+        # PaddleOCR expects BGR like cv2, the shared image is RGB
+        result = run_paddle(np.ascontiguousarray(img[:, :, ::-1]), lang='ru')
         
         if result:
             print(f"✅ PaddleOCR successful! Found {len(result)} text blocks")
@@ -34,19 +33,13 @@ def test_paddle_ocr():
         return False
 
 # Test Tesseract
-def test_tesseract():
-    print("\nTesting Tesseract...")
+def check_tesseract(img):
+    print("Testing Tesseract...")
     try:
         import pytesseract
         from PIL import Image
         
-        test_image = Path("uploads/20250914_224416_1_page-0001_1.jpg")
-        if not test_image.exists():
-            print(f"❌ Test image not found: {test_image}")
-            return False
-            
-        image = Image.open(test_image)
-        text = pytesseract.image_to_string(image, lang='rus')
+        text = pytesseract.image_to_string(Image.fromarray(img), lang='rus')
         
         if text.strip():
             print(f"✅ Tesseract successful! Extracted {len(text)} characters")
@@ -64,11 +57,27 @@ if __name__ == "__main__":
     print("🧪 OCR Engine Testing Suite")
     print("=" * 50)
     
-    # Test PaddleOCR (main issue)
-    paddle_ok = test_paddle_ocr()
+    if not TEST_IMAGE.exists():
+        print(f"❌ Test image not found: {TEST_IMAGE}")
+        sys.exit(1)
+    
+    # Decode the image once and share it between both engines
+    from PIL import Image
+    with Image.open(TEST_IMAGE) as image:
+        img = np.array(image.convert('RGB'))
+    
+    # Both engines release the GIL in native code, so run them side by side
+    results = {}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {
+            executor.submit(check_paddle_ocr, img): 'paddle',  # main issue
+            executor.submit(check_tesseract, img): 'tesseract',  # reference
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
     
-    # Test Tesseract (reference)
-    tesseract_ok = test_tesseract()
+    paddle_ok = results['paddle']
+    tesseract_ok = results['tesseract']
     
     print("\n" + "=" * 50)
     print("📊 Test Results:")
@@ -78,4 +87,4 @@ if __name__ == "__main__":
     if paddle_ok:
         print("\n🎉 PaddleOCR is now working! The model download issue has been fixed.")
     else:
-        print("\n⚠️  PaddleOCR still has issues. Check the error messages above.")
\ No newline at end of file
+        print("\n⚠️  PaddleOCR still has issues. Check the error messages above.")
@@ -5,36 +5,441 @@ Flask веб-приложение для OCR обработки документ
 
 import os
 import json
+import hashlib
+import queue
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 from flask import Flask, request, jsonify, render_template, send_file
 from werkzeug.utils import secure_filename
 import tempfile
+import uuid
 from datetime import datetime
 import traceback
 
+# Потоковый разбор multipart (опционально): файл пишется на диск по частям
+try:
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.targets import FileTarget, ValueTarget
+
+    class HashingFileTarget(FileTarget):
+        """FileTarget, считающий хэш содержимого по мере записи"""
+
+        def __init__(self, filename):
+            super().__init__(filename)
+            self.digest = hashlib.blake2b(digest_size=16)
+
+        def on_data_received(self, chunk):
+            self.digest.update(chunk)
+            super().on_data_received(chunk)
+except ImportError:
+    StreamingFormDataParser = None
+
 # Импорты OCR координатора
 from ocr_coordinator import OCRCoordinator
+from ocr_server import OCR_SERVER_ADDRESS, RemoteOCRCoordinator
 
 app = Flask(__name__)
+
+# Быстрая сериализация JSON (orjson), с откатом на стандартный json
+try:
+    import orjson
+    from flask.json.provider import JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """JSON провайдер Flask на orjson"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
+    def dumps_json(obj):
+        """Сериализует объект в JSON (UTF-8 bytes, с отступами)"""
+        return orjson.dumps(
+            obj,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+    loads_json = orjson.loads
+except ImportError:
+    def dumps_json(obj):
+        """Сериализует объект в JSON (UTF-8 bytes, с отступами)"""
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+    loads_json = json.loads
+
+# Сжатие JSON ответов: результаты с координатами слов сжимаются в несколько раз
+try:
+    from flask_compress import Compress
+
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html']
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 4096
+    app.config['COMPRESS_LEVEL'] = 4
+    app.config['COMPRESS_BR_LEVEL'] = 4
+    Compress(app)
+except ImportError:
+    pass
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB максимум
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['RESULTS_FOLDER'] = 'results'
 
+# Отдача файлов результатов фронтенд-сервером вместо процесса Python
+# (только для хранения результатов в JSON файлах, без LMDB):
+# RESULTS_X_SENDFILE=1 - заголовок X-Sendfile (Apache mod_xsendfile),
+# RESULTS_ACCEL_PREFIX=/internal-results/ - X-Accel-Redirect (internal location nginx)
+app.config['USE_X_SENDFILE'] = os.environ.get('RESULTS_X_SENDFILE', '').lower() in ('1', 'true')
+RESULTS_ACCEL_PREFIX = os.environ.get('RESULTS_ACCEL_PREFIX', '')
+
 # Создаем папки если их нет
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
 os.makedirs('templates', exist_ok=True)
 os.makedirs('static', exist_ok=True)
 
-# Инициализируем координатор OCR
-ocr_coordinator = OCRCoordinator()
+# Хранилище результатов: LMDB (если установлен пакет lmdb) - один файл с
+# отображением в память вместо тысяч мелких JSON, иначе - JSON файлы в RESULTS_FOLDER
+try:
+    import lmdb
+except ImportError:
+    lmdb = None
+
+RESULTS_LMDB_PATH = os.path.join(app.config['RESULTS_FOLDER'], 'results.lmdb')
+RESULTS_LMDB_MAP_SIZE = 10 * 1024 ** 3
+_results_env = None
+_results_env_pid = None
+_results_env_lock = threading.Lock()
+
+
+def _results_db():
+    """
+    Окружение LMDB текущего процесса
+
+    Окружение нельзя использовать после fork, поэтому при gunicorn --preload
+    каждый рабочий процесс открывает свое.
+    """
+    global _results_env, _results_env_pid
+    if _results_env_pid != os.getpid():
+        with _results_env_lock:
+            if _results_env_pid != os.getpid():
+                _results_env = lmdb.open(RESULTS_LMDB_PATH, map_size=RESULTS_LMDB_MAP_SIZE)
+                _results_env_pid = os.getpid()
+    return _results_env
+
+
+def result_location(name):
+    """Где хранится результат name (для ответа клиенту)"""
+    if lmdb is not None:
+        return f"{RESULTS_LMDB_PATH}#{name}"
+    return os.path.join(app.config['RESULTS_FOLDER'], f"{name}.json")
+
+
+def store_result(name, obj):
+    """Сохраняет результат под именем name"""
+    data = dumps_json(obj)
+    if lmdb is not None:
+        with _results_db().begin(write=True) as txn:
+            txn.put(name.encode('utf-8'), data)
+        return
+    with open(result_location(name), 'wb') as f:
+        f.write(data)
+
+
+def load_result(name):
+    """JSON результата name (bytes) или None, если его нет"""
+    if lmdb is not None:
+        with _results_db().begin(buffers=True) as txn:
+            data = txn.get(name.encode('utf-8'))
+            return None if data is None else bytes(data)
+    try:
+        with open(result_location(name), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# Инициализируем координатор OCR: при заданном OCR_SERVER_ADDRESS распознавание
+# выполняет отдельный процесс ocr_server.py, иначе - текущий процесс
+if OCR_SERVER_ADDRESS:
+    ocr_coordinator = RemoteOCRCoordinator()
+else:
+    ocr_coordinator = OCRCoordinator()
+
+
+def warmup_ocr():
+    """
+    Прогрев моделей, чтобы первый запрос не ждал их загрузки (OCR_WARMUP=0 отключает)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'bmp', 'tiff'}
+    Вызывается уже в рабочем процессе (post_worker_init в gunicorn_conf.py), а не при
+    импорте: при preload_app импорт идет в главном процессе gunicorn, а пулы потоков,
+    запущенные до fork, в рабочих процессах не работают.
+    """
+    if not OCR_SERVER_ADDRESS and os.environ.get('OCR_WARMUP', '1') != '0':
+        ocr_coordinator.warmup()
+
+
+app.extensions['ocr_warmup'] = warmup_ocr
+
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'pdf', 'bmp', 'tiff'})
+_ALLOWED_SUFFIXES = frozenset(f'.{ext}' for ext in ALLOWED_EXTENSIONS)
+
+# Текстовые поля форм загрузки
+FORM_FIELDS = ('engine', 'use_llm', 'language', 'confidence_threshold', 'engines')
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Буфер копирования загрузки на диск без streaming_form_data
+UPLOAD_COPY_BUFFER = 1 << 20
+
+# LRU-кэш результатов: ключ - хэш содержимого файла (или текстов) и параметры
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '128'))
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+# Конвейер обработки документов: OCR и запись результата на диск идут в
+# отдельных потоках, поэтому пока распознается один документ, результат
+# предыдущего уже записывается, а следующий загружается
+_ocr_queue = queue.Queue()
+_serialize_queue = queue.Queue()
+_pipeline_pid = None
+_pipeline_lock = threading.Lock()
+
+# Стадия OCR набирает пакет до OCR_MAX_BATCH документов, ожидая не дольше
+# OCR_MAX_WAIT_MS после первого: одинаковые параметры - один вызов модели
+OCR_MAX_BATCH = int(os.environ.get('OCR_MAX_BATCH', '8'))
+OCR_MAX_WAIT_MS = int(os.environ.get('OCR_MAX_WAIT_MS', '100'))
 
 
 def allowed_file(filename):
     """Проверка допустимых расширений файлов"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1].lower() in _ALLOWED_SUFFIXES
+
+
+# Одни и те же имена файлов приходят повторно (тесты, переобработка)
+secure_filename = lru_cache(maxsize=1024)(secure_filename)
+
+
+def parse_upload_streaming(req):
+    """
+    Разбор multipart-запроса без буферизации в памяти
+
+    Поле file пишется во временный файл в папке загрузок по мере чтения
+    request.stream (лимит MAX_CONTENT_LENGTH при этом соблюдается),
+    текстовые поля из FORM_FIELDS собираются в словарь.
+    Без пакета streaming_form_data используется стандартный разбор Werkzeug.
+
+    Returns:
+        (путь к временному файлу или None, исходное имя файла или None,
+         хэш содержимого файла, поля формы)
+    """
+    temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f".upload_{uuid.uuid4().hex}")
+
+    if StreamingFormDataParser is None:
+        file = req.files.get('file')
+        if file is None:
+            return None, None, None, req.form.to_dict()
+        # Копирование и хэширование за один проход
+        digest = hashlib.blake2b(digest_size=16)
+        with open(temp_path, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(UPLOAD_COPY_BUFFER), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        return temp_path, file.filename, digest.hexdigest(), req.form.to_dict()
+
+    parser = StreamingFormDataParser(headers=req.headers)
+    file_target = HashingFileTarget(temp_path)
+    parser.register('file', file_target)
+    value_targets = {name: ValueTarget() for name in FORM_FIELDS}
+    for name, target in value_targets.items():
+        parser.register(name, target)
+
+    try:
+        while True:
+            chunk = req.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    form = {name: target.value.decode('utf-8')
+            for name, target in value_targets.items() if target.value}
+    if not os.path.exists(temp_path):
+        return None, file_target.multipart_filename, None, form
+    return temp_path, file_target.multipart_filename, file_target.digest.hexdigest(), form
+
+
+def cache_get(key):
+    """Результат из кэша или None"""
+    with _result_cache_lock:
+        value = _result_cache.get(key)
+        if value is not None:
+            _result_cache.move_to_end(key)
+        return value
+
+
+def cache_put(key, value):
+    """Сохраняет результат в кэш, вытесняя самые старые записи"""
+    with _result_cache_lock:
+        _result_cache[key] = value
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+def _next_ocr_batch():
+    """Ждет первую задачу и добирает к ней остальные, пока пакет не заполнен или не истекло время"""
+    batch = [_ocr_queue.get()]
+    deadline = time.monotonic() + OCR_MAX_WAIT_MS / 1000
+    while len(batch) < OCR_MAX_BATCH:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(_ocr_queue.get(timeout=timeout))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _ocr_worker():
+    """Стадия OCR: распознает пакет документов и передает задачи на запись"""
+    while True:
+        groups = {}
+        for job in _next_ocr_batch():
+            groups.setdefault(tuple(sorted(job['params'].items())), []).append(job)
+
+        for jobs in groups.values():
+            params = jobs[0]['params']
+            try:
+                if len(jobs) == 1:
+                    results = [ocr_coordinator.process_document(image_path=jobs[0]['filepath'], **params)]
+                else:
+                    results = ocr_coordinator.batch_process(
+                        [job['filepath'] for job in jobs],
+                        micro_batch=len(jobs),
+                        **params
+                    )
+            except Exception as e:
+                for job in jobs:
+                    job['error'] = e
+                    job['done'].set()
+                continue
+
+            for job, result in zip(jobs, results):
+                job['result'] = result
+                _serialize_queue.put(job)
+
+
+def _serialize_worker():
+    """Стадия записи: сохраняет результат в JSON и будит ожидающий запрос"""
+    while True:
+        job = _serialize_queue.get()
+        try:
+            store_result(job['result_name'], job['result'])
+        except Exception as e:
+            job['error'] = e
+        finally:
+            job['done'].set()
+
+
+def run_pipeline(filepath, result_name, **params):
+    """
+    Прогоняет документ через конвейер OCR -> запись результата
+
+    Returns:
+        Результат ocr_coordinator.process_document (уже сохраненный под именем result_name)
+    """
+    job = {
+        'filepath': filepath,
+        'result_name': result_name,
+        'params': params,
+        'done': threading.Event()
+    }
+    _ensure_pipeline()
+    _ocr_queue.put(job)
+    job['done'].wait()
+
+    if 'error' in job:
+        raise job['error']
+    return job['result']
+
+
+def _ensure_pipeline():
+    """
+    Запускает потоки конвейера в текущем процессе
+
+    Потоки не переживают fork, поэтому при gunicorn --preload они запускаются
+    в каждом рабочем процессе при первом запросе, а не при импорте.
+    """
+    global _pipeline_pid
+    if _pipeline_pid == os.getpid():
+        return
+    with _pipeline_lock:
+        if _pipeline_pid == os.getpid():
+            return
+        for worker in (_ocr_worker, _serialize_worker):
+            threading.Thread(target=worker, name=worker.__name__.strip('_'), daemon=True).start()
+        _pipeline_pid = os.getpid()
+
+
+def save_upload(req):
+    """
+    Принимает загруженный файл и сохраняет его под именем по хэшу содержимого
+
+    Повторно загруженный файл не копируется: используется уже сохраненный.
+
+    Returns:
+        (путь к файлу, метка времени, хэш содержимого, поля формы, ответ с ошибкой или None)
+    """
+    temp_path, filename, digest, form = parse_upload_streaming(req)
+
+    error = None
+    if filename is None:
+        error = 'Файл не найден в запросе'
+    elif filename == '':
+        error = 'Файл не выбран'
+    elif not allowed_file(filename):
+        error = f'Недопустимый тип файла. Разрешены: {", ".join(ALLOWED_EXTENSIONS)}'
+    elif temp_path is None:
+        error = 'Файл пустой'
+
+    if error is not None:
+        if temp_path is not None:
+            os.remove(temp_path)
+        return None, None, None, form, (jsonify({
+            'success': False,
+            'error': error
+        }), 400)
+
+    # Секунды + случайный суффикс: результаты загрузок в одну секунду не перезаписывают друг друга
+    timestamp = f"{int(time.time())}_{secrets.token_hex(4)}"
+    extension = os.path.splitext(secure_filename(filename))[1].lower()
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{digest}{extension}")
+    if os.path.exists(filepath):
+        os.remove(temp_path)
+    else:
+        os.replace(temp_path, filepath)
+    return filepath, timestamp, digest, form, None
+
+
+def processing_error(e):
+    """Ответ 500 на ошибку обработки: трассировка пишется в лог, клиенту - только в режиме отладки"""
+    app.logger.exception("Ошибка обработки документа")
+    response = {
+        'success': False,
+        'error': str(e)
+    }
+    if app.debug:
+        response['traceback'] = traceback.format_exc()
+    return jsonify(response), 500
 
 
 @app.route('/')
@@ -63,60 +468,46 @@ def get_ocr_engines():
 def process_document():
     """Обработка загруженного документа"""
     try:
-        # Проверяем наличие файла
-        if 'file' not in request.files:
-            return jsonify({
-                'success': False,
-                'error': 'Файл не найден в запросе'
-            }), 400
-
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({
-                'success': False,
-                'error': 'Файл не выбран'
-            }), 400
-
-        if not allowed_file(file.filename):
-            return jsonify({
-                'success': False,
-                'error': f'Недопустимый тип файла. Разрешены: {", ".join(ALLOWED_EXTENSIONS)}'
-            }), 400
+        # Сохраняем файл (потоково, сразу на диск)
+        filepath, timestamp, digest, form, error_response = save_upload(request)
+        if error_response is not None:
+            return error_response
 
         # Получаем параметры
-        engine = request.form.get('engine', 'PaddleOCR')
-        use_llm = request.form.get('use_llm', 'false').lower() == 'true'
-        language = request.form.get('language', 'ru')
-        confidence_threshold = float(request.form.get('confidence_threshold', '0.5'))
-
-        # Сохраняем файл
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
-
-        # Обрабатываем документ
-        result = ocr_coordinator.process_document(
-            image_path=filepath,
-            engine=engine,
-            language=language,
-            use_llm=use_llm,
-            confidence_threshold=confidence_threshold
-        )
-
-        # Сохраняем результат
-        result_filename = f"result_{timestamp}.json"
-        result_path = os.path.join(app.config['RESULTS_FOLDER'], result_filename)
-
-        with open(result_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        engine = form.get('engine', 'PaddleOCR')
+        use_llm = form.get('use_llm', 'false').lower() == 'true'
+        language = form.get('language', 'ru')
+        confidence_threshold = float(form.get('confidence_threshold', '0.5'))
+
+        # Тот же файл с теми же параметрами уже распознавался - отдаем сохраненный результат
+        cache_key = ('process', digest, engine, language, use_llm, confidence_threshold)
+        cached = cache_get(cache_key)
+        if cached is not None:
+            result, result_path, result_id = cached
+            result = dict(result)
+        else:
+            # Обрабатываем документ и сохраняем результат (в потоках конвейера)
+            result_id = timestamp
+            result_name = f"result_{result_id}"
+            result_path = result_location(result_name)
+
+            result = run_pipeline(
+                filepath,
+                result_name,
+                engine=engine,
+                language=language,
+                use_llm=use_llm,
+                confidence_threshold=confidence_threshold
+            )
+
+            if result.get('success'):
+                cache_put(cache_key, (dict(result), result_path, result_id))
 
         # Добавляем информацию о файлах в результат
         result['files'] = {
             'original': filepath,
             'result': result_path,
-            'result_id': timestamp
+            'result_id': result_id
         }
 
         return jsonify({
@@ -125,55 +516,37 @@ def process_document():
         })
 
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }), 500
+        return processing_error(e)
 
 
 @app.route('/api/ocr/compare', methods=['POST'])
 def compare_engines():
     """Сравнение нескольких OCR движков на одном документе"""
     try:
-        if 'file' not in request.files:
-            return jsonify({
-                'success': False,
-                'error': 'Файл не найден в запросе'
-            }), 400
-
-        file = request.files['file']
-        if not allowed_file(file.filename):
-            return jsonify({
-                'success': False,
-                'error': f'Недопустимый тип файла. Разрешены: {", ".join(ALLOWED_EXTENSIONS)}'
-            }), 400
+        # Сохраняем файл (потоково, сразу на диск)
+        filepath, timestamp, digest, form, error_response = save_upload(request)
+        if error_response is not None:
+            return error_response
 
         # Получаем список движков для сравнения
-        engines_str = request.form.get('engines', 'PaddleOCR,Tesseract')
+        engines_str = form.get('engines', 'PaddleOCR,Tesseract')
         engines = [engine.strip() for engine in engines_str.split(',')]
-        language = request.form.get('language', 'ru')
-
-        # Сохраняем файл
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
-
-        # Сравниваем движки
-        comparison_result = ocr_coordinator.compare_engines(
-            image_path=filepath,
-            engines=engines,
-            language=language
-        )
+        language = form.get('language', 'ru')
+
+        cache_key = ('compare', digest, tuple(engines), language)
+        comparison_result = cache_get(cache_key)
+        if comparison_result is None:
+            # Сравниваем движки
+            comparison_result = ocr_coordinator.compare_engines(
+                image_path=filepath,
+                engines=engines,
+                language=language
+            )
 
-        # Сохраняем результат сравнения
-        result_filename = f"comparison_{timestamp}.json"
-        result_path = os.path.join(app.config['RESULTS_FOLDER'], result_filename)
+            # Сохраняем результат сравнения
+            store_result(f"comparison_{timestamp}", comparison_result)
 
-        with open(result_path, 'w', encoding='utf-8') as f:
-            json.dump(comparison_result, f, ensure_ascii=False, indent=2)
+            cache_put(cache_key, comparison_result)
 
         return jsonify({
             'success': True,
@@ -181,11 +554,7 @@ def compare_engines():
         })
 
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }), 500
+        return processing_error(e)
 
 
 @app.route('/api/metrics/calculate', methods=['POST'])
@@ -208,11 +577,18 @@ def calculate_metrics():
                 'error': 'Необходимы reference_text и hypothesis_text'
             }), 400
 
-        # Вычисляем метрики
-        metrics_result = ocr_coordinator.calculate_metrics(
-            reference_text,
-            hypothesis_text
-        )
+        # Вычисляем метрики (повторные запросы с теми же текстами - из кэша)
+        cache_key = ('metrics', hashlib.blake2b(
+            f"{len(reference_text)}:{reference_text}{hypothesis_text}".encode('utf-8'),
+            digest_size=16
+        ).hexdigest())
+        metrics_result = cache_get(cache_key)
+        if metrics_result is None:
+            metrics_result = ocr_coordinator.calculate_metrics(
+                reference_text,
+                hypothesis_text
+            )
+            cache_put(cache_key, metrics_result)
 
         return jsonify({
             'success': True,
@@ -230,16 +606,15 @@ def calculate_metrics():
 def get_result(result_id):
     """Получить сохраненный результат по ID"""
     try:
-        result_path = os.path.join(app.config['RESULTS_FOLDER'], f"result_{result_id}.json")
+        data = load_result(f"result_{result_id}")
 
-        if not os.path.exists(result_path):
+        if data is None:
             return jsonify({
                 'success': False,
                 'error': 'Результат не найден'
             }), 404
 
-        with open(result_path, 'r', encoding='utf-8') as f:
-            result = json.load(f)
+        result = loads_json(data)
 
         return jsonify({
             'success': True,
@@ -257,7 +632,21 @@ def get_result(result_id):
 def download_result(result_id):
     """Скачать результат в JSON формате"""
     try:
-        result_path = os.path.join(app.config['RESULTS_FOLDER'], f"result_{result_id}.json")
+        download_name = f"ocr_result_{result_id}.json"
+
+        # Результат в LMDB отдается прямо из отображенной в память базы
+        if lmdb is not None:
+            data = load_result(f"result_{result_id}")
+            if data is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Результат не найден'
+                }), 404
+            return app.response_class(data, mimetype='application/json', headers={
+                'Content-Disposition': f'attachment; filename="{download_name}"'
+            })
+
+        result_path = result_location(f"result_{result_id}")
 
         if not os.path.exists(result_path):
             return jsonify({
@@ -265,10 +654,18 @@ def download_result(result_id):
                 'error': 'Результат не найден'
             }), 404
 
+        # Файл отдает nginx, процесс сразу освобождается для OCR запросов
+        if RESULTS_ACCEL_PREFIX:
+            response = app.response_class(mimetype='application/json')
+            response.headers['X-Accel-Redirect'] = f"{RESULTS_ACCEL_PREFIX.rstrip('/')}/result_{result_id}.json"
+            response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+            return response
+
         return send_file(
             result_path,
             as_attachment=True,
-            download_name=f"ocr_result_{result_id}.json"
+            download_name=download_name,
+            conditional=True  # wsgi.file_wrapper: сервер отдает файл через sendfile(2)
         )
 
     except Exception as e:
@@ -278,16 +675,24 @@ def download_result(result_id):
         }), 500
 
 
+# Результат проверки здоровья переиспользуется HEALTH_CACHE_TTL секунд:
+# балансировщики и liveness-пробы опрашивают /health очень часто
+HEALTH_CACHE_TTL = 30
+_health_cache = {'status': None, 'expires': 0.0}
+
+
 @app.route('/health')
 def health_check():
     """Проверка здоровья сервиса"""
     try:
-        engines = ocr_coordinator.get_available_engines()
-        return jsonify({
-            'status': 'healthy',
-            'available_engines': engines,
-            'timestamp': datetime.now().isoformat()
-        })
+        if time.monotonic() >= _health_cache['expires']:
+            _health_cache['status'] = {
+                'status': 'healthy',
+                'available_engines': ocr_coordinator.get_available_engines(),
+                'timestamp': datetime.now().isoformat()
+            }
+            _health_cache['expires'] = time.monotonic() + HEALTH_CACHE_TTL
+        return jsonify(_health_cache['status'])
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
@@ -296,6 +701,14 @@ def health_check():
         }), 500
 
 
+@app.before_request
+def reject_oversized_upload():
+    """Отклоняет слишком большие запросы по заголовку Content-Length, не читая тело"""
+    content_length = request.content_length
+    if content_length is not None and content_length > app.config['MAX_CONTENT_LENGTH']:
+        return too_large(None)
+
+
 @app.errorhandler(413)
 def too_large(e):
     return jsonify({
@@ -332,4 +745,10 @@ if __name__ == '__main__':
     print("  POST /api/metrics/calculate - вычисление метрик")
     print("  GET  /health - проверка статуса")
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Встроенный сервер Werkzeug - только для разработки (DEV=1 включает отладку и перезагрузку).
+    # В продакшене: gunicorn -c gunicorn_conf.py web_app:app
+    dev_mode = bool(os.environ.get('DEV'))
+    if not dev_mode:
+        print("⚠️ Для продакшена используйте gunicorn (см. gunicorn_conf.py)")
+        warmup_ocr()
+    app.run(debug=dev_mode, host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
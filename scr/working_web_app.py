@@ -1,62 +1,337 @@
 """
 Рабочая версия Flask веб-приложения с встроенными шаблонами
 Все OCR движки работают: PaddleOCR, Tesseract, TrOCR
+
+Приложение создает create_app(): при импорте модуля модели не загружаются.
+Запуск в gunicorn (модели прогреваются в каждом рабочем процессе после fork,
+хук post_worker_init в gunicorn_conf.py):
+    gunicorn -c gunicorn_conf.py 'working_web_app:create_app()'
 """
 
 import os
+import re
 import json
+import hashlib
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from flask import Flask, request, jsonify
-from werkzeug.utils import secure_filename
+from flask import Blueprint, Flask, Request, Response, abort, current_app, request, jsonify, send_from_directory, stream_with_context
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import traceback
 
 # Импорты OCR координатора
 from ocr_coordinator import OCRCoordinator
+from pipeline import PDF_SUPPORT, PdfPipeline
+from stats import result_stats
+
+# Быстрая сериализация JSON ответов (orjson), с откатом на стандартный провайдер Flask
+try:
+    import orjson
+    from flask.json.provider import JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """JSON провайдер Flask на orjson"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+except ImportError:
+    OrjsonProvider = None
+
+
+def _pretty_json(obj):
+    """JSON с отступами для вкладки "Сырые данные": форматируется один раз на сервере, а не в браузере"""
+    if OrjsonProvider is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+
+# Сжатие JSON ответов (brotli, иначе gzip): текст OCR сжимается в 5-10 раз
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB максимум
+# Файлы из multipart держатся в памяти до этого размера, дальше сбрасываются на диск
+# (в обычный временный каталог, а не в tmpfs UPLOAD_FOLDER, который тоже занимает RAM)
+UPLOAD_SPOOL_MAX_MEMORY = 1024 * 1024
+# Загрузки живут только на время OCR: по умолчанию в tmpfs (/dev/shm),
+# чтобы сохранение и повторное чтение файла движком не шли через диск
+UPLOAD_FOLDER = os.environ.get(
+    'OCR_SCRATCH',
+    '/dev/shm/ocr' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'ocr')
+)
+RESULTS_FOLDER = 'results'
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+STATIC_URL_PATH = '/static'
+
+# Общий пул для вызовов OCR: независимые шаги одного запроса идут параллельно,
+# а число одновременных распознаваний во всех запросах ограничено OCR_CONCURRENCY
+OCR_CONCURRENCY = int(os.environ.get('OCR_CONCURRENCY', os.cpu_count() or 1))
+
+bp = Blueprint('ocr', __name__)
+
+
+class OCRServices:
+    """OCR координатор приложения и пулы, через которые его вызывают обработчики"""
+
+    def __init__(self, coordinator):
+        self.coordinator = coordinator
+        # Потоки пула создаются при первой задаче, то есть уже в рабочем процессе
+        self.executor = ThreadPoolExecutor(max_workers=OCR_CONCURRENCY, thread_name_prefix='ocr')
+        # Многостраничные PDF: рендер страниц и их пакетный OCR идут конвейером
+        self.pdf_pipeline = PdfPipeline(coordinator)
+
+
+class SpooledUploadRequest(Request):
+    """Запрос, чьи загружаемые файлы занимают в памяти не больше UPLOAD_SPOOL_MAX_MEMORY"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY, mode='rb+')
 
-app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB максимум
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['RESULTS_FOLDER'] = 'results'
 
-# Создаем папки если их нет
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
+def _ocr():
+    """OCR сервисы текущего приложения"""
+    return current_app.extensions['ocr']
 
-# Инициализируем координатор OCR
-ocr_coordinator = OCRCoordinator()
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'bmp', 'tiff'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'pdf', 'bmp', 'tiff'})
+_ALLOWED_RE = re.compile(
+    r'\.(?:%s)\Z' % '|'.join(sorted(ALLOWED_EXTENSIONS)), re.IGNORECASE
+).search
+
+# Буфер копирования загрузки на диск
+UPLOAD_COPY_BUFFER = 1 << 20
+
+# Пакетная обработка: сколько файлов принимает один запрос и сколько из них
+# сохраняется на диск одновременно
+OCR_BATCH_MAX_FILES = int(os.environ.get('OCR_BATCH_MAX_FILES', '50'))
+UPLOAD_SAVE_WORKERS = 8
+
+# Кэш результатов OCR по хэшу содержимого файла и параметрам: повторная
+# загрузка того же документа не запускает OCR. OCR_RESULT_CACHE_DIR включает
+# хранение на диске (переживает перезапуск), записи живут OCR_RESULT_CACHE_TTL секунд
+OCR_RESULT_CACHE_SIZE = 256
+OCR_RESULT_CACHE_TTL = int(os.environ.get('OCR_RESULT_CACHE_TTL', '86400'))
+OCR_RESULT_CACHE_DIR = os.environ.get('OCR_RESULT_CACHE_DIR', os.path.join(RESULTS_FOLDER, '.cache'))
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
 
 
 def allowed_file(filename):
     """Проверка допустимых расширений файлов"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return bool(filename) and _ALLOWED_RE(filename) is not None
 
 
-@app.route('/')
-def index():
-    """Главная страница с встроенным HTML"""
+def _safe_ext(filename):
+    """Расширение загруженного файла из белого списка (имя файла на сервере не используется)"""
+    suffix = Path(filename).suffix.lower()
+    return suffix if suffix[1:] in ALLOWED_EXTENSIONS else '.bin'
 
-    # Получаем список доступных движков
+
+def _save_upload(file, filepath):
+    """
+    Сохраняет загруженный файл на диск
+
+    Большие загрузки Werkzeug держит во временном файле - тогда данные
+    копирует ядро (os.sendfile) в заранее выделенное место, без прохода
+    через Python. Иначе файл копируется блоками по UPLOAD_COPY_BUFFER
+    (загрузки в памяти SpooledTemporaryFile - прямо из памяти).
+
+    Returns:
+        Хэш содержимого файла (для кэша результатов)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'wb') as out:
+        # fileno() у SpooledTemporaryFile сбрасывает его на диск, поэтому
+        # дескриптор берется, только если данные уже в файле
+        in_fd = None
+        if getattr(file.stream, '_rolled', True):
+            try:
+                in_fd = file.stream.fileno()
+                size = os.fstat(in_fd).st_size
+            except (AttributeError, OSError, ValueError):
+                in_fd = None
+
+        if in_fd is not None and hasattr(os, 'sendfile'):
+            try:
+                if size and hasattr(os, 'posix_fallocate'):
+                    os.posix_fallocate(out.fileno(), 0, size)
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), in_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                # Хэш считается по временному файлу, данные уже в страничном кэше
+                for offset in range(0, size, UPLOAD_COPY_BUFFER):
+                    digest.update(os.pread(in_fd, UPLOAD_COPY_BUFFER, offset))
+                return digest.hexdigest()
+            except OSError:
+                # Файловая система не поддерживает sendfile - копируем сначала
+                out.seek(0)
+                out.truncate()
+
+        # Копирование и хэширование за один проход
+        file.stream.seek(0)
+        for chunk in iter(lambda: file.stream.read(UPLOAD_COPY_BUFFER), b''):
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def _save_scratch_upload(file, folder):
+    """
+    Сохраняет загрузку во временный файл в папке folder (UPLOAD_FOLDER)
+
+    Файл удаляет вызывающий код после OCR (os.unlink в finally).
+
+    Returns:
+        (путь к файлу, хэш содержимого)
+    """
+    with tempfile.NamedTemporaryFile(
+        dir=folder,
+        suffix=_safe_ext(file.filename),
+        delete=False
+    ) as tmp:
+        filepath = tmp.name
     try:
-        engines = ocr_coordinator.get_available_engines()
-        engines_options = ''.join([f'<option value="{engine}">{engine}</option>' for engine in engines])
-        if not engines:
-            engines_options = '<option value="">Нет доступных движков</option>'
-    except:
-        engines_options = '<option value="">Ошибка загрузки движков</option>'
+        return filepath, _save_upload(file, filepath)
+    except BaseException:
+        os.unlink(filepath)
+        raise
+
+
+# Трассировки ошибок обработки пишутся в лог один раз, клиент получает exc_id для поиска
+EXC_LOG = logging.getLogger('ocr.exc')
 
-    html = f"""
+
+def _error_payload(e, debug):
+    """Тело ответа об ошибке обработки; вызывается из блока except"""
+    exc_id = uuid.uuid4().hex[:12]
+    EXC_LOG.exception("exc_id=%s", exc_id)
+    response = {
+        'success': False,
+        'error': str(e),
+        'exc_id': exc_id
+    }
+    if debug:
+        response['traceback'] = traceback.format_exc()
+    return response
+
+
+def processing_error(e):
+    """Ответ 500 на ошибку обработки: трассировка в логе, клиенту - только в режиме отладки"""
+    return jsonify(_error_payload(e, current_app.debug)), 500
+
+
+# Идентификатор результата: шестнадцатеричное время в наносекундах и случайный суффикс
+_RESULT_ID_RE = re.compile(r'[0-9a-f]{16}_[0-9a-f]{8}\Z').match
+
+
+def _store_result(result_id, result):
+    """Сохраняет полный результат OCR (уже отформатированный) в RESULTS_FOLDER для GET /api/ocr/result/<id>"""
+    path = os.path.join(current_app.config['RESULTS_FOLDER'], f"{result_id}.json")
+    with open(path, 'wb') as f:
+        f.write(_pretty_json(result))
+
+
+def _cache_get(key):
+    """Результат OCR из кэша (памяти, затем диска) или None"""
+    with _result_cache_lock:
+        entry = _result_cache.get(key)
+        if entry is not None:
+            _result_cache.move_to_end(key)
+
+    if entry is None and OCR_RESULT_CACHE_DIR:
+        cache_path = os.path.join(OCR_RESULT_CACHE_DIR, f"{key}.json")
+        try:
+            expires = os.path.getmtime(cache_path) + OCR_RESULT_CACHE_TTL
+            if expires > time.time():
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    entry = (expires, json.load(f))
+                _cache_put(key, entry[1], persist=False, expires=expires)
+        except (OSError, ValueError):
+            entry = None
+
+    if entry is None or entry[0] <= time.time():
+        return None
+    # Копия: вызывающий код дополняет результат
+    return dict(entry[1])
+
+
+def _cache_put(key, result, persist=True, expires=None):
+    """Сохраняет результат OCR в LRU-кэш и, если задан OCR_RESULT_CACHE_DIR, на диск"""
+    if expires is None:
+        expires = time.time() + OCR_RESULT_CACHE_TTL
+    with _result_cache_lock:
+        _result_cache[key] = (expires, dict(result))
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > OCR_RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+    if persist and OCR_RESULT_CACHE_DIR:
+        try:
+            os.makedirs(OCR_RESULT_CACHE_DIR, exist_ok=True)
+            with open(os.path.join(OCR_RESULT_CACHE_DIR, f"{key}.json"), 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, default=str)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить кэш OCR: {e}")
+
+
+# Bootstrap раздается с этого же сервера, если файлы скачаны в static/vendor
+# (см. README), иначе - с jsDelivr. Версия в имени файла: кэшируются навсегда
+STATIC_VENDOR_ASSETS = {
+    'bootstrap_css': (
+        'vendor/bootstrap-5.3.0/bootstrap.min.css',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css'
+    ),
+    'bootstrap_icons_css': (
+        'vendor/bootstrap-icons-1.10.0/bootstrap-icons.css',
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.0/font/bootstrap-icons.css'
+    ),
+    'bootstrap_js': (
+        'vendor/bootstrap-5.3.0/bootstrap.bundle.min.js',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js'
+    ),
+}
+
+
+def _asset_url(local_path, cdn_url):
+    """Локальный адрес ресурса, если он есть в static, иначе адрес CDN"""
+    if os.path.exists(os.path.join(STATIC_FOLDER, local_path)):
+        return f"{STATIC_URL_PATH}/{local_path}"
+    return cdn_url
+
+
+@bp.after_app_request
+def cache_vendor_assets(response):
+    """Версионированные файлы из static/vendor браузер кэширует без повторных запросов"""
+    if request.path.startswith(f"{STATIC_URL_PATH}/vendor/") and response.status_code == 200:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+# Страница со встроенным HTML: статическая часть собирается и кодируется один раз
+# при импорте, на месте {engines_options} вставляется список движков
+INDEX_HTML = """
 <!DOCTYPE html>
 <html lang="ru">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>OCR 2.0 - Веб-интерфейс</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.0/font/bootstrap-icons.css" rel="stylesheet">
+    <link href="{bootstrap_css}" rel="stylesheet">
+    <link href="{bootstrap_icons_css}" rel="stylesheet">
     <style>
         .drop-zone {{
             border: 2px dashed #dee2e6;
@@ -264,15 +539,20 @@ def index():
         </div>
     </div>
 
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
+    <script src="{bootstrap_js}"></script>
     <script>
         let currentFile = null;
         let currentResult = null;
+        // Полный результат загружается при первом открытии вкладки "Сырые данные"
+        let currentRawUrl = null;
+        let rawLoaded = false;
 
         document.addEventListener('DOMContentLoaded', function() {{
             const dropZone = document.getElementById('dropZone');
             const fileInput = document.getElementById('fileInput');
 
+            document.querySelector('a[href="#rawTab"]').addEventListener('shown.bs.tab', loadRawData);
+
             // Drag & Drop функциональность
             dropZone.addEventListener('click', () => fileInput.click());
             dropZone.addEventListener('dragover', handleDragOver);
@@ -362,8 +642,10 @@ def index():
             .then(data => {{
                 hideProgress();
                 if (data.success) {{
-                    currentResult = data.result;
-                    displayResults(data.result);
+                    currentResult = data.summary;
+                    currentRawUrl = data.raw_url;
+                    rawLoaded = false;
+                    displayResults(data.summary);
                     showAlert('Документ успешно обработан!', 'success');
                 }} else {{
                     showAlert(`Ошибка обработки: ${{data.error}}`, 'danger');
@@ -394,6 +676,7 @@ def index():
                 hideProgress();
                 if (data.success) {{
                     currentResult = data.comparison;
+                    currentRawUrl = null;
                     displayComparisonResults(data.comparison);
                     showAlert('Сравнение движков завершено!', 'success');
                 }} else {{
@@ -427,13 +710,47 @@ def index():
             // Отображаем извлеченные поля
             displayExtractedFields(result.extracted_fields);
 
-            // Отображаем сырые данные
-            document.getElementById('rawData').textContent = JSON.stringify(result, null, 2);
+            // Сырые данные подгружаются при открытии вкладки (loadRawData)
+            document.getElementById('rawData').textContent = '';
+            if (document.getElementById('rawTab').classList.contains('active')) {{
+                loadRawData();
+            }}
 
             // Прокручиваем к результатам
             document.getElementById('resultsSection').scrollIntoView({{ behavior: 'smooth' }});
         }}
 
+        function loadRawData() {{
+            if (!currentRawUrl || rawLoaded) {{
+                return;
+            }}
+            rawLoaded = true;
+
+            // Сервер отдает уже отформатированный JSON - текст выводится как есть
+            const url = currentRawUrl;
+            const rawData = document.getElementById('rawData');
+            rawData.textContent = 'Загрузка...';
+            fetch(url)
+            .then(response => {{
+                if (!response.ok) {{
+                    throw new Error(`HTTP ${{response.status}}`);
+                }}
+                return response.text();
+            }})
+            .then(text => {{
+                if (url === currentRawUrl) {{
+                    rawData.textContent = text;
+                }}
+            }})
+            .catch(error => {{
+                console.error('Ошибка загрузки результата:', error);
+                if (url === currentRawUrl) {{
+                    rawLoaded = false;
+                    rawData.textContent = 'Не удалось загрузить полный результат';
+                }}
+            }});
+        }}
+
         function displayExtractedFields(fields) {{
             const container = document.getElementById('extractedFields');
 
@@ -482,10 +799,11 @@ def index():
                     '<span class="badge bg-success">Успех</span>' :
                     '<span class="badge bg-danger">Ошибка</span>';
 
-                const chars = result.raw_text ? result.raw_text.length : 0;
-                const words = result.raw_text ? result.raw_text.split(' ').length : 0;
-                const items = result.total_items || 0;
-                const conf = result.avg_confidence ? `${{(result.avg_confidence * 100).toFixed(1)}}%` : 'N/A';
+                const stats = result.stats || {{}};
+                const chars = stats.chars || 0;
+                const words = stats.words || 0;
+                const items = stats.total_items || 0;
+                const conf = stats.avg_confidence ? `${{(stats.avg_confidence * 100).toFixed(1)}}%` : 'N/A';
 
                 comparisonHtml += `
                     <tr>
@@ -543,13 +861,26 @@ def index():
                 return;
             }}
 
+            const filename = `ocr_result_${{new Date().toISOString().split('T')[0]}}.json`;
+
+            // Полный результат скачивается с сервера, без сборки в браузере
+            if (currentRawUrl) {{
+                const link = document.createElement('a');
+                link.href = currentRawUrl;
+                link.download = filename;
+                document.body.appendChild(link);
+                link.click();
+                document.body.removeChild(link);
+                return;
+            }}
+
             const dataStr = JSON.stringify(currentResult, null, 2);
             const dataBlob = new Blob([dataStr], {{ type: 'application/json' }});
             const url = URL.createObjectURL(dataBlob);
 
             const link = document.createElement('a');
             link.href = url;
-            link.download = `ocr_result_${{new Date().toISOString().split('T')[0]}}.json`;
+            link.download = filename;
             document.body.appendChild(link);
             link.click();
             document.body.removeChild(link);
@@ -560,6 +891,7 @@ def index():
         function resetForm() {{
             currentFile = null;
             currentResult = null;
+            currentRawUrl = null;
 
             const dropZone = document.getElementById('dropZone');
             dropZone.innerHTML = `
@@ -586,14 +918,63 @@ def index():
 </body>
 </html>
     """
-    return html
+
+_INDEX_PREFIX, _INDEX_SUFFIX = (
+    part.encode('utf-8') for part in INDEX_HTML.format(
+        engines_options='\0',
+        **{name: _asset_url(*urls) for name, urls in STATIC_VENDOR_ASSETS.items()}
+    ).split('\0')
+)
+
+# Как долго (в секундах) переиспользуется список движков (страница, /health, /api/ocr/engines)
+INDEX_ENGINES_TTL = 60
+
+
+@lru_cache(maxsize=1)
+def _index_page(bucket, coordinator):
+    """Тело главной страницы и его ETag (bucket - номер интервала INDEX_ENGINES_TTL)"""
+    # Получаем список доступных движков
+    try:
+        engines = coordinator.get_available_engines()
+        engines_options = ''.join([f'<option value="{engine}">{engine}</option>' for engine in engines])
+        if not engines:
+            engines_options = '<option value="">Нет доступных движков</option>'
+    except:
+        engines_options = '<option value="">Ошибка загрузки движков</option>'
+
+    page = _INDEX_PREFIX + engines_options.encode('utf-8') + _INDEX_SUFFIX
+    return page, hashlib.blake2b(page, digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _engines_for_bucket(bucket, coordinator):
+    return coordinator.get_available_engines()
+
+
+def _available_engines(coordinator):
+    """
+    Список движков, обновляемый раз в INDEX_ENGINES_TTL секунд: /health и
+    /api/ocr/engines не опрашивают координатор (возможно, удаленный) на каждый
+    запрос. Ошибки не кэшируются - следующий запрос опросит заново.
+    """
+    return _engines_for_bucket(int(time.time() // INDEX_ENGINES_TTL), coordinator)
+
+
+@bp.route('/')
+def index():
+    """Главная страница с встроенным HTML"""
+    page, etag = _index_page(int(time.time() // INDEX_ENGINES_TTL), _ocr().coordinator)
+    response = Response(page, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'public, max-age={INDEX_ENGINES_TTL}'
+    return response.make_conditional(request)
 
 
-@app.route('/api/ocr/engines', methods=['GET'])
+@bp.route('/api/ocr/engines', methods=['GET'])
 def get_ocr_engines():
     """Получить список доступных OCR движков"""
     try:
-        engines = ocr_coordinator.get_available_engines()
+        engines = _available_engines(_ocr().coordinator)
         return jsonify({
             'success': True,
             'engines': engines
@@ -605,7 +986,7 @@ def get_ocr_engines():
         }), 500
 
 
-@app.route('/api/ocr/process', methods=['POST'])
+@bp.route('/api/ocr/process', methods=['POST'])
 def process_document():
     """Обработка загруженного документа"""
     try:
@@ -634,47 +1015,166 @@ def process_document():
         use_llm = request.form.get('use_llm', 'false').lower() == 'true'
         language = request.form.get('language', 'ru')
 
-        # Сохраняем файл
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
-
-        # Получаем рекомендации по движкам
-        recommendations = ocr_coordinator.recommend_engine(filepath)
-
-        # Обрабатываем документ
-        result = ocr_coordinator.process_document(
-            image_path=filepath,
-            engine=engine,
-            language=language,
-            use_llm=use_llm
-        )
-
-        # Добавляем рекомендации к результату
-        result['engine_recommendations'] = recommendations
+        # Сохраняем файл во временную папку (удаляется после OCR)
+        # Наносекунды + случайный суффикс: идентификаторы одновременных запросов не совпадают
+        timestamp = f"{time.time_ns():016x}_{uuid.uuid4().hex[:8]}"
+        filepath, digest = _save_scratch_upload(file, current_app.config['UPLOAD_FOLDER'])
+
+        ocr = _ocr()
+        try:
+            # Рекомендации по движкам и обработка документа не зависят друг от друга
+            recommendations = ocr.executor.submit(ocr.coordinator.recommend_engine, filepath)
+            cache_key = f"{digest}_{engine}_{language}_{int(use_llm)}"
+            result = _cache_get(cache_key)
+            if result is None:
+                if PDF_SUPPORT and filepath.endswith('.pdf'):
+                    result = ocr.pdf_pipeline.process(filepath, engine=engine, language=language, use_llm=use_llm)
+                else:
+                    result = ocr.executor.submit(
+                        ocr.coordinator.process_document,
+                        image_path=filepath,
+                        engine=engine,
+                        language=language,
+                        use_llm=use_llm
+                    ).result()
+                if result.get('success'):
+                    _cache_put(cache_key, result)
+
+            # Добавляем рекомендации к результату
+            result['engine_recommendations'] = recommendations.result()
+        finally:
+            os.unlink(filepath)
 
         # Добавляем информацию о файлах в результат
         result['files'] = {
-            'original': filepath,
+            'original_name': file.filename,
             'result_id': timestamp
         }
 
+        # Полный результат (bbox и данные по словам) клиент забирает отдельным запросом,
+        # в ответе - только то, что нужно для первых вкладок
+        _store_result(timestamp, result)
+        raw_text = result.get('raw_text') or ''
         return jsonify({
             'success': True,
-            'result': result
+            'result_id': timestamp,
+            'raw_url': f"/api/ocr/result/{timestamp}",
+            'summary': {
+                'engine': result.get('engine', engine),
+                'chars': len(raw_text),
+                'words': len(raw_text.split()),
+                'raw_text': raw_text,
+                'extracted_fields': result.get('extracted_fields') or {}
+            }
         })
 
     except Exception as e:
+        return processing_error(e)
+
+
+@bp.route('/api/ocr/result/<result_id>')
+def get_result(result_id):
+    """Полный результат обработки документа по идентификатору из POST /api/ocr/process"""
+    if not _RESULT_ID_RE(result_id):
+        abort(404)
+    # conditional: ETag/Last-Modified (ответ 304 при обновлении страницы) и запросы Range;
+    # результат по идентификатору не меняется, поэтому кэшируется как immutable
+    response = send_from_directory(
+        os.path.abspath(current_app.config['RESULTS_FOLDER']),
+        f"{result_id}.json",
+        mimetype='application/json',
+        conditional=True,
+        etag=True,
+        max_age=86400
+    )
+    response.cache_control.immutable = True
+    return response
+
+
+@bp.route('/api/ocr/batch', methods=['POST'])
+def process_batch():
+    """Пакетная обработка нескольких документов (поле files) одним вызовом движка"""
+    try:
+        files = [file for file in request.files.getlist('files') if file.filename]
+        if not files:
+            return jsonify({
+                'success': False,
+                'error': 'Файлы не найдены в запросе'
+            }), 400
+
+        if len(files) > OCR_BATCH_MAX_FILES:
+            return jsonify({
+                'success': False,
+                'error': f'Слишком много файлов: максимум {OCR_BATCH_MAX_FILES}'
+            }), 400
+
+        rejected = [file.filename for file in files if not allowed_file(file.filename)]
+        if rejected:
+            return jsonify({
+                'success': False,
+                'error': f'Недопустимый тип файла: {", ".join(rejected)}. Разрешены: {", ".join(ALLOWED_EXTENSIONS)}'
+            }), 400
+
+        # Получаем параметры
+        engine = request.form.get('engine', 'PaddleOCR')
+        use_llm = request.form.get('use_llm', 'false').lower() == 'true'
+        language = request.form.get('language', 'ru')
+
+        # Сохраняем файлы параллельно во временную папку (удаляются после OCR)
+        folder = current_app.config['UPLOAD_FOLDER']
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_SAVE_WORKERS, len(files))) as executor:
+            futures = [executor.submit(_save_scratch_upload, file, folder) for file in files]
+        saved = [future.result() for future in futures if future.exception() is None]
+
+        try:
+            errors = [future.exception() for future in futures if future.exception() is not None]
+            if errors:
+                raise errors[0]
+
+            cache_keys = [f"{digest}_{engine}_{language}_{int(use_llm)}" for _, digest in saved]
+            results = [_cache_get(cache_key) for cache_key in cache_keys]
+            pending = [i for i, result in enumerate(results) if result is None]
+
+            # Изображения распознаются одним пакетным вызовом движка, PDF - постранично конвейером
+            pdfs = [i for i in pending if PDF_SUPPORT and saved[i][0].endswith('.pdf')]
+            images = [i for i in pending if i not in pdfs]
+
+            ocr = _ocr()
+            batch = None
+            if images:
+                batch = ocr.executor.submit(
+                    ocr.coordinator.batch_process,
+                    [saved[i][0] for i in images],
+                    engine=engine,
+                    language=language,
+                    use_llm=use_llm
+                )
+            for i in pdfs:
+                results[i] = ocr.pdf_pipeline.process(saved[i][0], engine=engine, language=language, use_llm=use_llm)
+            if batch is not None:
+                for i, result in zip(images, batch.result()):
+                    results[i] = result
+
+            for i in pending:
+                if results[i].get('success'):
+                    _cache_put(cache_keys[i], results[i])
+        finally:
+            for filepath, _ in saved:
+                os.unlink(filepath)
+
+        for file, result in zip(files, results):
+            result['files'] = {'original_name': file.filename}
+
         return jsonify({
-            'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }), 500
+            'success': True,
+            'results': results
+        })
+
+    except Exception as e:
+        return processing_error(e)
 
 
-@app.route('/api/ocr/compare', methods=['POST'])
+@bp.route('/api/ocr/compare', methods=['POST'])
 def compare_engines():
     """Сравнение нескольких OCR движков на одном документе"""
     try:
@@ -696,19 +1196,30 @@ def compare_engines():
         engines = [engine.strip() for engine in engines_str.split(',')]
         language = request.form.get('language', 'ru')
 
-        # Сохраняем файл
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
-
-        # Сравниваем движки
-        comparison_result = ocr_coordinator.compare_engines(
-            image_path=filepath,
-            engines=engines,
-            language=language
-        )
+        # Сохраняем файл во временную папку (удаляется после OCR)
+        filepath, _ = _save_scratch_upload(file, current_app.config['UPLOAD_FOLDER'])
+
+        if request.args.get('stream') == '1':
+            return Response(
+                stream_with_context(_stream_comparison(_ocr(), filepath, engines, language, current_app.debug)),
+                mimetype='application/x-ndjson'
+            )
+
+        # Сравниваем движки (сам координатор запускает движки параллельно)
+        try:
+            ocr = _ocr()
+            comparison_result = ocr.executor.submit(
+                ocr.coordinator.compare_engines,
+                image_path=filepath,
+                engines=engines,
+                language=language
+            ).result()
+        finally:
+            os.unlink(filepath)
+
+        # Статистика для таблицы сравнения считается один раз здесь, а не в каждом клиенте
+        for result in comparison_result.get('results', {}).values():
+            result['stats'] = result_stats(result)
 
         return jsonify({
             'success': True,
@@ -716,14 +1227,51 @@ def compare_engines():
         })
 
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }), 500
+        return processing_error(e)
 
 
-@app.route('/api/setup-help')
+# Конец потока событий сравнения
+_STREAM_DONE = object()
+
+
+def _stream_comparison(ocr, filepath, engines, language, debug):
+    """
+    Потоковое сравнение движков (NDJSON): строка на каждый завершившийся движок
+    {"engine", "result"}, затем итог {"success", "comparison"} с метриками.
+
+    Сравнение идет в общем пуле OCR и передает результаты через очередь,
+    клиент видит первый движок, не дожидаясь самого медленного.
+    """
+    events = queue.Queue()
+
+    def on_result(engine, result):
+        result['stats'] = result_stats(result)
+        events.put({'engine': engine, 'result': result})
+
+    def run():
+        try:
+            comparison_result = ocr.coordinator.compare_engines(
+                image_path=filepath,
+                engines=engines,
+                language=language,
+                on_result=on_result
+            )
+            events.put({'success': True, 'comparison': comparison_result})
+        except Exception as e:
+            events.put(_error_payload(e, debug))
+        finally:
+            os.unlink(filepath)
+            events.put(_STREAM_DONE)
+
+    ocr.executor.submit(run)
+    while True:
+        event = events.get()
+        if event is _STREAM_DONE:
+            return
+        yield current_app.json.dumps(event) + '\n'
+
+
+@bp.route('/api/setup-help')
 def setup_help():
     """Помощь по настройке OCR движков"""
     help_info = {
@@ -757,25 +1305,35 @@ def setup_help():
     })
 
 
-@app.route('/health')
+@lru_cache(maxsize=1)
+def _iso_second(second):
+    """Время в ISO формате с точностью до секунды; форматируется раз в секунду"""
+    return datetime.fromtimestamp(second).isoformat(timespec='seconds')
+
+
+def _health_timestamp():
+    return _iso_second(int(time.time()))
+
+
+@bp.route('/health')
 def health_check():
     """Проверка здоровья сервиса"""
     try:
-        engines = ocr_coordinator.get_available_engines()
+        engines = _available_engines(_ocr().coordinator)
         return jsonify({
             'status': 'healthy',
             'available_engines': engines,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _health_timestamp()
         })
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _health_timestamp()
         }), 500
 
 
-@app.errorhandler(413)
+@bp.app_errorhandler(413)
 def too_large(e):
     return jsonify({
         'success': False,
@@ -783,14 +1341,65 @@ def too_large(e):
     }), 413
 
 
+def create_app(coordinator=None):
+    """
+    Создает Flask приложение OCR веб-сервиса
+
+    Args:
+        coordinator: Готовый OCRCoordinator; по умолчанию создается новый. Его прогрев
+            (OCR_WARMUP=0 отключает) регистрируется в app.extensions['ocr_warmup'] и
+            вызывается после fork (post_worker_init в gunicorn_conf.py) или перед запуском
+            встроенного сервера: пулы потоков, запущенные до fork, в рабочих процессах не работают
+
+    Returns:
+        Flask приложение
+    """
+    app = Flask(__name__, static_folder=STATIC_FOLDER, static_url_path=STATIC_URL_PATH)
+    app.request_class = SpooledUploadRequest
+    if OrjsonProvider is not None:
+        app.json = OrjsonProvider(app)
+    app.config.update(
+        MAX_CONTENT_LENGTH=MAX_CONTENT_LENGTH,
+        UPLOAD_FOLDER=UPLOAD_FOLDER,
+        RESULTS_FOLDER=RESULTS_FOLDER
+    )
+    if Compress is not None:
+        app.config.update(
+            COMPRESS_MIMETYPES=['application/json', 'text/html'],
+            COMPRESS_ALGORITHM=['br', 'gzip'],
+            COMPRESS_MIN_SIZE=1024,
+            COMPRESS_LEVEL=4,
+            COMPRESS_BR_LEVEL=4
+        )
+        Compress(app)
+
+    # Создаем папки если их нет
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
+
+    if coordinator is None:
+        coordinator = OCRCoordinator()
+        if os.environ.get('OCR_WARMUP', '1') == '1':
+            languages = tuple(os.environ.get('OCR_WARMUP_LANGUAGES', 'ru').split(','))
+            app.extensions['ocr_warmup'] = lambda: coordinator.warmup(languages=languages)
+    app.extensions['ocr'] = OCRServices(coordinator)
+
+    app.register_blueprint(bp)
+    return app
+
+
 if __name__ == '__main__':
+    app = create_app()
+    if 'ocr_warmup' in app.extensions:
+        app.extensions['ocr_warmup']()
+
     print("🚀 Запуск РАБОЧЕГО OCR веб-сервиса...")
-    print(f"📁 Папка загрузок: {app.config['UPLOAD_FOLDER']}")
+    print(f"📁 Временная папка загрузок: {app.config['UPLOAD_FOLDER']}")
     print(f"📁 Папка результатов: {app.config['RESULTS_FOLDER']}")
 
     # Проверяем доступные движки
     try:
-        available_engines = ocr_coordinator.get_available_engines()
+        available_engines = app.extensions['ocr'].coordinator.get_available_engines()
         print(f"🔧 Доступные OCR движки: {', '.join(available_engines)}")
     except Exception as e:
         print(f"⚠️ Ошибка инициализации OCR: {e}")
@@ -798,6 +1407,8 @@ if __name__ == '__main__':
     print("🌐 Веб-интерфейс доступен по адресу: http://localhost:5000")
     print("📋 API документация:")
     print("  POST /api/ocr/process - обработка документа")
+    print("  GET  /api/ocr/result/<id> - полный результат обработки")
+    print("  POST /api/ocr/batch - пакетная обработка документов (поле files)")
     print("  POST /api/ocr/compare - сравнение движков")
     print("  GET  /api/ocr/engines - список движков")
     print("  GET  /health - проверка статуса")
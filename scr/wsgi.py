@@ -0,0 +1,12 @@
+"""
+wsgi.py - Точка входа WSGI для запуска веб-сервиса в продакшене
+
+Запуск (несколько процессов и потоков обрабатывают загрузки параллельно):
+    gunicorn -w $(nproc) --threads 4 -b 0.0.0.0:5000 wsgi:app
+
+Для разработки: DEV=1 python simple_web_app.py
+"""
+
+from simple_web_app import app
+
+__all__ = ['app']
\ No newline at end of file
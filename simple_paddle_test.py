@@ -3,54 +3,67 @@
 Simple PaddleOCR test to see actual result structure
 """
 
-from paddleocr import PaddleOCR
-import os
+import logging
+import sys
+from pathlib import Path
+
+# Add src directory to path
+src_path = Path(__file__).parent / "scr"
+sys.path.insert(0, str(src_path))
+
+from ocr_paddle import get_paddle_instance
+from test_utils import load_image_once
+
+logger = logging.getLogger(__name__)
 
 def test_paddle():
-    print("🔍 Testing PaddleOCR directly...")
+    logger.info("🔍 Testing PaddleOCR directly...")
     
-    # Initialize PaddleOCR
-    ocr = PaddleOCR(use_angle_cls=True, lang='ru')
+    # Shared PaddleOCR instance (models are loaded once per process)
+    ocr = get_paddle_instance(lang='ru')
     
     # Test image
     image_path = "scr/uploads/20250914_231837_2025-09-14_225307.png"
     
-    if not os.path.exists(image_path):
-        print(f"❌ Image not found: {image_path}")
+    # Decoded once; PaddleOCR takes the BGR array without re-reading the file
+    image = load_image_once(image_path)
+    if image is None:
+        logger.error("❌ Image not found: %s", image_path)
         return
         
-    print(f"📷 Processing: {image_path}")
+    logger.info("📷 Processing: %s", image_path)
     
     # Run OCR
-    result = ocr.ocr(image_path)
+    result = ocr.ocr(image)
     
-    print(f"\n📊 Result type: {type(result)}")
-    print(f"📊 Result length: {len(result) if result else 0}")
+    logger.info("\n📊 Result type: %s", type(result))
+    logger.info("📊 Result length: %s", len(result) if result else 0)
     
     if result and len(result) > 0:
         first_page = result[0]
-        print(f"\n📊 First page type: {type(first_page)}")
+        logger.info("\n📊 First page type: %s", type(first_page))
         
         if hasattr(first_page, '__dict__'):
-            print("\n🔍 OCRResult object attributes:")
+            logger.info("\n🔍 OCRResult object attributes:")
             attributes = [attr for attr in dir(first_page) if not attr.startswith('_')]
             for attr in attributes:
                 try:
                     value = getattr(first_page, attr)
                     if not callable(value):
-                        print(f"  {attr}: {type(value)}")
+                        logger.info("  %s: %s", attr, type(value))
                         if hasattr(value, '__len__') and not isinstance(value, str):
-                            print(f"    Length: {len(value)}")
+                            logger.info("    Length: %d", len(value))
                             if len(value) > 0:
-                                print(f"    First item: {value[0]}")
+                                logger.info("    First item: %s", value[0])
                 except:
-                    print(f"  {attr}: <unable to access>")
+                    logger.info("  %s: <unable to access>", attr)
         else:
-            print(f"\n📊 First page length: {len(first_page) if hasattr(first_page, '__len__') else 'N/A'}")
+            logger.info("\n📊 First page length: %s", len(first_page) if hasattr(first_page, '__len__') else 'N/A')
             if hasattr(first_page, '__len__') and len(first_page) > 0:
-                print(f"📊 First item in page: {type(first_page[0])}")
+                logger.info("📊 First item in page: %s", type(first_page[0]))
                 if len(first_page) > 0:
-                    print(f"   Content: {first_page[0]}")
+                    logger.info("   Content: %s", first_page[0])
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     test_paddle()
\ No newline at end of file
@@ -3,82 +3,101 @@
 Test script to verify OCR engines work after fixes
 """
 
+import logging
 import sys
-import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Add src directory to path
 src_path = Path(__file__).parent / "scr"
 sys.path.insert(0, str(src_path))
 
+from test_utils import load_image_once
+
+logger = logging.getLogger(__name__)
+
+# Sample image shared by all engine tests
+TEST_IMAGE = "scr/uploads/20250914_225421_2025-09-14_225307.png"
+
 def test_paddle_ocr():
     """Test PaddleOCR with fixed API call"""
     try:
-        print("🧪 Тестирование PaddleOCR...")
+        logger.info("🧪 Тестирование PaddleOCR...")
         from ocr_paddle import run_paddle
         
-        # Test with a sample image
-        test_image = "scr/uploads/20250914_225421_2025-09-14_225307.png"
-        if os.path.exists(test_image):
-            result = run_paddle(test_image, lang='ru')
-            print(f"✅ PaddleOCR работает! Результат: {result[:100]}...")
+        # The image is decoded once and shared by all engine tests
+        test_image = TEST_IMAGE
+        image = load_image_once(test_image)
+        if image is not None:
+            result = run_paddle(image, lang='ru')
+            logger.info("✅ PaddleOCR работает! Результат: %s...", result[:100])
             return True
         else:
-            print(f"❌ Тестовое изображение не найдено: {test_image}")
+            logger.error("❌ Тестовое изображение не найдено: %s", test_image)
             return False
             
     except Exception as e:
-        print(f"❌ Ошибка PaddleOCR: {e}")
+        logger.error("❌ Ошибка PaddleOCR: %s", e)
         return False
 
 def test_trocr():
     """Test TrOCR with fixed implementation"""
     try:
-        print("🧪 Тестирование TrOCR...")
+        logger.info("🧪 Тестирование TrOCR...")
         from ocr_trocr import run_trocr
+        import numpy as np
         
-        # Test with a sample image
-        test_image = "scr/uploads/20250914_225421_2025-09-14_225307.png"
-        if os.path.exists(test_image):
-            result = run_trocr(test_image)
-            print(f"✅ TrOCR работает! Результат: {result[:100]}...")
+        # The image is decoded once and shared by all engine tests
+        test_image = TEST_IMAGE
+        image = load_image_once(test_image)
+        if image is not None:
+            result = run_trocr(np.ascontiguousarray(image[:, :, ::-1]))
+            logger.info("✅ TrOCR работает! Результат: %s...", result[:100])
             return True
         else:
-            print(f"❌ Тестовое изображение не найдено: {test_image}")
+            logger.error("❌ Тестовое изображение не найдено: %s", test_image)
             return False
             
     except Exception as e:
-        print(f"❌ Ошибка TrOCR: {e}")
+        logger.error("❌ Ошибка TrOCR: %s", e)
         return False
 
 def test_tesseract():
     """Test Tesseract as reference"""
     try:
-        print("🧪 Тестирование Tesseract...")
+        logger.info("🧪 Тестирование Tesseract...")
         from ocr_baseline import run_tesseract
+        from PIL import Image
         
-        # Test with a sample image
-        test_image = "scr/uploads/20250914_225421_2025-09-14_225307.png"
-        if os.path.exists(test_image):
-            result = run_tesseract(test_image, lang='rus')
-            print(f"✅ Tesseract работает! Результат: {result[:100]}...")
+        # The image is decoded once and shared by all engine tests
+        test_image = TEST_IMAGE
+        image = load_image_once(test_image)
+        if image is not None:
+            result = run_tesseract(Image.fromarray(image[:, :, ::-1]), lang='rus')
+            logger.info("✅ Tesseract работает! Результат: %s...", result[:100])
             return True
         else:
-            print(f"❌ Тестовое изображение не найдено: {test_image}")
+            logger.error("❌ Тестовое изображение не найдено: %s", test_image)
             return False
             
     except Exception as e:
-        print(f"❌ Ошибка Tesseract: {e}")
+        logger.error("❌ Ошибка Tesseract: %s", e)
         return False
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🚀 Запуск тестов исправленных OCR движков...\n")
     
-    results = {
-        "Tesseract": test_tesseract(),
-        "PaddleOCR": test_paddle_ocr(),
-        "TrOCR": test_trocr()
+    # Engines are independent: Tesseract runs as a subprocess, Paddle and torch release the GIL
+    tests = {
+        "Tesseract": test_tesseract,
+        "PaddleOCR": test_paddle_ocr,
+        "TrOCR": test_trocr
     }
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = {executor.submit(test): engine for engine, test in tests.items()}
+        finished = {futures[future]: future.result() for future in as_completed(futures)}
+    results = {engine: finished[engine] for engine in tests}
     
     print("\n📊 Результаты тестирования:")
     for engine, success in results.items():
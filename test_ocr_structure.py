@@ -3,11 +3,18 @@
 Test OCRResult structure and methods 
 """
 
+import logging
 import sys
-import os
-sys.path.append(os.path.abspath('.'))
+from pathlib import Path
 
-from scr.ocr_paddle import get_paddle_instance
+# Add src directory to path (the same ocr_paddle module and instance cache as the other scripts)
+src_path = Path(__file__).parent / "scr"
+sys.path.insert(0, str(src_path))
+
+from ocr_paddle import get_paddle_instance
+from test_utils import load_image_once
+
+logger = logging.getLogger(__name__)
 
 def test_ocr_result_structure():
     """Test OCRResult object structure and available methods"""
@@ -15,84 +22,48 @@ def test_ocr_result_structure():
     # Test image path
     test_image = "scr/uploads/20250914_231837_2025-09-14_225307.png"
     
-    if not os.path.exists(test_image):
-        print(f"❌ Image not found: {test_image}")
+    # Decoded once; PaddleOCR takes the BGR array without re-reading the file
+    image = load_image_once(test_image)
+    if image is None:
+        logger.error("❌ Image not found: %s", test_image)
         return
     
-    print("🔍 Testing OCRResult object structure...")
+    logger.info("🔍 Testing OCRResult object structure...")
     
     # Get PaddleOCR instance
     ocr = get_paddle_instance(lang='ru')
     
     # Run OCR
-    print(f"📷 Processing image: {test_image}")
-    result = ocr.ocr(test_image)
+    logger.info("📷 Processing image: %s", test_image)
+    result = ocr.ocr(image)
     
-    print(f"\n📊 Raw result type: {type(result)}")
-    print(f"📊 Raw result length: {len(result) if result else 0}")
+    logger.info("\n📊 Raw result type: %s", type(result))
+    logger.info("📊 Raw result length: %s", len(result) if result else 0)
     
     if result and len(result) > 0:
         ocr_result = result[0]
-        print(f"\n📊 OCRResult type: {type(ocr_result)}")
-        print(f"📊 OCRResult class name: {type(ocr_result).__name__}")
-        
-        # Test dictionary-like behavior
-        print(f"\n🔍 Testing dictionary-like behavior:")
+        logger.info("\n📊 OCRResult type: %s", type(ocr_result))
+        logger.info("📊 OCRResult class name: %s", type(ocr_result).__name__)
         
-        # Test keys method
-        if hasattr(ocr_result, 'keys'):
-            try:
-                keys = list(ocr_result.keys())
-                print(f"✅ Keys method exists. Keys: {keys}")
-                
-                # Try accessing some values
-                for key in keys[:5]:  # Show first 5 keys
-                    try:
-                        value = ocr_result[key]
-                        print(f"   ocr_result['{key}']: {type(value)}")
-                        if isinstance(value, list) and len(value) > 0:
-                            print(f"      List length: {len(value)}, first item: {value[0]}")
-                        elif isinstance(value, str):
-                            print(f"      String: '{value[:50]}{'...' if len(value) > 50 else ''}'")
-                        else:
-                            print(f"      Value: {value}")
-                    except Exception as e:
-                        print(f"   Error accessing '{key}': {e}")
-                        
-            except Exception as e:
-                print(f"❌ Error with keys(): {e}")
-        else:
-            print("❌ No keys() method")
-            
-        # Test json method
-        if hasattr(ocr_result, 'json'):
-            try:
-                json_data = ocr_result.json()
-                print(f"\n✅ JSON method works, type: {type(json_data)}")
-                if isinstance(json_data, dict):
-                    print(f"   JSON dict keys: {list(json_data.keys())}")
-                    # Look for text data
-                    for key, value in json_data.items():
-                        if 'text' in key.lower() or 'rec' in key.lower():
-                            print(f"   Found text-related key '{key}': {type(value)}")
-                            if isinstance(value, list) and len(value) > 0:
-                                print(f"      List length: {len(value)}, sample: {value[:2]}")
-                elif isinstance(json_data, list):
-                    print(f"   JSON list length: {len(json_data)}")
-                    if json_data:
-                        print(f"   First JSON item: {json_data[0]}")
-            except Exception as e:
-                print(f"❌ JSON method error: {e}")
-        else:
-            print("❌ No json() method")
+        # PaddleOCR 3.x OCRResult is dict-like: read the rec_* fields directly
+        # (no key discovery and no json() round-trip)
+        logger.info("\n🔍 Testing rec_* fields:")
+        try:
+            texts, scores, polys = ocr_result['rec_texts'], ocr_result['rec_scores'], ocr_result['rec_polys']
+            logger.info("✅ rec_texts: %d, rec_scores: %d, rec_polys: %d", len(texts), len(scores), len(polys))
+            for text, score in list(zip(texts, scores))[:5]:  # Show first 5 items
+                logger.info("   '%s%s' (%.3f)", text[:50], '...' if len(text) > 50 else '', float(score))
+        except (KeyError, TypeError) as e:
+            logger.error("❌ No rec_* fields (legacy PaddleOCR output?): %s", e)
             
         # Test string representation to see internal structure
         try:
             str_repr = str(ocr_result)
-            print(f"\n📝 String representation (first 300 chars):")
-            print(f"   {str_repr[:300]}...")
+            logger.info("\n📝 String representation (first 300 chars):")
+            logger.info("   %s...", str_repr[:300])
         except:
-            print("❌ String representation failed")
+            logger.error("❌ String representation failed")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     test_ocr_result_structure()
\ No newline at end of file
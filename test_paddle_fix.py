@@ -3,56 +3,69 @@
 Test fixed PaddleOCR implementation with OCRResult format
 """
 
+import logging
 import sys
-import os
 from pathlib import Path
 
 # Add src directory to path
 src_path = Path(__file__).parent / "scr"
 sys.path.insert(0, str(src_path))
 
+from test_utils import image_exists
+
+logger = logging.getLogger(__name__)
+
+# Sample images used by the test scripts; all found ones go through PaddleOCR in one batch
+TEST_IMAGES = [
+    "scr/uploads/20250914_225421_2025-09-14_225307.png",
+    "scr/uploads/20250914_230135_2025-09-14_225307.png",
+    "scr/uploads/20250914_230630_2025-09-14_225307.png",
+    "scr/uploads/20250914_231837_2025-09-14_225307.png",
+]
+
 def test_paddle_ocr_fix():
     """Test PaddleOCR with fixed normalization"""
     try:
-        print("🧪 Тестирование исправленного PaddleOCR...")
-        from ocr_paddle import run_paddle
+        logger.info("🧪 Тестирование исправленного PaddleOCR...")
+        from ocr_paddle import run_paddle_batch
         
-        # Test with a sample image
-        test_image = "scr/uploads/20250914_230135_2025-09-14_225307.png"
-        if os.path.exists(test_image):
-            print(f"📁 Тестируем с изображением: {test_image}")
-            result = run_paddle(test_image, lang='ru')
-            
+        test_images = [path for path in TEST_IMAGES if image_exists(path)]
+        if not test_images:
+            logger.error("❌ Тестовые изображения не найдены: %s", ', '.join(TEST_IMAGES))
+            return False
+        
+        # One model call for all images instead of one run per image
+        logger.info("📁 Тестируем с изображениями: %s", ', '.join(test_images))
+        results = run_paddle_batch(test_images, lang='ru')
+        
+        all_ok = True
+        for test_image, result in zip(test_images, results):
+            logger.info("\n📷 %s", test_image)
             if isinstance(result, list) and len(result) > 0:
-                print(f"✅ PaddleOCR работает! Найдено {len(result)} элементов")
-                print("📝 Первые несколько результатов:")
+                logger.info("✅ PaddleOCR работает! Найдено %d элементов", len(result))
+                logger.info("📝 Первые несколько результатов:")
                 for i, item in enumerate(result[:5]):
                     text = item.get('text', '').strip()
                     conf = item.get('conf', 0)
-                    print(f"  {i+1}. '{text}' (уверенность: {conf:.2f})")
+                    logger.info("  %d. '%s' (уверенность: %.2f)", i+1, text, conf)
                 
                 # Объединяем весь текст
                 all_text = '\n'.join([item.get('text', '') for item in result])
-                print(f"\n📄 Полный текст ({len(all_text)} символов):")
-                print(all_text[:200] + "..." if len(all_text) > 200 else all_text)
-                return True
+                logger.info("\n📄 Полный текст (%d символов):", len(all_text))
+                logger.info("%s", all_text[:200] + "..." if len(all_text) > 200 else all_text)
             else:
-                print("❌ PaddleOCR вернул пустой результат")
-                return False
-        else:
-            print(f"❌ Тестовое изображение не найдено: {test_image}")
-            return False
+                logger.error("❌ PaddleOCR вернул пустой результат")
+                all_ok = False
+        return all_ok
             
     except Exception as e:
-        print(f"❌ Ошибка PaddleOCR: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Ошибка PaddleOCR: %s", e)
         return False
 
 def test_normalize_function():
     """Test the normalize function specifically with problematic data"""
     try:
-        print("\n🔧 Тестирование функции нормализации...")
+        logger.info("\n🔧 Тестирование функции нормализации...")
         from ocr_paddle import normalize_paddle_output
         
         # Test with various problematic inputs
@@ -71,20 +84,20 @@ def test_normalize_function():
         ]
         
         for i, test_case in enumerate(test_cases):
-            print(f"  Тест {i+1}: ", end="")
             try:
                 result = normalize_paddle_output(test_case)
-                print(f"✅ OK - получено {len(result)} элементов")
+                logger.info("  Тест %d: ✅ OK - получено %d элементов", i + 1, len(result))
             except Exception as e:
-                print(f"❌ Ошибка: {e}")
+                logger.error("  Тест %d: ❌ Ошибка: %s", i + 1, e)
         
         return True
         
     except Exception as e:
-        print(f"❌ Ошибка тестирования нормализации: {e}")
+        logger.error("❌ Ошибка тестирования нормализации: %s", e)
         return False
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🚀 Тестирование исправлений PaddleOCR...\n")
     
     # Test normalization function first
@@ -3,57 +3,68 @@
 Test script for working OCR engines only
 """
 
+import logging
 import sys
-import os
 from pathlib import Path
 
 # Add src directory to path
 src_path = Path(__file__).parent / "scr"
 sys.path.insert(0, str(src_path))
 
+from test_utils import load_image_once
+
+logger = logging.getLogger(__name__)
+
+# Sample image shared by all engine tests
+TEST_IMAGE = "scr/uploads/20250914_225421_2025-09-14_225307.png"
+
 def test_paddle_ocr():
     """Test PaddleOCR with fixed API call"""
     try:
-        print("🧪 Тестирование PaddleOCR...")
+        logger.info("🧪 Тестирование PaddleOCR...")
         from ocr_paddle import run_paddle
         
-        # Test with a sample image
-        test_image = "scr/uploads/20250914_225421_2025-09-14_225307.png"
-        if os.path.exists(test_image):
-            result = run_paddle(test_image, lang='ru')
-            print(f"✅ PaddleOCR работает! Результат длиной: {len(result)} символов")
-            print(f"Первые 100 символов: {result[:100]}")
+        # The image is decoded once and shared by all engine tests
+        test_image = TEST_IMAGE
+        image = load_image_once(test_image)
+        if image is not None:
+            result = run_paddle(image, lang='ru')
+            logger.info("✅ PaddleOCR работает! Результат длиной: %d символов", len(result))
+            logger.info("Первые 100 символов: %s", result[:100])
             return True
         else:
-            print(f"❌ Тестовое изображение не найдено: {test_image}")
+            logger.error("❌ Тестовое изображение не найдено: %s", test_image)
             return False
             
     except Exception as e:
-        print(f"❌ Ошибка PaddleOCR: {e}")
+        logger.error("❌ Ошибка PaddleOCR: %s", e)
         return False
 
 def test_tesseract():
     """Test Tesseract as reference"""
     try:
-        print("🧪 Тестирование Tesseract...")
+        logger.info("🧪 Тестирование Tesseract...")
         from ocr_baseline import run_tesseract
+        from PIL import Image
         
-        # Test with a sample image
-        test_image = "scr/uploads/20250914_225421_2025-09-14_225307.png"
-        if os.path.exists(test_image):
-            result = run_tesseract(test_image, lang='rus')
-            print(f"✅ Tesseract работает! Результат длиной: {len(result)} символов")
-            print(f"Первые 100 символов: {result[:100]}")
+        # The image is decoded once and shared by all engine tests
+        test_image = TEST_IMAGE
+        image = load_image_once(test_image)
+        if image is not None:
+            result = run_tesseract(Image.fromarray(image[:, :, ::-1]), lang='rus')
+            logger.info("✅ Tesseract работает! Результат длиной: %d символов", len(result))
+            logger.info("Первые 100 символов: %s", result[:100])
             return True
         else:
-            print(f"❌ Тестовое изображение не найдено: {test_image}")
+            logger.error("❌ Тестовое изображение не найдено: %s", test_image)
             return False
             
     except Exception as e:
-        print(f"❌ Ошибка Tesseract: {e}")
+        logger.error("❌ Ошибка Tesseract: %s", e)
         return False
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🚀 Запуск тестов основных OCR движков...\n")
     
     results = {
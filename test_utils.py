@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the OCR test scripts
+"""
+
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_image_once(path):
+    """
+    Decode an image file once and share the result between engine tests.
+
+    Returns a BGR ndarray (as cv2 decodes it), or None if the file is missing
+    or cannot be decoded. Callers must not modify the returned array.
+    """
+    import cv2
+    import numpy as np
+
+    try:
+        # np.fromfile handles non-ASCII paths that cv2.imread cannot open
+        return cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except (OSError, cv2.error):
+        return None
+
+
+@lru_cache(maxsize=None)
+def _dir_listing(dirname):
+    """File names in a directory, read with a single scandir pass."""
+    try:
+        with os.scandir(dirname) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
+
+def image_exists(path):
+    """
+    Check a test image against a cached listing of its directory.
+
+    One scandir per directory replaces a stat call per image. The listing is
+    taken once per run; the sample images do not change while tests run.
+    """
+    return os.path.basename(path) in _dir_listing(os.path.dirname(path) or '.')